@@ -0,0 +1,24 @@
+import argparse
+import time
+
+from services.api import serve_api
+from services.results import RESULTS_PATH, ResultsStore
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the latest completed scan as a JSON API.")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--host', default='', help="Interface to bind (default: all)")
+    parser.add_argument('--results', metavar='PATH', default=RESULTS_PATH,
+                        help="Saved scan to serve (main.py and exporter.py update it after every scan)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    # Requests only read the saved scan; a new one is picked up when the file changes
+    serve_api(ResultsStore(args.results), args.port, args.host)
+    print(f"\n Serving scan results on :{args.port}/api (from {args.results})")
+    while True:
+        time.sleep(3600)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from services.spill import findings_list, peak_rss_mb
+
+# Peak memory of a scan with and without --memory-budget. A synthetic scanner records N inventory
+# rows and flags every resource, through the real runner (per-scanner inventory, hand-over, tags
+# and region stamping, findings lists); only STS is mocked. Each budget runs in a fresh process,
+# so every peak is its own.
+
+ROWS = 0  # Set in the worker process by measure()
+
+def scan_synthetic(inventory=None):
+    findings = findings_list()
+    for i in range(ROWS):
+        volume_id = f"vol-{i:017x}"
+        if inventory is not None:
+            inventory.record('ebs', {"id": volume_id, "status": "available", "volume_type": "gp2",
+                                     "size_gb": 100, "monthly_cost": 10.0})
+        findings.append({"ID": volume_id, "Reason": "Unattached (available)", "Cost": 10.0})
+    return findings
+
+def measure(rows, budget_mb):
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    from moto import mock_aws
+    from services.inventory import Inventory
+    from services.registry import ScannerSpec
+    from services.runner import run_scans
+    from services.spill import MemoryBudget
+    import benchmark_memory
+
+    # The runner imports scanners by module name, as it does for real ones
+    benchmark_memory.ROWS = rows
+    spec = ScannerSpec('synthetic', 'Synthetic Volumes', 'benchmark_memory', 'scan_synthetic', [], 'Storage', 'ebs')
+    budget = MemoryBudget(budget_mb, directory=tempfile.mkdtemp(prefix='cost-optimizer-bench-')) if budget_mb else None
+    with mock_aws():
+        inventory = Inventory(budget)
+        findings = run_scans([spec], 'us-east-1', tags=False, inventory=inventory, budget=budget)
+    return {'rows': rows, 'budget_mb': budget_mb, 'peak_mb': peak_rss_mb(),
+            'findings': len(findings[spec.label]), 'inventory': inventory.count('ebs'),
+            'spilled': budget.spilled if budget else 0}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure peak memory of a scan with and without a memory budget.")
+    parser.add_argument('--rows', type=int, default=300000, help="Resources the synthetic scanner finds")
+    parser.add_argument('--budgets', default='0,20', help="Comma-separated budgets in MB (0: no budget)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    results = []
+    for budget_mb in [int(b) for b in args.budgets.split(',') if b.strip()]:
+        print(f"   ... {args.rows:,} rows, budget {budget_mb or 'none'}", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results.append(executor.submit(measure, args.rows, budget_mb).result())
+
+    from tabulate import tabulate
+    print(tabulate([[r['rows'], f"{r['budget_mb']} MB" if r['budget_mb'] else "none", f"{r['peak_mb']:.0f}",
+                     r['findings'], r['inventory'], r['spilled']] for r in results],
+                   headers=["Rows", "Budget", "Peak RSS (MB)", "Findings", "Inventory rows", "Rows on disk"]))
+
+if __name__ == "__main__":
+    main()
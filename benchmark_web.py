@@ -0,0 +1,201 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from services import runner
+from services.cache import ResponseCache
+from services.clients import configure_cache
+from services.cw_cache import MetricSeriesCache, configure_series_cache
+from services.metrics import METRICS
+from services.registry import SCANNERS
+from services.spill import peak_rss_mb
+from services.tags import apply_tags
+
+# Headless load test for web_app.py: N sessions open the page at the same time, click
+# "Run Analysis" and filter by service, each driven by Streamlit's AppTest in its own process.
+# Scans are replayed from generated fixtures (or run against moto), so only the dashboard is measured.
+
+SCAN = runner.run_scans
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web_app.py')
+SIZES = (1000, 10000, 100000)
+
+REASONS = ("Unattached Volume", "Stopped Instance", "Zombie t3.large (CPU 0.4%)", "Idle NAT Gateway",
+           "Old Snapshot (400 days)", "Unused Elastic IP", "Idle ALB (no traffic in 7 days)", "Cold Bucket")
+REGIONS = ("ap-south-1", "us-east-1", "eu-west-1")
+ACCOUNTS = ("111111111111", "222222222222")
+OWNERS = ("payments", "search", "platform", "data", "mobile")
+ENVIRONMENTS = ("prod", "staging", "dev")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure web_app.py latency and memory under concurrent sessions.")
+    parser.add_argument('--sessions', type=int, default=20, help="Concurrent dashboard sessions per dataset")
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help="Comma-separated finding counts")
+    parser.add_argument('--source', choices=('fixtures', 'moto'), default='fixtures',
+                        help="'fixtures' replays generated findings; 'moto' runs the real scanners against mocked AWS")
+    parser.add_argument('--timeout', type=float, default=600, help="Seconds one script run may take")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    return parser.parse_args()
+
+def build_fixture(size, seed=0):
+    """Returns {label: findings} shaped like run_scans output, `size` findings spread over every scanner."""
+    rng = random.Random(seed)
+    labels = [spec.label for spec in SCANNERS]
+    data = {label: [] for label in labels}
+    for i in range(size):
+        label = labels[i % len(labels)]
+        item = {
+            "ID": f"res-{i:07d}",
+            "Reason": rng.choice(REASONS),
+            "Cost": round(rng.uniform(0.5, 200.0), 2),
+            "Region": rng.choice(REGIONS),
+            "Account": rng.choice(ACCOUNTS),
+        }
+        if label == 'EBS Volumes' and i % 3 == 0:
+            # Some volumes belong to flagged instances, so the cost clusters have work to do
+            item['InstanceId'] = f"res-{(i // 3) * len(labels) + labels.index('EC2 Instances'):07d}"
+        data[label].append(apply_tags(item, {'Owner': rng.choice(OWNERS), 'Environment': rng.choice(ENVIRONMENTS)}))
+    return data
+
+def replay(dataset):
+    """A run_scans stand-in returning a private copy of the fixture, as a fresh scan would."""
+    def run_scans(specs, region, **kwargs):
+        return {spec.label: [dict(item) for item in dataset.get(spec.label, [])] for spec in specs}
+    return run_scans
+
+def seed_moto(size, region='ap-south-1'):
+    # One unattached volume per finding; web_app scans its default region
+    import boto3
+    ec2 = boto3.client('ec2', region_name=region)
+    for i in range(size):
+        ec2.create_volume(Size=10, AvailabilityZone=f"{region}a", TagSpecifications=[{
+            'ResourceType': 'volume', 'Tags': [{'Key': 'Owner', 'Value': OWNERS[i % len(OWNERS)]}]}])
+
+def _rss_mb():
+    # Current (not peak) RSS, so growth per dataset can be attributed to its sessions
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+def _aws_requests():
+    with METRICS.lock:
+        return sum(METRICS.values.get('cost_optimizer_aws_requests_total', {}).values())
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def _widget(app, widgets, label):
+    if app.exception:
+        raise RuntimeError(f"web_app.py raised: {app.exception[0].value}")
+    return next(w for w in widgets if w.label == label)
+
+def _configure_caches(scratch):
+    # Fresh caches, so neither earlier runs nor the user's own scans make AWS calls look cheaper
+    configure_cache(ResponseCache(directory=os.path.join(scratch, 'responses')))
+    configure_series_cache(MetricSeriesCache(directory=os.path.join(scratch, 'series')))
+
+def run_session(timeout):
+    """Opens the dashboard, runs the analysis and applies one filter; returns (AppTest, timings)."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP, default_timeout=timeout)
+    timings = {}
+    started = time.perf_counter()
+    app.run()
+    timings['first_render'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _widget(app, app.button, "Run Analysis").click().run()
+    timings['full_render'] = time.perf_counter() - started
+
+    services = _widget(app, app.multiselect, "Service")
+    started = time.perf_counter()
+    if services.options:
+        services.select(services.options[0]).run()
+    timings['filter'] = time.perf_counter() - started
+
+    if app.exception:
+        raise RuntimeError(f"web_app.py raised: {app.exception[0].value}")
+    return app, timings
+
+def session_worker(size, source, timeout, scratch, start):
+    """One dashboard session in its own process: AppTest swaps process-wide Streamlit state on every run."""
+    _configure_caches(scratch)
+    mock = None
+    if source == 'moto':
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+        seed_moto(size)
+    try:
+        # Streamlit, pandas and altair load on the first run; keep that out of the numbers
+        runner.run_scans = replay(build_fixture(100))
+        run_session(timeout)
+        runner.run_scans = replay(build_fixture(size)) if source == 'fixtures' else SCAN
+
+        rss_before = _rss_mb()
+        requests_before = _aws_requests()
+        start.wait()  # Every session opens the page at the same moment
+        app, timings = run_session(timeout)
+        # The AppTest is still alive here: its session state is what we're measuring
+        timings['mb'] = _rss_mb() - rss_before if rss_before is not None else None
+        timings['aws_calls'] = _aws_requests() - requests_before
+        return timings
+    finally:
+        if mock:
+            mock.stop()
+
+def benchmark(size, sessions, timeout, source, scratch):
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        start = manager.Barrier(sessions)
+        with ProcessPoolExecutor(max_workers=sessions, mp_context=context) as executor:
+            futures = [executor.submit(session_worker, size, source, timeout, scratch, start) for _ in range(sessions)]
+            timings = [f.result() for f in futures]
+
+    result = {'findings': size, 'sessions': sessions, 'source': source}
+    for phase in ('first_render', 'full_render', 'filter'):
+        values = [t[phase] for t in timings]
+        result[f'{phase}_p50'] = _percentile(values, 0.5)
+        result[f'{phase}_p95'] = _percentile(values, 0.95)
+    memory = [t['mb'] for t in timings if t['mb'] is not None]
+    result['mb_per_session'] = sum(memory) / len(memory) if memory else None
+    result['aws_calls_per_session'] = sum(t['aws_calls'] for t in timings) / sessions
+    return result
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    scratch = tempfile.mkdtemp(prefix='cost-optimizer-bench-')
+    if args.source == 'moto':
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    results = []
+    for size in sizes:
+        print(f"   ... {size:,} findings x {args.sessions} sessions", file=sys.stderr)
+        results.append(benchmark(size, args.sessions, args.timeout, args.source, scratch))
+
+    from tabulate import tabulate
+    rows = [[r['findings'], r['sessions'],
+             f"{r['first_render_p50']:.2f} / {r['first_render_p95']:.2f}",
+             f"{r['full_render_p50']:.2f} / {r['full_render_p95']:.2f}",
+             f"{r['filter_p50']:.2f} / {r['filter_p95']:.2f}",
+             f"{r['mb_per_session']:.1f}" if r['mb_per_session'] is not None else "-",
+             f"{r['aws_calls_per_session']:.1f}"] for r in results]
+    print(tabulate(rows, headers=["Findings", "Sessions", "First render p50/p95 (s)", "Full render p50/p95 (s)",
+                                  "Filter p50/p95 (s)", "MB / session", "AWS calls / session"]))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,56 @@
+import heapq
+from itertools import count
 from tabulate import tabulate
 from colorama import Fore, Style, init
+from services.correlation import correlate
+from services.tags import get_tag, group_by_tag
 
 init()
 
-def generate_dashboard(cloud_data):
+# The detailed table lists the costliest findings, kept in a heap while the totals are summed, so a huge
+# (spilled) scan is never held in memory as rows
+DETAIL_ROWS = 200
+
+def generate_dashboard(cloud_data, group_by=None):
     print(Style.BRIGHT + Fore.CYAN + "\n" + "="*60)
     print("     AWS COST OPTIMIZER REPORT   ")
     print("="*60 + Style.RESET_ALL)
     
     grand_total = 0.0
     summary_data = []
-    all_details = []
+    # Min-heap of (cost, -order, service, item): ties keep scan order, as a stable sort would
+    top = []
+    order = count()
+    findings = 0
+    # Once a CUR is loaded, say which costs are real and which are still estimates
+    has_actuals = False
 
     for service, resources in cloud_data.items():
         service_total = 0.0
-        count = len(resources)
         
         for item in resources:
             cost = item.get('Cost', 0.0)
             service_total += cost
             grand_total += cost
-            all_details.append([service, item.get('ID', 'N/A'), item.get('Reason', 'Unused'), f"${cost:.2f}"])
+            has_actuals = has_actuals or 'ActualCost' in item
+            entry = (cost, -next(order), service, item)
+            if len(top) < DETAIL_ROWS:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
             
-        if count > 0:
-            summary_data.append([service, count, f"${service_total:.2f}"])
+        findings += len(resources)
+        if len(resources) > 0:
+            summary_data.append([service, len(resources), f"${service_total:.2f}"])
+
+    all_details = []
+    for cost, _, service, item in sorted(top, key=lambda entry: entry[:2], reverse=True):
+        row = [service, item.get('ID', 'N/A'), item.get('Reason', 'Unused'), f"${cost:.2f}"]
+        if has_actuals:
+            row.append("CUR" if 'ActualCost' in item else "estimate")
+        if group_by:
+            row.insert(1, get_tag(item, group_by))
+        all_details.append(row)
 
     print(Fore.YELLOW + "\n  SUMMARY" + Style.RESET_ALL)
     if summary_data:
@@ -31,11 +58,30 @@ def generate_dashboard(cloud_data):
     else:
         print(Fore.GREEN + "  No waste found." + Style.RESET_ALL)
 
+    if group_by and summary_data:
+        groups = group_by_tag(cloud_data, group_by)
+        tag_data = [[value, count, f"${cost:.2f}"] for value, (count, cost) in sorted(groups.items(), key=lambda g: g[1][1], reverse=True)]
+        print(Fore.YELLOW + f"\n  BY TAG: {group_by}" + Style.RESET_ALL)
+        print(tabulate(tag_data, headers=[group_by, "Count", "Monthly Waste"], tablefmt="fancy_grid"))
+
     if all_details:
-        print(Fore.YELLOW + "\n DETAILED FINDINGS" + Style.RESET_ALL)
-        all_details.sort(key=lambda x: float(x[3].replace('$', '')), reverse=True)
-        print(tabulate(all_details, headers=["Service", "Resource ID", "Reason", "Est. Cost"], tablefmt="simple"))
+        shown = f" (costliest {DETAIL_ROWS} of {findings})" if findings > DETAIL_ROWS else ""
+        print(Fore.YELLOW + "\n DETAILED FINDINGS" + shown + Style.RESET_ALL)
+        headers = ["Service", "Resource ID", "Reason", "Monthly Cost" if has_actuals else "Est. Cost"]
+        if group_by:
+            headers.insert(1, group_by)
+        if has_actuals:
+            headers.append("Source")
+        print(tabulate(all_details, headers=headers, tablefmt="simple"))
+
+    clusters, double_counted = correlate(cloud_data)
+    if clusters:
+        print(Fore.YELLOW + "\n COST CLUSTERS (related findings, each resource counted once)" + Style.RESET_ALL)
+        cluster_rows = [[c['ID'], c['Reason'], f"${c['Cost']:.2f}"] for c in clusters]
+        print(tabulate(cluster_rows, headers=["Anchor", "Cluster", "Combined Cost"], tablefmt="simple"))
 
     print(Style.BRIGHT + "\n" + "-"*60)
-    print(f" TOTAL POTENTIAL SAVINGS: ${grand_total:.2f} / month")
+    if double_counted > 0.005:
+        print(f" (Removed ${double_counted:.2f} counted by more than one scanner)")
+    print(f" TOTAL POTENTIAL SAVINGS: ${grand_total - double_counted:.2f} / month")
     print("-"*60 + "\n")
\ No newline at end of file
@@ -0,0 +1,53 @@
+import argparse
+import time
+
+from services.cache import ResponseCache
+from services.clients import configure_cache
+from services.cw_cache import MetricSeriesCache, configure_series_cache
+from services.metrics import serve_metrics
+from services.registry import SCANNERS_BY_KEY, select_scanners
+from services.results import save_results
+from services.runner import merge_results, run_scans
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve waste and scanner metrics on /metrics for Prometheus.")
+    parser.add_argument('--port', type=int, default=9108)
+    parser.add_argument('--region', action='append', default=[], help="Region to scan (repeatable, default ap-south-1)")
+    parser.add_argument('--only', metavar='SCANNER', action='append', default=[],
+                        help=f"Run only these scanners (repeatable or comma-separated): {', '.join(SCANNERS_BY_KEY)}")
+    parser.add_argument('--interval', type=int, default=3600, help="Seconds between scans")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    regions = args.region or ['ap-south-1']
+    only = [key.strip() for value in args.only for key in value.split(',') if key.strip()]
+    specs = select_scanners(only)
+    configure_cache(ResponseCache())
+    configure_series_cache(MetricSeriesCache())
+
+    # Scrapes read whatever the last scans recorded; they never start or wait for one
+    serve_metrics(args.port)
+    print(f"\n Serving metrics on :{args.port}/metrics (scanning every {args.interval}s)")
+
+    while True:
+        started = time.time()
+        results = []
+        errors = {}  # label -> errors, for scanners whose findings are incomplete
+        for region in regions:
+            print(f"   ... Scanning {region}")
+            try:
+                results.append(run_scans(specs, region, errors=errors))
+            except Exception as e:
+                # Keep serving the last good values; the next interval retries
+                print(f"  Error scanning {region}: {e}")
+        if errors:
+            print(f"  {len(errors)} scanners hit errors ({', '.join(errors)}); saved results left as they were")
+        # run_scans turns scanner failures into errors, so a clean run of every region and scanner
+        # is the only one that replaces what api.py serves
+        if len(results) == len(regions) and not errors and not only:
+            save_results(merge_results(results), regions=regions)
+        time.sleep(max(0, args.interval - (time.time() - started)))
+
+if __name__ == "__main__":
+    main()
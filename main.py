@@ -1,80 +1,155 @@
-import boto3
-from dashboard import generate_dashboard
-
-from services.vpc import scan_vpc
-from services.ebs import scan_ebs
-from services.elastic_ip import scan_eip
-from services.alb import scan_alb
-from services.snapshot import scan_snapshots
-from services.rds import scan_rds
-from services.nat_gateway import scan_nat
-from services.s3 import scan_s3
-from services.ec2 import scan_ec2
-from services.eks import scan_eks
+import argparse
+import time
+
+from services.cache import ResponseCache
+from services.checkpoint import Checkpoint
+from services.clients import configure_cache
+from services.cw_cache import MetricSeriesCache, configure_series_cache
+from services.inventory import Inventory
+from services.registry import SCANNERS_BY_KEY, select_scanners
+from services.results import save_results
+from services.runner import merge_results, run_scans
+from services.spill import MemoryBudget, peak_rss_mb
+from services.tags import filter_by_tags
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scan an AWS account for idle and unused resources.")
+    parser.add_argument('--region', default='ap-south-1', help="Region to scan (comma-separated for several)")
+    parser.add_argument('--engine', choices=('threads', 'async'), default='threads',
+                        help="'async' drives every AWS call from one event loop, for wide multi-region scans (needs aiobotocore)")
+    parser.add_argument('--only', metavar='SCANNER', action='append', default=[],
+                        help=f"Run only these scanners (repeatable or comma-separated): {', '.join(SCANNERS_BY_KEY)}")
+    parser.add_argument('--group-by', metavar='TAG', help="Summarise waste by this tag key (e.g. Owner, team)")
+    parser.add_argument('--tag', metavar='KEY=VALUE', action='append', default=[],
+                        help="Only report findings with this tag (repeatable)")
+    parser.add_argument('--plan', metavar='PATH', help="Write a remediation plan for the findings (apply with remediate.py)")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore cached API responses (fresh entries are still saved)")
+    parser.add_argument('--no-resume', action='store_true', help="Start over instead of resuming an interrupted scan")
+    parser.add_argument('--memory-budget', metavar='MB', type=int,
+                        help="Keep inventory and findings beyond this many MB on disk instead of in memory")
+    parser.add_argument('--rules', metavar='PATH', help="Judge resources with this rule file (.toml/.yaml) instead of the built-in thresholds")
+    parser.add_argument('--save-inventory', metavar='PATH', help="Save every scanned resource, so rules can be re-run without scanning")
+    parser.add_argument('--inventory', metavar='PATH', help="Evaluate --rules against a saved inventory instead of scanning")
+    parser.add_argument('--analysis-workers', metavar='N', type=int,
+                        help="Processes evaluating --rules (default: one per CPU; 1 evaluates in this process)")
+    parser.add_argument('--cur', metavar='PATH', action='append', default=[],
+                        help="Replace estimates with last month's actual spend from Cost and Usage Report files/folders (repeatable)")
+    parser.add_argument('--cur-period', metavar='YYYY-MM',
+                        help="Billing period of --cur to use (default: the latest closed one)")
+    parser.add_argument('--s3-inventory', metavar='MANIFEST', action='append', default=[],
+                        help="Add lifecycle candidates from a local S3 Inventory manifest.json (repeatable; see s3_inventory.py)")
+    args = parser.parse_args()
+    if args.inventory and not args.rules:
+        parser.error("--inventory requires --rules")
+    if any('=' not in f for f in args.tag):
+        parser.error("--tag must be KEY=VALUE")
+    return args
+
+def _report_memory(budget):
+    peak = peak_rss_mb()
+    if peak is None:
+        return
+    line = f"   ... Peak memory: {peak:,.0f} MB"
+    if budget:
+        line += f" (budget {budget.limit / 1024 ** 2:,.0f} MB, {budget.spilled:,} rows on disk)"
+    print(line)
 
 def main():
-    region = 'ap-south-1'
-    
+    args = parse_args()
+    region = args.region
+    regions = [r.strip() for r in region.split(',') if r.strip()]
+    tag_filters = dict(f.split('=', 1) for f in args.tag)
+    only = [key.strip() for value in args.only for key in value.split(',') if key.strip()]
+
     print(f"\n Connecting to AWS ({region})... This may take a moment...")
 
     try:
-     
-        
-        ec2 = boto3.client('ec2', region_name=region)
-        elb = boto3.client('elbv2', region_name=region)
-        cw = boto3.client('cloudwatch', region_name=region)
-        rds = boto3.client('rds', region_name=region)
-        s3 = boto3.client('s3', region_name=region)
-        s3 = boto3.client('s3', region_name=region)
-        eks = boto3.client('eks', region_name=region)
-
-    
-        print("   ... Scanning EBS Volumes")
-        ebs_data = scan_ebs(ec2)
-        
-        print("   ... Scanning Elastic IPs")
-        eip_data = scan_eip(ec2)
-        
-        print("   ... Scanning Load Balancers")
-        alb_data = scan_alb(elb, cw)
-        
-        print("   ... Scanning NAT Gateways")
-        nat_data = scan_nat(ec2, cw)
-        
-        print("   ... Scanning Snapshots")
-        snap_data = scan_snapshots(ec2)
-        
-        print("   ... Scanning RDS")
-        rds_data = scan_rds(rds)
-        
-        print("   ... Scanning S3")
-        s3_data = scan_s3(s3)
-        
-        print("   ... Scanning EC2 ")
-        ec2_data = scan_ec2(ec2, cw)
-
-        print("   ... Scanning EKS Clusters") 
-        eks_data = scan_eks(eks)
-
-        print("   ... Scanning VPCs & Public IPs")
-        vpc_data = scan_vpc(ec2)
-
-      
-        cloud_data = {
-            'EBS Volumes': ebs_data,
-            'Elastic IPs': eip_data,
-            'Load Balancers': alb_data,
-            'NAT Gateways': nat_data,
-            'Snapshots': snap_data,
-            'RDS Instances': rds_data,
-            'S3 Buckets': s3_data,
-            'EC2 Instances': ec2_data,
-            'EKS Clusters' :eks_data,
-            'VPC & Public IPs': vpc_data
-        }
-
-    
-        generate_dashboard(cloud_data)
+        specs = select_scanners(only)
+        cache = ResponseCache(bypass=args.no_cache)
+        configure_cache(cache)
+        configure_series_cache(MetricSeriesCache(bypass=args.no_cache))
+
+        checkpoint = None
+        scan_errors = {}  # label -> errors, for scanners whose findings are incomplete
+        budget = MemoryBudget(args.memory_budget) if args.memory_budget else None
+        analysis = None
+        if args.rules:
+            from services.analysis import AnalysisPool
+            from services.rules import RuleSet
+            # Rules are evaluated in worker processes, each scanner's rows as soon as it finishes
+            analysis = AnalysisPool(RuleSet.load(args.rules), workers=args.analysis_workers)
+        if args.inventory:
+            inventory = Inventory.load(args.inventory)
+            analysis.submit_inventory(inventory)
+            cloud_data = {}
+        else:
+            inventory = Inventory(budget) if args.rules or args.save_inventory else None
+            # Progress survives a crash or Ctrl-C; the same command picks up where it stopped
+            checkpoint = Checkpoint({'scanners': [s.key for s in specs], 'region': region, 'inventory': inventory is not None},
+                                    fresh=args.no_resume)
+            if checkpoint.completed_units():
+                print(f"   ... Resuming: {checkpoint.completed_units()} scanners already done ({checkpoint.path})")
+            options = dict(progress=print, inventory=inventory, checkpoint=checkpoint, budget=budget, analysis=analysis,
+                           errors=scan_errors)
+            if args.engine == 'async':
+                from services.aio import AsyncEngine
+                with AsyncEngine() as engine:
+                    cloud_data = engine.run_scans(specs, regions, **options)
+                    print(f"   ... Async engine: {len(engine.clients)} clients, peak {engine.peak_in_flight} requests in flight")
+            else:
+                cloud_data = merge_results([run_scans(specs, r, **options) for r in regions], budget)
+            print(f"   ... API cache: {cache.hits} hits, {cache.misses} misses")
+            _report_memory(budget)
+
+        if args.save_inventory:
+            inventory.save(args.save_inventory)
+            print(f"   ... Inventory saved -> {args.save_inventory}")
+
+        if analysis:
+            started = time.perf_counter()
+            # Rule findings replace the built-in ones for the services the rules cover
+            cloud_data.update(analysis.results(budget))
+            print(f"   ... {len(analysis.rules.rules)} rules evaluated over {analysis.batches} batches "
+                  f"({(time.perf_counter() - started) * 1000:.1f} ms after the scan)")
+
+        if args.s3_inventory:
+            from services.s3_inventory import read_inventories
+            report = read_inventories(args.s3_inventory, progress=print)
+            cloud_data['S3 Cold Data'] = report.findings()
+
+        if args.cur:
+            from services.cur import apply_actual_costs
+            matched = apply_actual_costs(cloud_data, args.cur, progress=print, period=args.cur_period)
+            print(f"   ... {matched} findings priced from the CUR")
+
+        if budget:
+            cloud_data = budget.adopt(cloud_data)
+        if only or args.inventory:
+            # api.py serves the latest full scan; a subset of scanners would replace it with less
+            print("   ... Partial scan (--only/--inventory): saved results left as they were")
+        elif scan_errors:
+            # Degraded scanners' findings are incomplete; they must not replace the last good scan
+            print(f"   ... {len(scan_errors)} scanners hit errors ({', '.join(scan_errors)}): saved results left as they were")
+        else:
+            # Unfiltered: api.py filters per request
+            save_results(cloud_data, regions=regions, rules=args.rules)
+        cloud_data = filter_by_tags(cloud_data, tag_filters)
+
+        # Terminal UI libraries are only needed once there is something to print
+        from dashboard import generate_dashboard
+        generate_dashboard(cloud_data, group_by=args.group_by)
+
+        if args.plan:
+            from services.remediation import build_plan, write_plan
+            plan = build_plan(cloud_data, degraded=scan_errors)
+            write_plan(plan, args.plan)
+            print(f" Remediation plan: {len(plan['actions'])} actions (${plan['monthly_savings']:.2f}/month) -> {args.plan}")
+            if plan['skipped_services']:
+                print(f" Not planned (scan incomplete, re-run to include): {', '.join(plan['skipped_services'])}")
+
+        # The report is out: the next run is a fresh scan
+        if checkpoint:
+            checkpoint.clear()
 
     except Exception as e:
         print(f"\n CRITICAL ERROR IN MAIN: {e}")
@@ -82,4 +157,4 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
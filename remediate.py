@@ -0,0 +1,32 @@
+import argparse
+
+from services.remediation import RemediationExecutor, read_plan
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply a remediation plan written by `main.py --plan`.")
+    parser.add_argument('plan', help="Plan file (review and trim it before applying)")
+    parser.add_argument('--dry-run', action='store_true', help="Call every API with DryRun=True to check permissions")
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--log', help="Progress log used to resume (default: <plan>.log.jsonl)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    plan = read_plan(args.plan)
+    log_path = args.log or f"{args.plan}.log.jsonl"
+
+    mode = "DRY RUN" if args.dry_run else "DELETING"
+    print(f"\n {mode}: {len(plan['actions'])} actions from {args.plan} (progress log: {log_path})")
+
+    executor = RemediationExecutor(plan, log_path, workers=args.workers, dry_run=args.dry_run)
+    counts = executor.run()
+
+    print("\n" + "-"*60)
+    for status, count in sorted(counts.items()):
+        print(f" {status}: {count}")
+    if counts.get('failed'):
+        print(f" See {log_path} for errors; re-run the same command to retry and resume.")
+    print("-"*60 + "\n")
+
+if __name__ == "__main__":
+    main()
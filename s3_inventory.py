@@ -0,0 +1,49 @@
+import argparse
+
+from tabulate import tabulate
+from services.s3_inventory import AGE_LABELS, read_inventories
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyse local S3 Inventory reports (size by class, age, cold data).")
+    parser.add_argument('manifest', nargs='+', help="manifest.json of each inventory report (data files are found next to it)")
+    parser.add_argument('--prefix-depth', type=int, default=1, help="Key prefix levels to break buckets down by")
+    parser.add_argument('--cold-days', type=int, default=90, help="Objects untouched this long are transition candidates")
+    parser.add_argument('--target', default='STANDARD_IA', help="Storage class to price transitions into")
+    parser.add_argument('--workers', type=int, help="Processes (default: one per CPU)")
+    parser.add_argument('--top', type=int, default=25, help="Rows to show in the prefix and candidate tables")
+    return parser.parse_args()
+
+def _gb(size):
+    return f"{size / 1024 ** 3:,.1f}"
+
+def main():
+    args = parse_args()
+    report = read_inventories(args.manifest, workers=args.workers, prefix_depth=args.prefix_depth,
+                              cold_days=args.cold_days, progress=print)
+    print(f"\n {report.rows:,} objects read\n")
+
+    rows = []
+    for bucket, classes in sorted(report.by_bucket().items()):
+        for storage_class, (count, size) in sorted(classes.items(), key=lambda c: -c[1][1]):
+            rows.append([bucket, storage_class, f"{count:,}", _gb(size)])
+    print(" SIZE BY BUCKET & STORAGE CLASS")
+    print(tabulate(rows, headers=["Bucket", "Class", "Objects", "GB"], tablefmt="simple"))
+
+    prefixes = sorted(report.by_prefix().items(), key=lambda p: -sum(s for _, s in p[1].values()))[:args.top]
+    rows = [[bucket, prefix, ", ".join(f"{c} {_gb(s)}" for c, (_, s) in sorted(classes.items())), _gb(sum(s for _, s in classes.values()))]
+            for (bucket, prefix), classes in prefixes]
+    print(f"\n TOP {args.top} PREFIXES")
+    print(tabulate(rows, headers=["Bucket", "Prefix", "GB by class", "GB"], tablefmt="simple"))
+
+    rows = [[bucket] + [_gb(size) for _, size in ages] for bucket, ages in sorted(report.age_distribution().items())]
+    print("\n GB BY LAST MODIFIED")
+    print(tabulate(rows, headers=["Bucket"] + list(AGE_LABELS), tablefmt="simple"))
+
+    candidates = report.cold_candidates(args.target)
+    rows = [[c['bucket'], c['prefix'], f"{c['objects']:,}", _gb(c['bytes']), f"${c['monthly_savings']:,.2f}"] for c in candidates[:args.top]]
+    print(f"\n LIFECYCLE CANDIDATES (untouched {args.cold_days}+ days -> {args.target})")
+    print(tabulate(rows, headers=["Bucket", "Prefix", "Objects", "GB", "Monthly Saving"], tablefmt="simple"))
+    print(f"\n Total: ${sum(c['monthly_savings'] for c in candidates):,.2f} / month\n")
+
+if __name__ == "__main__":
+    main()
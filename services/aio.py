@@ -0,0 +1,175 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from services.clients import CLIENT_CONFIG, get_account_id, get_response_cache
+from services.metrics import instrument_client
+from services.runner import merge_results, run_scans
+
+# Alternative engine for very wide scans (many regions at once). Scanners run unchanged, but
+# every AWS call they make becomes a coroutine on one asyncio loop with aiobotocore clients:
+# sockets, TLS and response parsing live there, each (service, region) has a semaphore
+# sized to its throttling budget, and scanner threads only park while their call is in flight.
+# Per-resource fan-outs (services.clients.call_all) are gathered on the loop as one batch, so
+# requests in flight are bounded by the semaphores, not by how many threads are waiting.
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # Optional: only the async engine needs it
+    get_session = None
+
+# Requests in flight per (service, region)
+LIMITS = {
+    'ec2': 100,
+    'cloudwatch': 50,
+    's3': 200,
+    'elbv2': 50,
+    'eks': 50,
+    'rds': 50,
+}
+DEFAULT_LIMIT = 64
+
+class SyncPaginator:
+    def __init__(self, engine, key, paginator):
+        self.engine = engine
+        self.key = key
+        self.paginator = paginator
+
+    def paginate(self, **kwargs):
+        pages = self.paginator.paginate(**kwargs).__aiter__()
+        while True:
+            try:
+                page = self.engine.call(self.key, pages.__anext__)
+            except StopAsyncIteration:
+                return
+            yield page
+
+class SyncClient:
+    """Blocking view of an aiobotocore client, so scanner code runs on it unchanged."""
+    def __init__(self, engine, service, region, client):
+        self._engine = engine
+        self._key = (service, region)
+        self._client = client
+        self.meta = client.meta
+        self.exceptions = client.exceptions
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def call(*args, **kwargs):
+            return self._engine.call(self._key, lambda: method(*args, **kwargs))
+        return call
+
+    def can_paginate(self, operation):
+        return self._client.can_paginate(operation)
+
+    def get_paginator(self, operation):
+        return SyncPaginator(self._engine, self._key, self._client.get_paginator(operation))
+
+    def call_all(self, calls):
+        """See services.clients.call_all: every call is a coroutine, gathered on the engine's loop."""
+        return self._engine.gather(self._key, self._client, calls)
+
+class AsyncEngine:
+    def __init__(self, limits=None):
+        if get_session is None:
+            raise RuntimeError("The async engine needs aiobotocore (pip install aiobotocore)")
+        self.limits = dict(LIMITS, **(limits or {}))
+        self.session = get_session()
+        self.stack = AsyncExitStack()
+        self.clients = {}
+        self.semaphores = {}
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='aws-async', daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self, coroutine):
+        # Scheduled from the caller's context, so the task sees its contextvars (e.g. the cache bypass)
+        return contextvars.copy_context().run(asyncio.run_coroutine_threadsafe, coroutine, self.loop).result()
+
+    async def _create(self, service, region):
+        limit = self.limits.get(service, DEFAULT_LIMIT)
+        config = AioConfig(**dict(CLIENT_CONFIG.get(service, {}), max_pool_connections=limit))
+        client = await self.stack.enter_async_context(self.session.create_client(service, region_name=region, config=config))
+        # Same botocore events as the threaded clients (services/clients.py)
+        instrument_client(client)
+        cache = get_response_cache()
+        if cache is not None:
+            cache.attach(client, region, lambda: get_account_id(region))
+        self.semaphores[(service, region)] = asyncio.Semaphore(limit)
+        return client
+
+    def client(self, service, region):
+        """Client factory for run_scans (same signature as services.clients.get_client)."""
+        key = (service, region)
+        with self.lock:
+            if key not in self.clients:
+                self.clients[key] = SyncClient(self, service, region, self._run(self._create(service, region)))
+            return self.clients[key]
+
+    async def _throttled(self, key, make_call):
+        # Runs on the loop thread only, so the counters need no lock
+        async with self.semaphores[key]:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return await make_call()
+            finally:
+                self.in_flight -= 1
+
+    def call(self, key, make_call):
+        """Runs `make_call()` (returning an awaitable) on the loop and waits for its result."""
+        return self._run(self._throttled(key, make_call))
+
+    async def _pages(self, key, client, operation, params, on_page=None):
+        # Every page waits its turn on the semaphore, so a long chain doesn't hold a slot between pages
+        if client.can_paginate(operation):
+            next_page = client.get_paginator(operation).paginate(**params).__aiter__().__anext__
+        else:
+            method = getattr(client, operation)
+            remaining = [lambda: method(**params)]
+            async def next_page():
+                if not remaining:
+                    raise StopAsyncIteration
+                return await remaining.pop()()
+        collected = []
+        while True:
+            try:
+                page = await self._throttled(key, next_page)
+            except StopAsyncIteration:
+                return collected
+            collected.append(page)
+            if on_page:
+                on_page(page)
+
+    async def _gather(self, key, client, calls):
+        return await asyncio.gather(*(self._pages(key, client, *call) for call in calls), return_exceptions=True)
+
+    def gather(self, key, client, calls):
+        """Makes `calls` (see services.clients.call_all) concurrently on the loop and waits for all of them."""
+        return self._run(self._gather(key, client, calls))
+
+    def run_scans(self, specs, regions, **kwargs):
+        """Scans all regions at once (see services.runner.run_scans); returns {label: findings} across them."""
+        with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+            futures = [executor.submit(run_scans, specs, region, max_workers=len(specs), clients=self.client, **kwargs)
+                       for region in regions]
+            return merge_results([f.result() for f in futures], kwargs.get('budget'))
+
+    def close(self):
+        if self.loop.is_running():
+            self._run(self.stack.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
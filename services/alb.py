@@ -1,50 +1,152 @@
-import boto3
-from datetime import datetime, timedelta
+import time
+from services.clients import call_all
+from services.cw_cache import get_metric_series_many
+from services.pricing import PRICING
+from services.scan_errors import report_error
 
+# Load balancers (ALB and NLB) are indexed LB -> listeners -> target groups -> targets from a
+# handful of paginated sweeps. One with no listeners, or whose target groups hold no healthy
+# target, can't be serving anything; CloudWatch is only asked about the rest. A load balancer
+# whose listeners or target health couldn't be read, or whose targets can't be health-checked
+# (Lambda targets, checks disabled), is unknown structurally: only its traffic can flag it.
+
+LOOKBACK = 7 * 86400
+# Target health states that say nothing about whether the target serves: Lambda targets with
+# health checks off, and targets of groups whose health checks are disabled, report 'unavailable'
+UNKNOWN_STATES = ('unavailable',)
+
+# Load balancer type -> (short name, metric namespace, traffic metric)
+TYPES = {
+    'application': ('ALB', 'AWS/ApplicationELB', 'RequestCount'),
+    'network': ('NLB', 'AWS/NetworkELB', 'NewFlowCount'),
+}
 
 class ALBScanner():
-    def __init__(self, elb_client, cw_client):
+    def __init__(self, elb_client, cw_client, inventory=None, max_workers=16):
         self.client = elb_client
         self.cw_client = cw_client
+        self.inventory = inventory
+        self.max_workers = max_workers
+
+    def _paginate(self, operation, key, **params):
+        return [item for page in self.client.get_paginator(operation).paginate(**params) for item in page.get(key, [])]
+
+    def _traffic(self, lbs):
+        """Returns {LB ARN: (requests in 7 days, requests in the last day)}, all LBs fetched at once."""
+        queries = {}
+        for lb in lbs:
+            # Dimension is the ARN suffix, e.g. app/my-alb/50dc6c495c0c9188
+            _, namespace, metric = TYPES[lb['Type']]
+            dimensions = [{'Name': 'LoadBalancer', 'Value': lb['LoadBalancerArn'].split(':loadbalancer/')[-1]}]
+            queries[lb['LoadBalancerArn']] = (namespace, metric, dimensions, 'Sum')
+
+        traffic = {}
+        # The last 24 hours up to now, not up to the last datapoint: a quiet LB has no recent datapoints
+        last_day = time.time() - 86400
+        for arn, series in get_metric_series_many(self.cw_client, queries, LOOKBACK).items():
+            if isinstance(series, Exception):
+                # Left out: no traffic figure, so no idle verdict
+                report_error(f"Error reading traffic of {arn.split('/')[-2]}: {series}")
+                continue
+            timestamps, hourly = series
+            traffic[arn] = (sum(hourly), sum(v for ts, v in zip(timestamps, hourly) if ts > last_day))
+        return traffic
+
+    def build_index(self):
+        """Returns {LB ARN: {"lb", "listeners", "target_groups": {TG ARN: [target health]}, "unknown"}}.
+
+        `listeners` is None if they couldn't be listed; `unknown` counts target groups whose health
+        couldn't be read or can't be judged (Lambda targets).
+        """
+        lbs = [lb for lb in self._paginate('describe_load_balancers', 'LoadBalancers') if lb.get('Type') in TYPES]
+        index = {lb['LoadBalancerArn']: {"lb": lb, "listeners": [], "target_groups": {}, "unknown": 0} for lb in lbs}
+        if not index:
+            return index
+
+        # One sweep for every target group; each lists the LBs that route to it
+        groups = [tg for tg in self._paginate('describe_target_groups', 'TargetGroups')
+                  if any(arn in index for arn in tg.get('LoadBalancerArns', []))]
+        checked = [tg for tg in groups if tg.get('TargetType') != 'lambda']
+        for tg in groups:
+            if tg.get('TargetType') == 'lambda':
+                # A function is invoked per request; it has no health to be "unhealthy" by
+                for arn in tg['LoadBalancerArns']:
+                    if arn in index:
+                        index[arn]["unknown"] += 1
+
+        # Listeners of every LB and the health of every target group, all at once
+        calls = [('describe_listeners', {'LoadBalancerArn': arn}) for arn in index]
+        calls += [('describe_target_health', {'TargetGroupArn': tg['TargetGroupArn']}) for tg in checked]
+        results = call_all(self.client, calls, self.max_workers)
+        for arn, pages in zip(index, results):
+            if isinstance(pages, Exception):
+                report_error(f"Error listing listeners of {index[arn]['lb']['LoadBalancerName']}: {pages}")
+                index[arn]["listeners"] = None
+                continue
+            index[arn]["listeners"] = [listener for page in pages for listener in page.get('Listeners', [])]
+        for tg, pages in zip(checked, results[len(index):]):
+            if isinstance(pages, Exception):
+                report_error(f"Error reading target health of {tg.get('TargetGroupName', tg['TargetGroupArn'])}: {pages}")
+            for arn in tg.get('LoadBalancerArns', []):
+                if arn not in index:
+                    continue
+                if isinstance(pages, Exception):
+                    index[arn]["unknown"] += 1
+                else:
+                    index[arn]["target_groups"][tg['TargetGroupArn']] = pages[0].get('TargetHealthDescriptions', [])
+        return index
 
     def get_idle_albs(self):
-        # 1. Fetch all ALBs
-        response = self.client.describe_load_balancers()
-        albs = response.get('LoadBalancers', [])
+        index = self.build_index()
         idle_list = []
 
-        for alb in albs:
-            name = alb['LoadBalancerName']
-            # Extracting the correct suffix for ALB metrics
-            # Dimensions usually need the suffix part of the ARN
-            alb_id = alb['LoadBalancerArn'].split('/')[-3:]
-            dimension_value = f"{alb_id[0]}/{alb_id[1]}/{alb_id[2]}"
-
-            # 2. Fetch metrics from CloudWatch
-            metric_data = self.cw_client.get_metric_statistics(
-                Namespace='AWS/ApplicationELB',
-                MetricName='RequestCount',
-                Dimensions=[{'Name': 'LoadBalancer', 'Value': dimension_value}],
-                StartTime=datetime.utcnow() - timedelta(days=1), # Checking last 24h
-                EndTime=datetime.utcnow(),
-                Period=86400, # 24 hours
-                Statistics=['Sum']
-            )
-
-            # 3. Check if it's a "Zombie"
-            datapoints = metric_data.get('Datapoints', [])
-            
-            # If no traffic exists in 24 hours, it's idle
-            if not datapoints or datapoints[0].get('Sum', 0) == 0:
-                item = {
-                    "ID": alb['LoadBalancerArn'].split('/')[-1],
-                    "Name": name,
-                    "Cost": 18.25
-                }
-                idle_list.append(item)
+        # 1. Structural verdicts, no metrics needed
+        verdicts, ambiguous = {}, []
+        for arn, entry in index.items():
+            targets = [t for found in entry["target_groups"].values() for t in found]
+            states = [t.get('TargetHealth', {}).get('State') for t in targets]
+            healthy = states.count('healthy')
+            # None: can't tell whether anything healthy is behind it
+            if entry["unknown"] or (not healthy and any(state in UNKNOWN_STATES for state in states)):
+                healthy = None
+            if entry["listeners"] is not None and not entry["listeners"]:
+                verdicts[arn] = "No listeners"
+            elif entry["target_groups"] and healthy == 0:
+                verdicts[arn] = f"No healthy targets ({len(targets)} registered)"
+            else:
+                # Healthy targets, listeners that only redirect / return fixed responses, or unknown
+                ambiguous.append(arn)
+            entry.update(targets=len(targets), healthy=healthy)
+
+        # 2. Traffic, only for the load balancers that might be in use
+        traffic = self._traffic([index[arn]["lb"] for arn in ambiguous]) if ambiguous else {}
+
+        for arn, entry in index.items():
+            lb = entry["lb"]
+            kind = TYPES[lb['Type']][0]
+            cost = PRICING[kind.lower()]
+            requests_7d, requests_24h = traffic.get(arn, (None, None))
+            if arn not in verdicts and requests_7d == 0:
+                verdicts[arn] = f"Idle {kind} (no traffic in 7 days)"
+
+            if self.inventory is not None:
+                self.inventory.record('alb', {"id": arn.split('/')[-1], "arn": arn, "name": lb['LoadBalancerName'], "type": kind,
+                                              "listeners": len(entry["listeners"]) if entry["listeners"] is not None else None,
+                                              "target_groups": len(entry["target_groups"]) + entry["unknown"],
+                                              "targets": entry["targets"], "healthy_targets": entry["healthy"],
+                                              "requests_24h": requests_24h, "requests_7d": requests_7d, "monthly_cost": cost})
+
+            if arn in verdicts:
+                idle_list.append({
+                    "ID": arn.split('/')[-1],
+                    "ARN": arn,
+                    "Name": lb['LoadBalancerName'],
+                    "Reason": verdicts[arn],
+                    "Cost": cost
+                })
 
         return idle_list
 
-def scan_alb(elb_client, cw_client):
-    scanner = ALBScanner(elb_client, cw_client)
-    return scanner.get_idle_albs()
\ No newline at end of file
+def scan_alb(elb_client, cw_client, inventory=None):
+    scanner = ALBScanner(elb_client, cw_client, inventory)
+    return scanner.get_idle_albs()
@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# Rule evaluation (services/rules.py) moved off the scanning process: as each scanner finishes,
+# its inventory rows are cut into batches of columns ({column: values}, numbers packed into
+# arrays) and judged in worker processes while the other scanners are still fetching. Rows
+# are independent, so batches of any size give the same findings as one big evaluation.
+
+BATCH_ROWS = 50000
+# Below this, shipping a batch to another process costs more than evaluating it here
+INLINE_ROWS = 5000
+
+def to_columns(rows):
+    """Returns {column: values} for a list of row dicts (None where a row lacks a column)."""
+    names = {name for row in rows for name in row}
+    columns = {name: [] for name in names}
+    for row in rows:
+        for name, values in columns.items():
+            values.append(row.get(name))
+    for name, values in columns.items():
+        # bool is an int, but rules compare it as a flag: keep it a list
+        try:
+            if values and all(type(v) is int for v in values):
+                columns[name] = array('q', values)
+            elif values and all(type(v) is float for v in values):
+                columns[name] = array('d', values)
+        except OverflowError:
+            pass
+    return columns
+
+class ColumnBatch:
+    """Inventory stand-in over one batch of columns, for RuleSet.evaluate in a worker process."""
+    budget = None
+
+    def __init__(self, resource, columns):
+        self.resource = resource
+        self._columns = columns
+        self.size = len(next(iter(columns.values()), ()))
+        self.rows = {resource: _Rows(columns)}
+
+    def columns(self, resource):
+        return self._columns if resource == self.resource else {}
+
+    def count(self, resource):
+        return self.size if resource == self.resource else 0
+
+class _Rows:
+    # Row i rebuilt from the columns, only for the rows a rule flags
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __getitem__(self, index):
+        return {name: values[index] for name, values in self.columns.items() if values[index] is not None}
+
+def _evaluate(rules, resource, columns):
+    try:
+        return rules.evaluate(ColumnBatch(resource, columns))
+    finally:
+        # Tables are per batch; a cached one would also be pickled along with the next batch
+        rules.tables.clear()
+
+class AnalysisPool:
+    """Evaluates a RuleSet over inventory rows as they arrive, spread over worker processes."""
+    def __init__(self, rules, workers=None, batch_rows=BATCH_ROWS):
+        self.rules = rules
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_rows = batch_rows
+        self.executor = None
+        self.pending = []   # Futures or finished {service: findings}
+        self.batches = 0
+
+    def submit(self, resource, rows):
+        """Queues rows (a list or SpillList) of one resource type for evaluation."""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                self._submit(resource, batch)
+                batch = []
+        if batch:
+            self._submit(resource, batch)
+
+    def submit_inventory(self, inventory):
+        for resource, rows in inventory.rows.items():
+            if any(rule.resource == resource for rule in self.rules.rules):
+                self.submit(resource, rows)
+
+    def _submit(self, resource, rows):
+        self.batches += 1
+        columns = to_columns(rows)
+        if len(rows) < INLINE_ROWS or self.workers == 1:
+            self.pending.append(_evaluate(self.rules, resource, columns))
+            return
+        if self.executor is None:
+            # Scanner threads are still running: forking them mid-call isn't safe
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        self.pending.append(self.executor.submit(_evaluate, self.rules, resource, columns))
+
+    def results(self, budget=None):
+        """Waits for every batch and returns {service: findings}, like RuleSet.evaluate."""
+        findings = {service: budget.list(service) if budget else [] for service in self.rules.services}
+        try:
+            for result in self.pending:
+                if not isinstance(result, dict):
+                    result = result.result()
+                for service, items in result.items():
+                    findings[service].extend(items)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+            self.executor = None
+            self.pending = []
+        return findings
@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from services.registry import SCANNERS_BY_KEY
+from services.results import SORT_FIELDS, StaleCursor
+
+# Read-only JSON API over the latest completed scan (services/results.py):
+#   GET /api/summary                        totals per service
+#   GET /api/findings                       all findings; filter, sort and page with query parameters
+#   GET /api/services/<service>/findings    the same, for one service (label or scanner key)
+#   GET /api/resources/<id>                 every finding for one resource
+# Responses carry an ETag of the scan and request, so polling clients get a 304 until a new scan lands.
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+GZIP_MIN_BYTES = 1024
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _filters(query):
+    filters = {
+        'service': query.get('service', []),
+        'region': query.get('region', [None])[-1],
+        'account': query.get('account', [None])[-1],
+        'q': query.get('q', [None])[-1],
+        'tags': {},
+    }
+    for pair in query.get('tag', []):
+        if '=' not in pair:
+            raise ApiError(400, f"tag must be KEY=VALUE, got '{pair}'")
+        key, value = pair.split('=', 1)
+        filters['tags'][key] = value
+    if 'min_cost' in query:
+        try:
+            filters['min_cost'] = float(query['min_cost'][-1])
+        except ValueError:
+            raise ApiError(400, "min_cost must be a number")
+    return filters
+
+def _paging(query):
+    sort = query.get('sort', ['-Cost'])[-1]
+    if sort.lstrip('-') not in SORT_FIELDS:
+        raise ApiError(400, f"Unknown sort field '{sort.lstrip('-')}'. Choose from: {', '.join(SORT_FIELDS)}")
+    try:
+        limit = int(query.get('limit', [DEFAULT_LIMIT])[-1])
+    except ValueError:
+        raise ApiError(400, "limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(400, f"limit must be between 1 and {MAX_LIMIT}")
+    return sort, limit, query.get('cursor', [None])[-1]
+
+def _service(results, name):
+    if name in results.services:
+        return name
+    spec = SCANNERS_BY_KEY.get(name)
+    if spec is not None and spec.label in results.services:
+        return spec.label
+    raise ApiError(404, f"No service '{name}' in the latest scan")
+
+def _findings(results, query, service=None):
+    filters = _filters(query)
+    if service is not None:
+        filters['service'] = [service]
+    sort, limit, cursor = _paging(query)
+    try:
+        items, next_cursor, total = results.page(filters, sort, cursor, limit)
+    except StaleCursor as e:
+        raise ApiError(410, str(e))
+    return {'scan_id': results.scan_id, 'total': total, 'next_cursor': next_cursor, 'items': items}
+
+def handle(results, path, query):
+    """Returns the JSON document for one GET request, or raises ApiError."""
+    parts = [unquote(p) for p in path.strip('/').split('/')]
+    if parts[:1] != ['api']:
+        raise ApiError(404, f"Not found: {path}")
+    if results is None:
+        raise ApiError(503, "No completed scan yet")
+    if parts[1:] == ['summary']:
+        return results.summary()
+    if parts[1:] == ['findings']:
+        return _findings(results, query)
+    if len(parts) == 4 and parts[1] == 'services' and parts[3] == 'findings':
+        return _findings(results, query, service=_service(results, parts[2]))
+    if len(parts) == 3 and parts[1] == 'resources':
+        findings = results.lookup(parts[2])
+        if not findings:
+            raise ApiError(404, f"No finding for resource '{parts[2]}' in the latest scan")
+        return {'scan_id': results.scan_id, 'id': parts[2], 'findings': findings}
+    raise ApiError(404, f"Not found: {path}")
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    store = None  # ResultsStore, set by serve_api
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        results = self.store.get()
+        # The scan and the request determine the body; nothing else does
+        etag = f'"{results.scan_id if results else "none"}-{hashlib.sha1(self.path.encode()).hexdigest()[:16]}"'
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        try:
+            status, document = 200, handle(results, url.path, parse_qs(url.query))
+        except ApiError as e:
+            status, document = e.status, {'error': str(e)}
+        body = json.dumps(document, default=str).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Vary', 'Accept-Encoding')
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # Always revalidate; a 304 is cheap
+        if len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, 6)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_api(store, port, host=''):
+    """Serves the API from a daemon thread and returns the server."""
+    handler = type('ApiHandler', (_ApiHandler,), {'store': store})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
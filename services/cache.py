@@ -0,0 +1,116 @@
+import contextvars
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import zlib
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cost-optimizer', 'responses')
+
+# Seconds each operation's response stays fresh. Only these (read-only) operations are cached.
+TTLS = {
+    # EC2
+    'DescribeInstances': 300,
+    'DescribeVolumes': 600,
+    'DescribeNetworkInterfaces': 600,
+    'DescribeAddresses': 600,
+    'DescribeNatGateways': 900,
+    'DescribeVpcs': 1800,
+    'DescribeSnapshots': 1800,
+    # S3
+    'ListBuckets': 1800,
+    'ListObjectsV2': 3600,
+    # ELB / RDS / EKS
+    'DescribeLoadBalancers': 900,
+    'DescribeDBInstances': 900,
+    'ListClusters': 1800,
+    'DescribeCluster': 1800,
+    'ListNodegroups': 1800,
+    'DescribeNodegroup': 1800,
+    'ListFargateProfiles': 1800,
+    # Tagging
+    'GetResources': 1800,
+}
+
+# Per scan, not per cache: one process's caches serve scans with and without "fresh data only"
+# (web_app.py sessions). Set in each scanner thread by services/runner.py; call_all and the async
+# engine carry it along with the calls they make for it.
+_bypass = contextvars.ContextVar('cache_bypass', default=False)
+
+def use_cache_bypass(bypass):
+    _bypass.set(bypass)
+
+def cache_bypassed():
+    return _bypass.get()
+
+class _CachedHTTPResponse:
+    # botocore only checks the status code of the response a before-call handler returns
+    status_code = 200
+    headers = {}
+
+class ResponseCache:
+    def __init__(self, directory=CACHE_DIR, ttls=None, bypass=False):
+        self.directory = directory
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self.bypass = bypass    # Skip reads (still refreshes entries); use_cache_bypass does it per scan
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, client, region, account_fn):
+        """Hooks the cache into a boto3 client's event system."""
+        service = client.meta.service_model.service_id.hyphenize()
+
+        def build_key(params, model, context, **kwargs):
+            if model.name not in self.ttls:
+                return
+            normalized = json.dumps(params, sort_keys=True, default=str)
+            raw = f"{account_fn()}|{region}|{service}|{model.name}|{normalized}"
+            context['response_cache_key'] = hashlib.sha256(raw.encode()).hexdigest()
+
+        def load(model, context, **kwargs):
+            key = context.get('response_cache_key')
+            if not key or self.bypass or cache_bypassed():
+                return None
+            parsed = self._read(key, self.ttls[model.name])
+            if parsed is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            context['response_cache_hit'] = True
+            return _CachedHTTPResponse(), parsed
+
+        def store(http_response, parsed, context, **kwargs):
+            key = context.get('response_cache_key')
+            if key and not context.get('response_cache_hit') and http_response.status_code == 200:
+                self._write(key, parsed)
+
+        client.meta.events.register(f'before-parameter-build.{service}', build_key)
+        client.meta.events.register(f'before-call.{service}', load)
+        client.meta.events.register(f'after-call.{service}', store)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl.z')
+
+    def _read(self, key, ttl):
+        try:
+            with open(self._path(key), 'rb') as f:
+                stored_at, parsed = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, EOFError, pickle.UnpicklingError, zlib.error):
+            return None
+        if time.time() - stored_at > ttl:
+            return None
+        return parsed
+
+    def _write(self, key, parsed):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(pickle.dumps((time.time(), parsed)), 6))
+            # Atomic, so concurrent CLI runs / Streamlit sessions never read half a file
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"  Error writing response cache: {e}")
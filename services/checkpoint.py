@@ -0,0 +1,151 @@
+import contextvars
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from services.clients import get_account_id
+
+try:
+    import fcntl
+except ImportError:  # Windows: only sessions of one process take turns (see scan_lock)
+    fcntl = None
+
+# Durable progress of one scan, so an interrupted run resumes instead of starting over:
+#   units  - finished scanner x region x account runs, with their findings and inventory rows
+#   pages  - pages of listings still being walked (sharded or serial), with the NextToken after each
+# One SQLite file per scan signature (scanners, regions, options); deleted once the report is out.
+
+CHECKPOINT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cost-optimizer', 'checkpoints')
+
+# The checkpoint of the scan running on this thread (set per scanner by services/runner.py)
+_current = contextvars.ContextVar('checkpoint', default=None)
+
+def current_checkpoint():
+    return _current.get()
+
+def use_checkpoint(checkpoint):
+    _current.set(checkpoint)
+
+def _key(signature):
+    return hashlib.sha256(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def _remove(path):
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+_scan_locks = {}
+_scan_locks_guard = threading.Lock()
+
+@contextmanager
+def scan_lock(signature, directory=CHECKPOINT_DIR):
+    """Held while a scan opens, runs and clears its checkpoint, so concurrent runs of the same scan
+    (web_app.py sessions, in one process or several) take turns instead of clearing it under each other."""
+    key = _key(signature)
+    with _scan_locks_guard:
+        thread_lock = _scan_locks.setdefault(key, threading.Lock())
+    with thread_lock:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{key}.lock"), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # Released when the file is closed
+            yield
+
+def sweep(directory=CHECKPOINT_DIR, max_age=86400):
+    """Deletes checkpoints not written to for `max_age` seconds (scans that died and were never re-run);
+    returns how many."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for name in names:
+        if not name.endswith('.sqlite'):
+            continue
+        path = os.path.join(directory, name)
+        # Writes land in the WAL until SQLite checkpoints it into the main file
+        mtimes = [os.path.getmtime(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix)]
+        if mtimes and time.time() - max(mtimes) > max_age:
+            _remove(path)
+            removed += 1
+    return removed
+
+def _pack(value):
+    return zlib.compress(pickle.dumps(value), 6)
+
+def _unpack(blob):
+    return pickle.loads(zlib.decompress(blob))
+
+class Checkpoint:
+    def __init__(self, signature, directory=CHECKPOINT_DIR, max_age=86400, fresh=False):
+        """`signature` identifies the scan (e.g. its scanners and regions); checkpoints older than `max_age`
+        seconds, or any existing one if `fresh`, are discarded."""
+        self.path = os.path.join(directory, f"{_key(signature)}.sqlite")
+        self.db = None
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path) and (fresh or time.time() - os.path.getmtime(self.path) > max_age):
+            self.clear()
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS units (
+            scanner TEXT, region TEXT, account TEXT, finished REAL, findings BLOB, inventory BLOB,
+            PRIMARY KEY (scanner, region, account))""")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS pages (
+            listing TEXT, page INTEGER, token TEXT, items BLOB, PRIMARY KEY (listing, page))""")
+
+    def completed_units(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+
+    def unit(self, scanner, region, account):
+        """Returns (findings, inventory rows) of a finished unit, or None."""
+        with self.lock:
+            row = self.db.execute("SELECT findings, inventory FROM units WHERE scanner=? AND region=? AND account=?",
+                                  (scanner, region, account)).fetchone()
+        if row is None:
+            return None
+        return _unpack(row[0]), _unpack(row[1]) if row[1] else None
+
+    def finish(self, scanner, region, account, findings, inventory=None):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?)",
+                            (scanner, region, account, time.time(), _pack(findings),
+                             _pack(inventory) if inventory is not None else None))
+
+    def listing(self, client, operation, params):
+        """Stable key of one paginated listing (account, region, operation, filters)."""
+        region = client.meta.region_name
+        params = {k: v for k, v in params.items() if k != 'PaginationConfig'}
+        raw = f"{get_account_id(region)}|{region}|{operation}|{json.dumps(params, sort_keys=True, default=str)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def pages(self, listing):
+        """Returns (items so far, NextToken to continue from, pages saved) for a listing."""
+        with self.lock:
+            rows = self.db.execute("SELECT token, items FROM pages WHERE listing=? ORDER BY page", (listing,)).fetchall()
+        items = []
+        for _, blob in rows:
+            items.extend(_unpack(blob))
+        return items, rows[-1][0] if rows else None, len(rows)
+
+    def save_page(self, listing, page, token, items):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (listing, page, token, _pack(items)))
+
+    def clear(self):
+        """Deletes the checkpoint (call once the report is finalized)."""
+        if self.db is not None:
+            with self.lock:
+                self.db.close()
+            self.db = None
+        _remove(self.path)
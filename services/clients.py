@@ -0,0 +1,104 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from services.metrics import instrument_client
+
+# Per-service botocore settings
+CLIENT_CONFIG = {
+    # EKS deep scan fans out ~4 calls per cluster; size the pool to match
+    'eks': {'max_pool_connections': 32},
+    # Remediation runs 16 workers against EC2 by default
+    'ec2': {'max_pool_connections': 32},
+}
+
+# Resources per call_all / get_metric_series_many batch in per-resource scanner loops: enough to
+# keep the pool (or the async engine's semaphores) busy, few enough that one batch's responses
+# are all that's held at once
+FAN_OUT_BATCH = 500
+
+_clients = {}
+_lock = threading.Lock()
+_response_cache = None
+
+def configure_cache(cache):
+    """Sets the ResponseCache used by clients created from now on (None disables caching)."""
+    global _response_cache
+    _response_cache = cache
+
+def get_response_cache():
+    return _response_cache
+
+def get_client(service, region):
+    """Returns a shared boto3 client, importing boto3 on first use."""
+    key = (service, region)
+    # boto3's default session isn't thread-safe for client creation
+    with _lock:
+        if key not in _clients:
+            import boto3
+            from botocore.config import Config
+            client = boto3.client(service, region_name=region, config=Config(**CLIENT_CONFIG.get(service, {})))
+            instrument_client(client)
+            if _response_cache is not None:
+                _response_cache.attach(client, region, lambda: get_account_id(region))
+            _clients[key] = client
+        return _clients[key]
+
+_accounts = {}
+
+def get_account_id(region):
+    """Returns the account ID of the current credentials ('unknown' if STS is unreachable)."""
+    if region not in _accounts:
+        try:
+            _accounts[region] = get_client('sts', region).get_caller_identity()['Account']
+        except Exception as e:
+            print(f"  Error resolving account ID: {e}")
+            _accounts[region] = 'unknown'
+    return _accounts[region]
+
+def _pages(client, operation, params, on_page=None):
+    if client.can_paginate(operation):
+        pages = client.get_paginator(operation).paginate(**params)
+    else:
+        pages = [getattr(client, operation)(**params)]
+    collected = []
+    for page in pages:
+        collected.append(page)
+        if on_page:
+            on_page(page)
+    return collected
+
+def _attempt(client, call):
+    try:
+        return _pages(client, *call)
+    except Exception as e:
+        return e
+
+def call_all(client, calls, max_workers=16):
+    """Makes independent calls at once; returns, per call, the list of its response pages (one page for
+    operations that don't paginate) or the exception it raised.
+
+    `calls` are (operation, params) or (operation, params, on_page) tuples; `on_page(page)` runs as each
+    page lands. Clients of the async engine (services/aio.py) make them all as coroutines on its loop,
+    so no thread is held per call; boto3 clients share a thread pool.
+    """
+    if not calls:
+        return []
+    if hasattr(type(client), 'call_all'):
+        return client.call_all(calls)
+    if len(calls) == 1:
+        return [_attempt(client, calls[0])]
+    # Captured here, on the caller's thread: pool threads see its checkpoint, error log and cache bypass
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+        futures = [executor.submit(context.copy().run, _attempt, client, call) for call in calls]
+        return [future.result() for future in futures]
+
+def batched(items, size=FAN_OUT_BATCH):
+    """Yields lists of up to `size` items, consuming `items` lazily."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,124 @@
+from services.cur import PARTIAL_SERVICES
+
+# Joins findings from different scanners that describe the same workload, in one linear pass.
+#
+# Every finding "owns" its ID (and public IP, if any) and references the resources it belongs to or
+# holds through the link fields below: an instance's volumes and ENIs, the instance an ENI's public
+# IP is attached to, the EIPs of a NAT gateway. A finding only joins the finding that owns a key it
+# references, and findings owning the same key (e.g. an EIP and the ENI-level public IP) are the
+# same resource counted twice. Lineage (the snapshot a volume was created from, the volume a
+# snapshot was taken of) isn't ownership: one AMI snapshot would join every volume launched from it.
+# Findings whose Cost is a saving on part of a resource (rightsizing) aren't resources' spend, and
+# are left out.
+
+LINK_FIELDS = ('InstanceId', 'NetworkInterfaceId', 'AllocationId', 'VpcId')
+LIST_LINK_FIELDS = ('VolumeIds', 'NetworkInterfaceIds', 'AllocationIds')
+
+def _slim(item):
+    # Only what correlation reads, so findings streamed from disk (services/spill.py) aren't all held at once
+    return {k: item[k] for k in ('ID', 'Public IP', 'Cost') + LINK_FIELDS + LIST_LINK_FIELDS if item.get(k) is not None}
+
+def _identity(item):
+    # A public IP is billed once, whether it shows up as an EIP or on an ENI
+    return item.get('Public IP') or item.get('ID')
+
+def _owned_keys(item):
+    return [k for k in (item.get('ID'), item.get('Public IP')) if k]
+
+def _referenced_keys(item):
+    for field in LINK_FIELDS:
+        if item.get(field):
+            yield item[field]
+    for field in LIST_LINK_FIELDS:
+        yield from item.get(field) or []
+
+def _describe(members):
+    counts = {}
+    for service, _ in members:
+        counts[service] = counts.get(service, 0) + 1
+    return " + ".join(f"{n} {service}" for service, n in sorted(counts.items(), key=lambda c: -c[1]))
+
+def correlate(cloud_data):
+    """Returns (clusters of 2+ related findings, total cost double-counted across the report).
+
+    Each cluster's "Duplicates" lists the (service, position in cloud_data[service], cost) of the
+    findings whose cost another finding already counts, so views can subtract them per slice.
+    """
+    rows, where = [], []
+    for service, items in cloud_data.items():
+        if service in PARTIAL_SERVICES:
+            continue
+        for position, item in enumerate(items):
+            rows.append((service, _slim(item)))
+            where.append((service, position))
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a != b:
+            parent[b] = a
+
+    # 1. Hash index: key -> first finding that owns it
+    owner = {}
+    for i, (_, item) in enumerate(rows):
+        for key in _owned_keys(item):
+            if key in owner:
+                union(owner[key], i)
+            else:
+                owner[key] = i
+
+    # 2. Join references to their owners; a reference nobody flagged joins nothing
+    for i, (_, item) in enumerate(rows):
+        for key in _referenced_keys(item):
+            if key in owner:
+                union(owner[key], i)
+
+    # Lone findings can't double count; only groups of 2+ are materialised
+    roots = [find(i) for i in range(len(rows))]
+    sizes = {}
+    for root in roots:
+        sizes[root] = sizes.get(root, 0) + 1
+    groups = {}
+    for i, root in enumerate(roots):
+        if sizes[root] > 1:
+            groups.setdefault(root, []).append(i)
+
+    # 3. Roll up each group, counting every resource once
+    clusters = []
+    double_counted = 0.0
+    for indices in groups.values():
+        members = [rows[i] for i in indices]
+        # The priciest finding of each resource counts; the others are duplicates of it
+        kept = {}
+        for i in indices:
+            key = _identity(rows[i][1])
+            if key not in kept or rows[i][1].get('Cost', 0.0) > rows[kept[key]][1].get('Cost', 0.0):
+                kept[key] = i
+        duplicates = [(*where[i], rows[i][1].get('Cost', 0.0)) for i in indices if kept[_identity(rows[i][1])] != i]
+        raw_cost = sum(item.get('Cost', 0.0) for _, item in members)
+        true_cost = sum(rows[i][1].get('Cost', 0.0) for i in kept.values())
+        double_counted += raw_cost - true_cost
+
+        # Anchor the cluster on its instance when there is one, else its priciest resource
+        anchor = next((item for service, item in members if service == 'EC2 Instances'), None)
+        if anchor is None:
+            anchor = max((item for _, item in members), key=lambda item: item.get('Cost', 0.0))
+        label = "Dead workload" if any(service == 'EC2 Instances' for service, _ in members) else "Related resources"
+
+        clusters.append({
+            "ID": anchor.get('ID'),
+            "Reason": f"{label}: {_describe(members)}",
+            "Cost": true_cost,
+            "Duplicate Cost": raw_cost - true_cost,
+            "Members": [(service, item.get('ID')) for service, item in members],
+            "Duplicates": duplicates,
+        })
+
+    clusters.sort(key=lambda c: c['Cost'], reverse=True)
+    return clusters, double_counted
@@ -0,0 +1,75 @@
+import heapq
+import re
+from itertools import islice
+from services.tags import get_tag
+
+# Built once per scan; every dashboard filter afterwards only touches the (small) cell map.
+DIMENSIONS = ('Service', 'Region', 'Account', 'Category', 'Tag')
+
+def reason_category(reason):
+    """Collapses a finding's Reason into a stable category, e.g. 'Zombie t2.micro (CPU 0.3%)' -> 'Zombie'."""
+    if not reason:
+        return "Unused"
+    text = re.sub(r'\(.*?\)', '', reason).split(' - ')[0]
+    words = [w for w in text.split() if '.' not in w]
+    return " ".join(words) or "Unused"
+
+class FindingsCube:
+    def __init__(self, cloud_data, tag_key='Owner', duplicates=None):
+        """`duplicates` maps (service, position) to cost another finding already counts (services/correlation.py)."""
+        self.tag_key = tag_key
+        self.cloud_data = cloud_data
+
+        rows = []
+        keys = {}  # One shared tuple per cell instead of one per finding
+        for service, items in cloud_data.items():
+            for position, item in enumerate(items):
+                key = (service, item.get('Region', 'unknown'), item.get('Account', 'unknown'),
+                       reason_category(item.get('Reason')), get_tag(item, tag_key))
+                rows.append((float(item.get('Cost', 0.0)), keys.setdefault(key, key), position, service))
+        duplicates = duplicates or {}
+
+        # Sorted once: a lower index always means a higher cost. Findings are kept by position
+        # and only fetched for display, so spilled findings (services/spill.py) stay on disk.
+        rows.sort(key=lambda r: r[0], reverse=True)
+        self.findings = [(service, position) for _, _, position, service in rows]
+
+        # cell key -> [cost, count, finding indices (ascending), cost counted twice]
+        self.cells = {}
+        for index, (cost, key, position, service) in enumerate(rows):
+            cell = self.cells.setdefault(key, [0.0, 0, [], 0.0])
+            cell[0] += cost
+            cell[1] += 1
+            cell[2].append(index)
+            cell[3] += duplicates.get((service, position), 0.0)
+
+    def members(self, dimension):
+        pos = DIMENSIONS.index(dimension)
+        return sorted({key[pos] for key in self.cells})
+
+    def slice(self, filters=None):
+        """Returns the cells matching filters ({dimension: allowed values}); empty/missing means all."""
+        active = [(DIMENSIONS.index(d), set(v)) for d, v in (filters or {}).items() if v]
+        return [(key, cell) for key, cell in self.cells.items() if all(key[pos] in allowed for pos, allowed in active)]
+
+    def totals(self, cells):
+        return sum(c[0] for _, c in cells), sum(c[1] for _, c in cells)
+
+    def duplicate_cost(self, cells):
+        """Cost in these cells that other findings already count (each resource counted once)."""
+        return sum(c[3] for _, c in cells)
+
+    def rollup(self, cells, dimension):
+        """Returns {member: [cost, count]} for one dimension over the given cells."""
+        pos = DIMENSIONS.index(dimension)
+        groups = {}
+        for key, cell in cells:
+            group = groups.setdefault(key[pos], [0.0, 0])
+            group[0] += cell[0]
+            group[1] += cell[1]
+        return groups
+
+    def top(self, cells, limit):
+        """Returns the `limit` most expensive (service, finding) pairs in the given cells."""
+        indices = heapq.merge(*[cell[2] for _, cell in cells])
+        return [(service, self.cloud_data[service][position]) for service, position in (self.findings[i] for i in islice(indices, limit))]
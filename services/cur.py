@@ -0,0 +1,258 @@
+import csv
+import glob
+import gzip
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from services.spill import update_each
+from services.tags import resource_id_from_arn
+
+# Replaces estimated costs with what the Cost and Usage Report says each flagged resource actually
+# cost. CUR files are streamed in column-pruned batches (three columns out of hundreds) and only rows
+# whose resource ID belongs to a finding are aggregated, so memory is bounded by the findings.
+# A synced CUR prefix holds every billing month, and legacy CUR keeps every re-run (assembly) of a
+# month: only the newest assembly of the latest closed billing period is counted (the month to date
+# is still accruing), unless a period is asked for.
+
+RESOURCE_COLUMN = 'line_item_resource_id'
+COST_COLUMN = 'line_item_unblended_cost'
+# Billing month of a line ('YYYY-MM' prefix); the usage date is the fallback when the first is absent
+PERIOD_COLUMNS = ('bill_billing_period_start_date', 'line_item_usage_start_date')
+DATA_PATTERNS = ('*.parquet', '*.csv', '*.csv.gz')
+BATCH_ROWS = 1 << 20
+# CUR resource IDs are either short IDs (i-..., vol-..., bucket names) or ARNs
+ARN_PREFIX = r'^arn:.*[/:]'
+
+# Findings whose Cost is a saving on part of a resource, not the resource's spend
+PARTIAL_SERVICES = ('S3 Cold Data', 'EBS Rightsizing')
+
+def _normalise(name):
+    # Legacy CSV headers are `lineItem/ResourceId`; Parquet and CUR 2.0 use `line_item_resource_id`
+    return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name.strip()).replace('/', '_').lower()
+
+def _current_period():
+    return datetime.now(timezone.utc).strftime('%Y-%m')
+
+def _manifest_keys(directory, period=None):
+    """S3 keys of the data files the newest manifest of `period` ('YYYY-MM', default the latest closed
+    billing period) lists (None without manifests)."""
+    manifests = []
+    for path in glob.glob(os.path.join(directory, '**', '*Manifest.json'), recursive=True):
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            # Legacy: 20260901T000000.000Z; CUR 2.0: 2026-09-01T00:00:00.000Z
+            start = manifest['billingPeriod']['start'].replace('-', '').replace(':', '')
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            continue
+        month = f"{start[:4]}-{start[4:6]}"
+        if (month != period) if period else (month >= _current_period()):
+            continue
+        keys = manifest.get('reportKeys') or manifest.get('dataFiles') or []
+        # Legacy CUR also copies each assembly's manifest into its folder; the one at the period
+        # level points at the newest assembly, so the shallowest manifest wins, then the newest file
+        manifests.append((start, -path.count(os.sep), os.path.getmtime(path), keys))
+    if not manifests:
+        return None
+    return max(manifests)[3]
+
+def _tail(path):
+    # Folder + file name: the assembly ID (or period folder) and the file, as in the manifest's S3 keys
+    return tuple(path.replace(os.sep, '/').split('/')[-2:])
+
+def cur_files(paths, period=None):
+    """Expands directories into the CUR data files (Parquet, CSV, gzipped CSV) under them.
+
+    Where a folder has CUR manifests, only the files of the newest report version of `period`
+    (default the latest closed billing period) are kept.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        found = [f for pattern in DATA_PATTERNS for f in glob.glob(os.path.join(path, '**', pattern), recursive=True)]
+        keys = _manifest_keys(path, period)
+        if keys:
+            listed = {_tail(key) for key in keys}
+            # A partial sync may lack the listed files: then every file is read and the period filter decides
+            found = [f for f in found if _tail(f) in listed] or found
+        files.extend(found)
+    return sorted(set(files))
+
+def finding_keys(item):
+    """Every ID a CUR line could use for this finding."""
+    keys = [item.get('ARN'), item.get('ID')]
+    if item.get('ARN'):
+        keys.append(resource_id_from_arn(item['ARN']))
+    return [str(k) for k in keys if k]
+
+def _add(costs, key, cost):
+    costs[key] = costs.get(key, 0.0) + cost
+
+def _columns(names):
+    """Original names of the resource, cost and (if present) billing period columns."""
+    columns = [names[RESOURCE_COLUMN], names[COST_COLUMN]]
+    period = next((names[c] for c in PERIOD_COLUMNS if c in names), None)
+    return columns + [period] if period else columns
+
+def _scan_csv_python(path, keys):
+    # Fallback without pyarrow: plain CSV only
+    costs = {}
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index(c) for c in _columns({_normalise(name): name for name in header})]
+        rid, cost = columns[:2]
+        period = columns[2] if len(columns) > 2 else None
+        arn = re.compile(ARN_PREFIX)
+        for row in reader:
+            resource = row[rid]
+            if not resource:
+                continue
+            key = resource if resource in keys else arn.sub('', resource)
+            if key in keys:
+                _add(costs, (row[period][:7] if period is not None else '', key), float(row[cost] or 0.0))
+    return costs
+
+def _batches(path):
+    import pyarrow as pa
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        reader = pq.ParquetFile(path)
+        names = {_normalise(n): n for n in reader.schema_arrow.names}
+        # Column pruning: only the columns we need are ever decoded
+        yield from reader.iter_batches(batch_size=BATCH_ROWS, columns=_columns(names))
+        return
+
+    import pyarrow.csv as pcsv
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='') as f:
+        names = {_normalise(n): n for n in next(csv.reader(f))}
+    columns = _columns(names)
+    types = dict(zip(columns, (pa.string(), pa.float64(), pa.string())))
+    stream = pa.OSFile(path)
+    if path.endswith('.gz'):
+        stream = pa.CompressedInputStream(stream, 'gzip')
+    yield from pcsv.open_csv(
+        stream,
+        read_options=pcsv.ReadOptions(block_size=16 << 20),
+        convert_options=pcsv.ConvertOptions(include_columns=columns, column_types=types),
+    )
+
+def _sum(table):
+    return table.group_by(['period', 'key']).aggregate([('cost', 'sum')]).rename_columns(['period', 'key', 'cost'])
+
+def _combine(tables):
+    import pyarrow as pa
+
+    return _sum(pa.concat_tables(tables))
+
+def _scan_arrow(path, keys):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    costs = {}
+    partials = []  # Per-batch sums, compacted as they pile up: at most one row per finding key each
+    value_set = pa.array(sorted(keys), pa.string())
+    for batch in _batches(path):
+        if not batch.num_rows:
+            continue
+        ids = pc.fill_null(batch.column(0), '')
+        cost = pc.fill_null(batch.column(1), 0.0)
+        if batch.num_columns > 2:
+            # Parquet has timestamps, CSV strings: either way the first 7 characters are the month
+            period = pc.utf8_slice_codeunits(pc.fill_null(pc.cast(batch.column(2), pa.string()), ''), 0, 7)
+        else:
+            period = pa.array([''] * batch.num_rows, pa.string())
+        # The full ID first; the regex only runs on the remaining ARNs (`.../vol-0abc` -> `vol-0abc`)
+        full = pc.is_in(ids, value_set=value_set)
+        arns = pc.and_not(pc.starts_with(ids, 'arn:'), full)
+        short = pc.replace_substring_regex(ids.filter(arns), ARN_PREFIX, '')
+        short_cost = cost.filter(arns)
+        by_short = pc.is_in(short, value_set=value_set)
+
+        matched = pa.table({'period': pa.concat_arrays([period.filter(full), period.filter(arns).filter(by_short)]),
+                            'key': pa.concat_arrays([ids.filter(full), short.filter(by_short)]),
+                            'cost': pa.concat_arrays([cost.filter(full), short_cost.filter(by_short)])})
+        partials.append(_sum(matched))
+        if len(partials) >= 16:
+            partials = [_combine(partials)]
+
+    if partials:
+        total = _combine(partials)
+        costs = dict(zip(zip(total['period'].to_pylist(), total['key'].to_pylist()), total['cost'].to_pylist()))
+    return costs
+
+def _scan_file(path, keys):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        if path.endswith('.parquet'):
+            raise RuntimeError("Reading Parquet CUR files needs pyarrow (pip install pyarrow)")
+        return _scan_csv_python(path, keys)
+    return _scan_arrow(path, keys)
+
+def read_cur(paths, keys, workers=None, progress=None, period=None):
+    """Returns {key: unblended cost} for the given finding keys in billing period `period` ('YYYY-MM') of
+    the CUR files (one process per file). By default that is the latest closed period: the current
+    month's lines are partial, and would make every resource look cheaper than it is."""
+    files = cur_files(paths, period)
+    keys = set(keys)
+    costs = {}
+    if not files or not keys:
+        return costs
+    if progress:
+        progress(f"   ... Reading {len(files)} CUR files for {len(keys)} resource IDs")
+
+    # {(billing month, key): cost}
+    if len(files) == 1 or workers == 1:
+        for f in files:
+            for key, cost in _scan_file(f, keys).items():
+                _add(costs, key, cost)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or min(len(files), os.cpu_count() or 1)) as executor:
+            for partial in executor.map(_scan_file, files, [keys] * len(files)):
+                for key, cost in partial.items():
+                    _add(costs, key, cost)
+
+    if not costs:
+        return {}
+    if period is None:
+        # Lines without a period column ('') count as closed
+        closed = [month for month, _ in costs if month < _current_period()]
+        if not closed:
+            if progress:
+                progress("   ... The CUR only has the month to date; pass a period to use it")
+            return {}
+        period = max(closed)
+    if progress and period:
+        progress(f"   ... Using billing period {period}")
+    return {key: cost for (month, key), cost in costs.items() if month == period}
+
+def apply_actual_costs(cloud_data, paths, workers=None, progress=None, period=None):
+    """Sets Cost to the CUR spend of every finding found in the CUR (keeping EstimatedCost); returns the match count.
+    `period` is as for read_cur."""
+    services = [findings for service, findings in cloud_data.items() if service not in PARTIAL_SERVICES]
+    costs = read_cur(paths, (key for findings in services for item in findings for key in finding_keys(item)), workers,
+                     progress, period)
+
+    matched = 0
+    def price(item):
+        nonlocal matched
+        # A resource may appear under its ARN on some lines and its short ID on others
+        found = [costs[k] for k in set(finding_keys(item)) if k in costs]
+        if not found:
+            return
+        item['EstimatedCost'] = item.get('Cost', 0.0)
+        item['ActualCost'] = sum(found)
+        item['Cost'] = item['ActualCost']
+        matched += 1
+
+    for findings in services:
+        update_each(findings, price)
+    return matched
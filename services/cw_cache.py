@@ -0,0 +1,257 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime, timezone
+from services.cache import cache_bypassed
+from services.clients import call_all, get_account_id
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cost-optimizer', 'metrics')
+
+# get_metric_statistics returns at most 1,440 datapoints per call
+MAX_DATAPOINTS = 1440
+# get_metric_data takes at most 500 queries per call
+MAX_QUERIES = 500
+
+def _align(ts, period):
+    return ts - ts % period
+
+def _chunks(namespace, metric, dimensions, statistic, start, end, period):
+    # get_metric_statistics params covering [start, end)
+    params = []
+    chunk = MAX_DATAPOINTS * period
+    while start < end:
+        chunk_end = min(end, start + chunk)
+        params.append({
+            'Namespace': namespace,
+            'MetricName': metric,
+            'Dimensions': dimensions,
+            'StartTime': datetime.fromtimestamp(start, timezone.utc),
+            'EndTime': datetime.fromtimestamp(chunk_end, timezone.utc),
+            'Period': period,
+            'Statistics': [statistic],
+        })
+        start = chunk_end
+    return params
+
+def _fetch_windows(cw, windows, period):
+    """Fetches [(query, start, end)] in one concurrent batch; returns, per window, its (timestamp, value)
+    datapoints or the exception fetching them raised."""
+    calls, owners = [], []
+    for i, (query, start, end) in enumerate(windows):
+        for params in _chunks(*query, start, end, period):
+            calls.append(('get_metric_statistics', params))
+            owners.append(i)
+    points = [[] for _ in windows]
+    for i, pages in zip(owners, call_all(cw, calls)):
+        if isinstance(pages, Exception):
+            points[i] = pages
+        elif not isinstance(points[i], Exception):
+            statistic = windows[i][0][3]
+            points[i].extend((dp['Timestamp'].timestamp(), dp[statistic]) for page in pages for dp in page.get('Datapoints', []))
+    return points
+
+class MetricSeriesCache:
+    """Remembers CloudWatch datapoints per metric/dimension so each lookup only fetches the new window."""
+    def __init__(self, directory=CACHE_DIR, retention_days=35, settle_periods=2, bypass=False):
+        self.directory = directory
+        self.retention = retention_days * 86400
+        # The newest buckets may still be filling in on the CloudWatch side; always refetch them
+        self.settle_periods = settle_periods
+        self.bypass = bypass
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def get(self, cw, namespace, metric, dimensions, statistic, lookback, period=3600):
+        """Returns (timestamps, values) for the last `lookback` seconds, fetching only what's missing."""
+        series = self.get_many(cw, {None: (namespace, metric, dimensions, statistic)}, lookback, period)[None]
+        if isinstance(series, Exception):
+            raise series
+        return series
+
+    def get_many(self, cw, queries, lookback, period=3600):
+        """Like get, for {key: (namespace, metric, dimensions, statistic)}: returns {key: (timestamps, values)}
+        or the exception fetching it raised. The missing windows of all of them are fetched in one batch."""
+        region = cw.meta.region_name
+        keys = {}
+        for name, (namespace, metric, dimensions, statistic) in queries.items():
+            raw = f"{get_account_id(region)}|{region}|{namespace}|{metric}|{sorted((d['Name'], d['Value']) for d in dimensions)}|{statistic}|{period}"
+            keys[name] = hashlib.sha256(raw.encode()).hexdigest()
+        unique = {key: queries[name] for name, key in keys.items()}
+
+        now = time.time()
+        start = _align(now - lookback, period)
+        # Sorted, so concurrent batches can't deadlock on each other's keys
+        locks = [self._lock(key) for key in sorted(unique)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            held, windows = {}, []
+            for key, query in unique.items():
+                series = None if self.bypass or cache_bypassed() else self._read(key)
+                if series is None or series['period'] != period:
+                    series = {'period': period, 'fetched_from': start, 'fetched_until': start,
+                              'timestamps': array('d'), 'values': array('d')}
+                held[key] = series
+
+                # 1. Only fetch before what we have (longer lookback) and after it (new data)
+                if start < series['fetched_from']:
+                    windows.append((key, query, start, series['fetched_from']))
+                resume = max(start, _align(series['fetched_until'], period) - self.settle_periods * period)
+                windows.append((key, query, resume, now))
+
+            failed = {}
+            fetched = _fetch_windows(cw, [(query, window_start, window_end) for _, query, window_start, window_end in windows], period)
+            for (key, _, window_start, window_end), points in zip(windows, fetched):
+                if isinstance(points, Exception):
+                    failed[key] = points
+                else:
+                    self._merge(held[key], window_start, window_end, points)
+
+            for key, series in held.items():
+                if key in failed:
+                    continue  # Not written: the next lookup fetches the whole gap again
+                series['fetched_from'] = min(series['fetched_from'], start)
+                series['fetched_until'] = now
+
+                # 2. Evict by retention
+                cutoff = now - self.retention
+                if series['timestamps'] and series['timestamps'][0] < cutoff:
+                    keep = [i for i, ts in enumerate(series['timestamps']) if ts >= cutoff]
+                    series['timestamps'] = array('d', (series['timestamps'][i] for i in keep))
+                    series['values'] = array('d', (series['values'][i] for i in keep))
+                    series['fetched_from'] = max(series['fetched_from'], cutoff)
+
+                self._write(key, series)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        results = {}
+        for name, key in keys.items():
+            if key in failed:
+                results[name] = failed[key]
+                continue
+            series = held[key]
+            in_window = [i for i, ts in enumerate(series['timestamps']) if ts >= start]
+            results[name] = ([series['timestamps'][i] for i in in_window], [series['values'][i] for i in in_window])
+        return results
+
+    def _merge(self, series, start, end, points):
+        # Replace whatever we held for [start, end) with the fresh datapoints, keeping time order
+        merged = [(ts, v) for ts, v in zip(series['timestamps'], series['values']) if not start <= ts < end]
+        merged.extend(points)
+        merged.sort()
+        series['timestamps'] = array('d', (ts for ts, _ in merged))
+        series['values'] = array('d', (v for _, v in merged))
+
+    def _lock(self, key):
+        with self.locks_lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl.z')
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                series = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, EOFError, pickle.UnpicklingError, zlib.error):
+            return None
+        for name in ('timestamps', 'values'):
+            series[name] = array('d', series[name])
+        return series
+
+    def _write(self, key, series):
+        path = self._path(key)
+        stored = dict(series, timestamps=series['timestamps'].tobytes(), values=series['values'].tobytes())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(pickle.dumps(stored), 6))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"  Error writing metric cache: {e}")
+
+_series_cache = None
+
+def configure_series_cache(cache):
+    """Sets the MetricSeriesCache scanners use (None fetches the full window every time)."""
+    global _series_cache
+    _series_cache = cache
+
+def get_series_cache():
+    return _series_cache
+
+def get_metric_series(cw, namespace, metric, dimensions, statistic, lookback, period=3600):
+    """Returns (timestamps, values) for a metric over the last `lookback` seconds."""
+    series = get_metric_series_many(cw, {None: (namespace, metric, dimensions, statistic)}, lookback, period)[None]
+    if isinstance(series, Exception):
+        raise series
+    return series
+
+def get_metric_series_many(cw, queries, lookback, period=3600):
+    """get_metric_series for {key: (namespace, metric, dimensions, statistic)}, fetched concurrently.
+
+    Returns {key: (timestamps, values)}, or the exception fetching that metric raised.
+    """
+    if _series_cache is not None:
+        return _series_cache.get_many(cw, queries, lookback, period)
+    now = time.time()
+    names = list(queries)
+    fetched = _fetch_windows(cw, [(queries[name], _align(now - lookback, period), now) for name in names], period)
+    results = {}
+    for name, points in zip(names, fetched):
+        if isinstance(points, Exception):
+            results[name] = points
+            continue
+        points.sort()
+        results[name] = ([ts for ts, _ in points], [v for _, v in points])
+    return results
+
+def fetch_metric_data(cw, queries, lookback, period=3600, max_workers=4):
+    """Fetches many metrics with batched get_metric_data calls (500 queries each, run concurrently).
+
+    `queries` maps any hashable key to (namespace, metric, dimensions, statistic). Returns
+    {key: (timestamps, values)} in time order, for metrics with at least one datapoint. These
+    bulk reads bypass the per-metric series cache: they are for fleets too big to fetch one by one.
+    """
+    now = time.time()
+    start = datetime.fromtimestamp(_align(now - lookback, period), timezone.utc)
+    end = datetime.fromtimestamp(now, timezone.utc)
+    keys = list(queries)
+
+    def request(batch):
+        return {'MetricDataQueries': [{
+            'Id': f"q{i}",  # Ids must be identifiers; our keys are arbitrary
+            'MetricStat': {
+                'Metric': {'Namespace': namespace, 'MetricName': metric, 'Dimensions': dimensions},
+                'Period': period,
+                'Stat': statistic,
+            },
+        } for i, (namespace, metric, dimensions, statistic) in enumerate(queries[k] for k in batch)],
+            'StartTime': start, 'EndTime': end, 'ScanBy': 'TimestampAscending'}
+
+    batches = [keys[offset:offset + MAX_QUERIES] for offset in range(0, len(keys), MAX_QUERIES)]
+    series = {}
+    # Each batch walks its own NextToken chain; the batches run concurrently
+    for batch, pages in zip(batches, call_all(cw, [('get_metric_data', request(batch)) for batch in batches], max_workers)):
+        if isinstance(pages, Exception):
+            raise pages
+        for response in pages:
+            for result in response.get('MetricDataResults', []):
+                key = batch[int(result['Id'][1:])]
+                timestamps, values = series.setdefault(key, (array('d'), array('d')))
+                timestamps.extend(ts.timestamp() for ts in result.get('Timestamps', []))
+                values.extend(result.get('Values', []))
+
+    results = {}
+    for key, (timestamps, values) in series.items():
+        if timestamps:
+            order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            results[key] = ([timestamps[i] for i in order], [values[i] for i in order])
+    return results
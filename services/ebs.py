@@ -1,30 +1,37 @@
-import boto3
 from services.pricing import get_ebs_price
+from services.sharding import list_volumes
+from services.spill import findings_list
 
 class EBSScanner:
-    def __init__(self, ec2_client):
+    def __init__(self, ec2_client, inventory=None):
         self.ec2 = ec2_client
+        self.inventory = inventory
 
     def get_orphan_volumes(self):
-        response = self.ec2.describe_volumes(Filters=[{'Name': 'status', 'Values': ['available']}])
-        orphans = []
+        volumes = list_volumes(self.ec2, filters=[{'Name': 'status', 'Values': ['available']}])
+        orphans = findings_list()
 
-        for vol in response['Volumes']:
+        for vol in volumes:
             v_id = vol['VolumeId']
             size = vol['Size']
             v_type = vol['VolumeType']
             
             real_cost = get_ebs_price(size, v_type)
 
+            if self.inventory is not None:
+                self.inventory.record('ebs', {"id": v_id, "status": vol['State'], "volume_type": v_type, "size_gb": size,
+                                              "monthly_cost": real_cost, "SnapshotId": vol.get('SnapshotId') or None})
+
             orphans.append({
                 "ID": v_id,
                 "Reason": "Unattached Volume",
                 "Size": size,
-                "Cost": real_cost
+                "Cost": real_cost,
+                "SnapshotId": vol.get('SnapshotId') or None
             })
         
         return orphans
 
-def scan_ebs(ec2_client):
-    scanner = EBSScanner(ec2_client)
+def scan_ebs(ec2_client, inventory=None):
+    scanner = EBSScanner(ec2_client, inventory)
     return scanner.get_orphan_volumes()
\ No newline at end of file
@@ -0,0 +1,155 @@
+import math
+from array import array
+from services.cw_cache import fetch_metric_data
+from services.pricing import GP3_BASELINE_IOPS, GP3_BASELINE_THROUGHPUT, get_ebs_price
+from services.sharding import list_volumes
+
+# Attached volumes paying for performance they never use: gp2 that should be gp3, and
+# io1/io2/gp3 provisioned well above their peak. Peaks come from one bulk metrics pass over
+# every in-use volume, so tens of thousands of volumes cost a few hundred API calls.
+
+try:
+    import numpy as np
+except ImportError:  # Optional: same peaks in pure Python, just slower
+    np = None
+
+LOOKBACK = 14 * 86400
+PERIOD = 3600
+# EBS publishes one datapoint a minute; the hourly Maximum is the busiest minute of the hour
+SAMPLE_SECONDS = 60
+HEADROOM = 1.2
+MIN_SAVINGS = 1.0
+
+# gp3 limits (per volume)
+GP3_MAX_IOPS = 16000
+GP3_MAX_THROUGHPUT = 1000
+GP3_IOPS_PER_GB = 500
+GP3_THROUGHPUT_PER_IOPS = 0.25
+IO_MIN_IOPS = 100
+
+METRICS = ('VolumeReadOps', 'VolumeWriteOps', 'VolumeReadBytes', 'VolumeWriteBytes')
+
+def _peaks(volume_ids, series, start):
+    """Returns {volume: (peak IOPS, peak MiB/s)} for volumes with datapoints.
+
+    Read and write maxima are summed hour by hour, which can only overstate the peak.
+    """
+    slots = int(LOOKBACK // PERIOD) + 2
+    rows = {v: i for i, v in enumerate(volume_ids)}
+
+    if np is not None:
+        matrices = {m: np.zeros((len(volume_ids), slots)) for m in METRICS}
+        flat = {m: (array('q'), array('q'), array('d')) for m in METRICS}
+        for (volume, metric), (timestamps, values) in series.items():
+            row_index, slot_index, value_list = flat[metric]
+            row_index.extend([rows[volume]] * len(timestamps))
+            slot_index.extend(int((ts - start) // PERIOD) for ts in timestamps)
+            value_list.extend(values)
+        for metric, (row_index, slot_index, value_list) in flat.items():
+            if value_list:
+                slot = np.clip(np.frombuffer(slot_index, dtype=np.int64), 0, slots - 1)
+                matrices[metric][np.frombuffer(row_index, dtype=np.int64), slot] = np.frombuffer(value_list)
+        iops = (matrices['VolumeReadOps'] + matrices['VolumeWriteOps']).max(axis=1) / SAMPLE_SECONDS
+        throughput = (matrices['VolumeReadBytes'] + matrices['VolumeWriteBytes']).max(axis=1) / SAMPLE_SECONDS / 1024 ** 2
+        seen = {volume for volume, _ in series}
+        return {v: (float(iops[i]), float(throughput[i])) for v, i in rows.items() if v in seen}
+
+    totals = {}
+    for (volume, metric), (timestamps, values) in series.items():
+        ops, data = totals.setdefault(volume, ({}, {}))
+        bucket = ops if metric.endswith('Ops') else data
+        for ts, value in zip(timestamps, values):
+            slot = int((ts - start) // PERIOD)
+            bucket[slot] = bucket.get(slot, 0.0) + value
+    return {v: (max(ops.values(), default=0.0) / SAMPLE_SECONDS, max(data.values(), default=0.0) / SAMPLE_SECONDS / 1024 ** 2)
+            for v, (ops, data) in totals.items()}
+
+def _gp3(size, iops, throughput):
+    """Smallest gp3 configuration covering the given peak, or None if gp3 can't."""
+    throughput = max(GP3_BASELINE_THROUGHPUT, math.ceil(throughput))
+    iops = max(GP3_BASELINE_IOPS, math.ceil(iops), math.ceil(throughput / GP3_THROUGHPUT_PER_IOPS))
+    if iops > GP3_MAX_IOPS or throughput > GP3_MAX_THROUGHPUT:
+        return None
+    # The baseline comes with any size; anything above it needs the GB to back it
+    if iops > GP3_BASELINE_IOPS and iops > GP3_IOPS_PER_GB * size:
+        return None
+    return iops, throughput
+
+class EBSRightsizer:
+    def __init__(self, ec2_client, cw_client):
+        self.ec2 = ec2_client
+        self.cw = cw_client
+
+    def get_rightsizing(self):
+        volumes = [v for v in list_volumes(self.ec2, filters=[{'Name': 'status', 'Values': ['in-use']}])
+                   if v['VolumeType'] in ('gp2', 'gp3', 'io1', 'io2')]
+        if not volumes:
+            return []
+
+        # 1. Four metrics per volume, 500 queries per call
+        queries = {(v['VolumeId'], m): ('AWS/EBS', m, [{'Name': 'VolumeId', 'Value': v['VolumeId']}], 'Maximum')
+                   for v in volumes for m in METRICS}
+        series = fetch_metric_data(self.cw, queries, LOOKBACK, PERIOD)
+
+        # 2. Peaks for every volume at once
+        start = min((ts[0] for ts, _ in series.values()), default=0.0)
+        peaks = _peaks([v['VolumeId'] for v in volumes], series, start)
+
+        # 3. Cheapest configuration that still covers the peak (with headroom)
+        findings = []
+        for vol in volumes:
+            if vol['VolumeId'] not in peaks:
+                continue  # No datapoints: nothing to size against
+            peak_iops, peak_throughput = peaks[vol['VolumeId']]
+            item = self._recommend(vol, peak_iops, peak_throughput)
+            if item:
+                findings.append(item)
+
+        # Ranked: biggest monthly saving first
+        findings.sort(key=lambda f: -f['Cost'])
+        return findings
+
+    def _recommend(self, vol, peak_iops, peak_throughput):
+        size, v_type = vol['Size'], vol['VolumeType']
+        iops, throughput = vol.get('Iops') or 0, vol.get('Throughput') or 0
+        current = get_ebs_price(size, v_type, iops, throughput)
+        need_iops, need_throughput = peak_iops * HEADROOM, peak_throughput * HEADROOM
+
+        options = []
+        gp3 = _gp3(size, need_iops, need_throughput)
+        if gp3:
+            if v_type == 'gp2':
+                label = "gp2 -> gp3"
+            elif v_type == 'gp3':
+                label = f"gp3 {iops} IOPS/{throughput} MiB/s -> {gp3[0]}/{gp3[1]}"
+            else:
+                label = f"{v_type} -> gp3 ({gp3[0]} IOPS, {gp3[1]} MiB/s)"
+            options.append((get_ebs_price(size, 'gp3', *gp3), label, 'gp3', gp3[0], gp3[1]))
+        if v_type in ('io1', 'io2'):
+            smaller = max(IO_MIN_IOPS, math.ceil(need_iops))
+            if smaller < iops:
+                options.append((get_ebs_price(size, v_type, smaller), f"{v_type} IOPS {iops} -> {smaller}", v_type, smaller, None))
+        if not options:
+            return None
+
+        proposed, reason, target, target_iops, target_throughput = min(options)
+        if current - proposed < MIN_SAVINGS:
+            return None
+        attachments = vol.get('Attachments') or [{}]
+        return {
+            "ID": vol['VolumeId'],
+            "Reason": f"{reason} (peak {peak_iops:,.0f} IOPS, {peak_throughput:,.0f} MiB/s)",
+            "Cost": current - proposed,
+            "Size": size,
+            "VolumeType": v_type,
+            "Target": target,
+            "TargetIops": target_iops,
+            "TargetThroughput": target_throughput,
+            "CurrentCost": current,
+            "ProposedCost": proposed,
+            "InstanceId": attachments[0].get('InstanceId'),
+        }
+
+def scan_ebs_rightsizing(ec2_client, cw_client):
+    scanner = EBSRightsizer(ec2_client, cw_client)
+    return scanner.get_rightsizing()
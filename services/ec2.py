@@ -1,63 +1,80 @@
-import boto3
-from datetime import datetime, timedelta
+from services.clients import batched
+from services.cw_cache import get_metric_series_many
 from services.pricing import get_ec2_price
+from services.scan_errors import report_error
+from services.sharding import list_instances
+from services.spill import findings_list
 
 class EC2Scanner:
-    def __init__(self, ec2_client, cw_client):
+    def __init__(self, ec2_client, cw_client, inventory=None):
         self.ec2 = ec2_client
         self.cw = cw_client
+        self.inventory = inventory
 
     def get_ec2_waste(self):
-        response = self.ec2.describe_instances()
-        waste_list = []
-
-        for reservation in response['Reservations']:
-            for instance in reservation['Instances']:
-                
-                instance_id = instance['InstanceId']
-                state = instance['State']['Name']
-                inst_type = instance['InstanceType']
-                
-                # CASE 1: Stopped Instance (Paying for EBS only usually, but let's flag it)
-                if state == 'stopped':
+        waste_list = findings_list()
+
+        # Sharded by AZ x state in big regions; a single page otherwise
+        for batch in batched(list_instances(self.ec2)):
+            # Hourly points, so repeat scans only fetch the hours since the last one; one batch at a time
+            queries = {i['InstanceId']: ('AWS/EC2', 'CPUUtilization', [{'Name': 'InstanceId', 'Value': i['InstanceId']}], 'Average')
+                       for i in batch if i['State']['Name'] == 'running'}
+            cpu = get_metric_series_many(self.cw, queries, lookback=7 * 86400) if queries else {}
+
+            for instance in batch:
+                self._check(instance, cpu.get(instance['InstanceId']), waste_list)
+
+        return waste_list
+
+    def _check(self, instance, series, waste_list):
+        instance_id = instance['InstanceId']
+        state = instance['State']['Name']
+        inst_type = instance['InstanceType']
+        # Links for the correlation pass (services/correlation.py)
+        links = {
+            "VpcId": instance.get('VpcId'),
+            "VolumeIds": [m['Ebs']['VolumeId'] for m in instance.get('BlockDeviceMappings', []) if 'Ebs' in m],
+            "NetworkInterfaceIds": [eni['NetworkInterfaceId'] for eni in instance.get('NetworkInterfaces', [])],
+        }
+
+        row = {"id": instance_id, "state": state, "instance_type": inst_type,
+               "monthly_price": get_ec2_price(inst_type), "avg_cpu": None, **links}
+
+        # CASE 1: Stopped Instance (Paying for EBS only usually, but let's flag it)
+        if state == 'stopped':
+            item = {
+                "ID": instance_id,
+                "Reason": "Stopped Instance",
+                "Cost": 2.00, # Nominal EBS cost estimate
+                **links
+            }
+            waste_list.append(item)
+
+        # CASE 2: Zombie Instance (Running but Idle)
+        elif state == 'running':
+            if isinstance(series, Exception):
+                report_error(f"Error checking EC2 {instance_id}: {series}")
+            elif series and series[1]:
+                hourly_cpu = series[1]
+                avg_cpu = sum(hourly_cpu) / len(hourly_cpu)
+                row["avg_cpu"] = avg_cpu
+                if avg_cpu < 1.0:
+                    real_cost = get_ec2_price(inst_type)
                     item = {
                         "ID": instance_id,
-                        "Reason": "Stopped Instance",
-                        "Cost": 2.00 # Nominal EBS cost estimate
+                        "Reason": f"Zombie {inst_type} (CPU {avg_cpu:.1f}%)",
+                        "Cost": real_cost,
+                        **links
                     }
                     waste_list.append(item)
-                    continue
-
-                # CASE 2: Zombie Instance (Running but Idle)
-                if state == 'running':
-                    try:
-                        metric = self.cw.get_metric_statistics(
-                            Namespace='AWS/EC2',
-                            MetricName='CPUUtilization',
-                            Dimensions=[{'Name': 'InstanceId', 'Value': instance_id}],
-                            StartTime=datetime.utcnow() - timedelta(days=7),
-                            EndTime=datetime.utcnow(),
-                            Period=86400,
-                            Statistics=['Average']
-                        )
-                        
-                        datapoints = metric.get('Datapoints', [])
-                        if datapoints:
-                            avg_cpu = datapoints[0]['Average']
-                            if avg_cpu < 1.0:
-                                real_cost = get_ec2_price(inst_type)
-                                item = {
-                                    "ID": instance_id,
-                                    "Reason": f"Zombie {inst_type} (CPU {avg_cpu:.1f}%)",
-                                    "Cost": real_cost
-                                }
-                                waste_list.append(item)
-                    except Exception as e:
-                        print(f"Error checking EC2 {instance_id}: {e}")
-                        continue
-        
-        return waste_list
 
-def scan_ec2(ec2_client, cw_client):
-    scanner = EC2Scanner(ec2_client, cw_client)
+        self._record(row)
+
+    def _record(self, row):
+        # Everything the waste rules (services/rules.py) may look at, flagged or not
+        if self.inventory is not None:
+            self.inventory.record('ec2', row)
+
+def scan_ec2(ec2_client, cw_client, inventory=None):
+    scanner = EC2Scanner(ec2_client, cw_client, inventory)
     return scanner.get_ec2_waste()
\ No newline at end of file
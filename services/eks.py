@@ -1,33 +1,121 @@
-import boto3
+from services.clients import call_all
+from services.pricing import PRICING, get_ec2_price
+from services.scan_errors import report_error
+
+# Per-cluster calls: kind -> (operation, cluster name parameter, response key)
+CLUSTER_CALLS = {
+    "cluster": ('describe_cluster', 'name', 'cluster'),
+    "list_nodegroups": ('list_nodegroups', 'clusterName', 'nodegroups'),
+    "fargate": ('list_fargate_profiles', 'clusterName', 'fargateProfileNames'),
+    "addons": ('list_addons', 'clusterName', 'addons'),
+}
 
 class EKSScanner:
-    def __init__(self, eks_client):
+    def __init__(self, eks_client, max_workers=32):
         self.eks = eks_client
+        # Keep this <= the client's max_pool_connections, or calls queue on the pool
+        self.max_workers = max_workers
+
+    def _paginate(self, operation, key, **kwargs):
+        items = []
+        for page in self.eks.get_paginator(operation).paginate(**kwargs):
+            items.extend(page.get(key, []))
+        return items
+
+    def _failed(self, details, name, kind, error):
+        if kind == "addons":
+            # Only annotates the finding; the idle judgement doesn't depend on it
+            print(f"  Error listing EKS add-ons for {name}: {error}")
+            return
+        # The cluster's picture is incomplete: get_clusters won't judge it idle
+        report_error(f"Error scanning EKS cluster {name} ({kind}): {error}")
+        details[name]["errors"].append(kind)
+
+    def get_cluster_details(self):
+        # 1. Paginate cluster names
+        names = self._paginate('list_clusters', 'clusters')
+        details = {name: {"cluster": None, "nodegroups": [], "fargate": [], "addons": [], "errors": []} for name in names}
+
+        # 2. Every per-cluster call at once, then every describe_nodegroup at once
+        targets = [(name, kind) for name in names for kind in CLUSTER_CALLS]
+        calls = [(CLUSTER_CALLS[kind][0], {CLUSTER_CALLS[kind][1]: name}) for name, kind in targets]
+        nodegroups = []
+        for (name, kind), pages in zip(targets, call_all(self.eks, calls, self.max_workers)):
+            if isinstance(pages, Exception):
+                self._failed(details, name, kind, pages)
+                continue
+            key = CLUSTER_CALLS[kind][2]
+            if kind == "cluster":
+                details[name]["cluster"] = pages[0][key]
+            elif kind == "list_nodegroups":
+                nodegroups.extend((name, nodegroup) for page in pages for nodegroup in page.get(key, []))
+            else:
+                details[name][kind] = [item for page in pages for item in page.get(key, [])]
+
+        calls = [('describe_nodegroup', {'clusterName': name, 'nodegroupName': nodegroup}) for name, nodegroup in nodegroups]
+        for (name, _), pages in zip(nodegroups, call_all(self.eks, calls, self.max_workers)):
+            if isinstance(pages, Exception):
+                self._failed(details, name, "nodegroups", pages)
+            else:
+                details[name]["nodegroups"].append(pages[0]['nodegroup'])
+
+        return details
 
     def get_clusters(self):
         waste = []
-        
+
         try:
-            
-            response = self.eks.list_clusters()
-            
-            
-            clusters = response.get('clusters', [])
-            
-           
-            for cluster in clusters:
-                waste.append({
-                    "ID": cluster,
-                    "Reason": "EKS Control Plane (Active)",
-                    "Cost": 72.00  # $0.10/hr * 720 hours
-                })
-                
+            details = self.get_cluster_details()
         except Exception as e:
-            print(f"  Error scanning EKS: {e}")
+            report_error(f"Error scanning EKS: {e}")
             return []
 
+        for name, info in details.items():
+            cluster = info["cluster"] or {}
+            if cluster.get('status') == 'DELETING':
+                continue
+
+            nodes = 0
+            for ng in info["nodegroups"]:
+                ng_name = ng.get('nodegroupName')
+                desired = ng.get('scalingConfig', {}).get('desiredSize', 0) or 0
+                inst_types = ng.get('instanceTypes') or []
+                inst_type = inst_types[0] if inst_types else 'unknown'
+                nodes += desired
+
+                # CASE 1: Node group scaled to zero (left behind after testing)
+                if desired == 0:
+                    waste.append({
+                        "ID": f"{name}/{ng_name}",
+                        "ARN": ng.get('nodegroupArn'),
+                        "Reason": f"Empty Node Group (desired size 0, {inst_type})",
+                        "Cost": 0.00
+                    })
+                    continue
+
+                # CASE 2: Nodes are billed but the node group is broken
+                if ng.get('status') in ('DEGRADED', 'CREATE_FAILED') or ng.get('health', {}).get('issues'):
+                    waste.append({
+                        "ID": f"{name}/{ng_name}",
+                        "ARN": ng.get('nodegroupArn'),
+                        "Reason": f"Degraded Node Group ({desired} x {inst_type})",
+                        "Cost": desired * get_ec2_price(inst_type)
+                    })
+
+            # CASE 3: Control plane with nothing to schedule on. Unknown, not idle, if any call for it
+            # failed: a missing node group or profile list would look exactly like an empty one.
+            if nodes == 0 and not info["fargate"] and not info["errors"]:
+                # Add-ons left installed keep the control plane looking in use, but have nowhere to run
+                addons = f", {len(info['addons'])} add-ons" if info["addons"] else ""
+                waste.append({
+                    "ID": name,
+                    "ARN": cluster.get('arn'),
+                    "Reason": f"Idle EKS Control Plane (0 nodes, no Fargate profiles{addons})",
+                    "Cost": PRICING['eks_cluster']
+                })
+
         return waste
 
 def scan_eks(eks_client):
     scanner = EKSScanner(eks_client)
-    return scanner.get_clusters()
\ No newline at end of file
+    return scanner.get_clusters()
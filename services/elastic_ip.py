@@ -1,4 +1,4 @@
-import boto3 
+from services.spill import findings_list
 
 class elastic_ip_scanner(): #Class to scan for unattached elastic IPs
     def __init__(self,client):
@@ -8,18 +8,16 @@ class elastic_ip_scanner(): #Class to scan for unattached elastic IPs
     def get_elastic_ip(self): #Get the list of elastic IPs
         list_of_eips = self.client.describe_addresses()['Addresses']
 
-        clean_list = []
+        clean_list = findings_list()
 
         for eip in list_of_eips: #Loop through the list of elastic IPs
             if 'AssociationId' not in eip: 
                 item = { 
                     "ID": eip['AllocationId'], 
-                    "Public IP": eip['Public Ip'], 
+                    "Public IP": eip['PublicIp'], 
                     "Cost": 3.6
                 }
-            
-
-            clean_list.append(item) #Append the item to the clean list
+                clean_list.append(item) #Only unattached EIPs are waste (and safe to release)
         return clean_list #Return the clean list of elastic IPs
         
 def scan_eip(ec2_client): #Function to scan for unattached elastic IPs
@@ -0,0 +1,88 @@
+import pickle
+import threading
+import zlib
+from services.spill import SpillList, update_each
+
+class Inventory:
+    """Attributes and metrics of every scanned resource (flagged or not), by resource type.
+
+    Scanners `record()` one row per resource; rules (services/rules.py) read it column-wise,
+    so thresholds can be re-evaluated without scanning again. With a `budget`
+    (services/spill.py), rows beyond it are kept on disk instead of in memory.
+    """
+    def __init__(self, budget=None):
+        self.rows = {}
+        self.budget = budget
+        self.lock = threading.Lock()
+        self._columns = {}
+
+    def _rows(self, resource):
+        if resource not in self.rows:
+            self.rows[resource] = self.budget.list(resource) if self.budget else []
+        return self.rows[resource]
+
+    def record(self, resource, row):
+        with self.lock:
+            self._rows(resource).append(row)
+            self._columns.pop(resource, None)
+
+    def stamp(self, **fields):
+        """Sets `fields` (e.g. region, account) on every row."""
+        with self.lock:
+            for rows in self.rows.values():
+                update_each(rows, lambda row: row.update(fields))
+            self._columns.clear()
+
+    def merge(self, other, **fields):
+        """Moves another inventory's rows in, stamping `fields` (e.g. region, account) on each.
+
+        `other` is left empty, and its share of the budget is given back.
+        """
+        with self.lock:
+            for resource, rows in other.rows.items():
+                target = self._rows(resource)
+                for row in rows:
+                    row.update(fields)
+                    target.append(row)
+                if isinstance(rows, SpillList):
+                    rows.clear()
+                self._columns.pop(resource, None)
+            other.rows = {}
+            other._columns = {}
+
+    def annotate_tags(self, tag_index):
+        def annotate(row):
+            row['tags'] = tag_index.lookup({'ID': row.get('id'), 'ARN': row.get('arn')})
+
+        with self.lock:
+            for rows in self.rows.values():
+                update_each(rows, annotate)
+            self._columns.clear()
+
+    def columns(self, resource):
+        """Returns {column: list of values} for one resource type (None where a row lacks it)."""
+        with self.lock:
+            if resource not in self._columns:
+                rows = self.rows.get(resource, [])
+                names = {name for row in rows for name in row}
+                # One more pass fills every column, so spilled rows are only read twice in total
+                columns = {name: [] for name in names}
+                for row in rows:
+                    for name, values in columns.items():
+                        values.append(row.get(name))
+                self._columns[resource] = columns
+            return self._columns[resource]
+
+    def count(self, resource):
+        return len(self.rows.get(resource, []))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps({resource: list(rows) for resource, rows in self.rows.items()}), 6))
+
+    @classmethod
+    def load(cls, path):
+        inventory = cls()
+        with open(path, 'rb') as f:
+            inventory.rows = pickle.loads(zlib.decompress(f.read()))
+        return inventory
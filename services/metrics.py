@@ -0,0 +1,114 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal Prometheus text-format registry; scans write to it, scrapes only read a snapshot.
+
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+THROTTLE_CODES = {'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException', 'SlowDown'}
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meta = {}          # name -> (type, help)
+        self.values = {}        # name -> {labels tuple: value}
+        self.histograms = {}    # name -> {labels tuple: [bucket counts, sum, count]}
+
+    def describe(self, name, kind, text):
+        self.meta[name] = (kind, text)
+
+    def inc(self, name, labels, amount=1.0):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set(self, name, labels, value):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values.setdefault(name, {})[key] = value
+
+    def observe(self, name, labels, value):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            buckets, total, count = series.get(key) or ([0] * (len(DURATION_BUCKETS) + 1), 0.0, 0)
+            buckets = list(buckets)  # Copy-on-write: render() reads snapshots outside the lock
+            buckets[bisect.bisect_left(DURATION_BUCKETS, value)] += 1
+            series[key] = (buckets, total + value, count + 1)
+
+    def render(self):
+        with self.lock:
+            values = {name: dict(series) for name, series in self.values.items()}
+            histograms = {name: dict(series) for name, series in self.histograms.items()}
+
+        lines = []
+        for name in sorted(set(values) | set(histograms)):
+            kind, text = self.meta.get(name, ('untyped', ''))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(values.get(name, {}).items()):
+                lines.append(f"{name}{_labels(key)} {value}")
+            for key, (buckets, total, count) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, n in zip(DURATION_BUCKETS + ('+Inf',), buckets):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(key + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(key)} {total}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _labels(key):
+    if not key:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+METRICS = MetricsRegistry()
+METRICS.describe('cost_optimizer_monthly_waste_dollars', 'gauge', "Estimated monthly waste of flagged resources (USD).")
+METRICS.describe('cost_optimizer_findings', 'gauge', "Number of flagged resources.")
+METRICS.describe('cost_optimizer_scanner_duration_seconds', 'histogram', "Wall time of one scanner run.")
+METRICS.describe('cost_optimizer_scanner_errors_total', 'counter', "Errors scanners raised or recovered from (services/scan_errors.py).")
+METRICS.describe('cost_optimizer_last_scan_timestamp_seconds', 'gauge', "Unix time the scanner last completed without errors.")
+METRICS.describe('cost_optimizer_aws_requests_total', 'counter', "HTTP requests sent to AWS (cache hits excluded).")
+METRICS.describe('cost_optimizer_aws_throttles_total', 'counter', "AWS responses that were throttled.")
+
+def record_findings(label, region, account, findings):
+    labels = {'service': label, 'region': region, 'account': account}
+    METRICS.set('cost_optimizer_monthly_waste_dollars', labels, sum(item.get('Cost', 0.0) for item in findings))
+    METRICS.set('cost_optimizer_findings', labels, len(findings))
+
+def instrument_client(client):
+    """Counts requests and throttles through the client's botocore events."""
+    service = client.meta.service_model.service_id.hyphenize()
+
+    def count_request(event_name, **kwargs):
+        METRICS.inc('cost_optimizer_aws_requests_total', {'service': service, 'operation': event_name.split('.')[-1]})
+
+    def count_throttle(event_name, response=None, **kwargs):
+        if response and response[1].get('Error', {}).get('Code') in THROTTLE_CODES:
+            METRICS.inc('cost_optimizer_aws_throttles_total', {'service': service, 'operation': event_name.split('.')[-1]})
+
+    client.meta.events.register(f'before-send.{service}', count_request)
+    client.meta.events.register(f'needs-retry.{service}', count_throttle)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = METRICS.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port, host=''):
+    """Serves /metrics from a daemon thread and returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,46 +1,54 @@
-import boto3
-from datetime import datetime, timedelta
+from services.clients import batched
+from services.cw_cache import get_metric_series_many
 from services.pricing import PRICING
+from services.scan_errors import report_error
 
 class NATScanner:
-    def __init__(self, ec2_client, cw_client):
+    def __init__(self, ec2_client, cw_client, inventory=None):
         self.ec2 = ec2_client
         self.cw = cw_client
+        self.inventory = inventory
 
     def get_idle_nats(self):
         response = self.ec2.describe_nat_gateways()
         idle_list = []
 
-        for nat in response.get('NatGateways', []):
-            nat_id = nat['NatGatewayId']
-            if nat['State'] != 'available':
-                continue
-            
-            try:
-                metric_data = self.cw.get_metric_statistics(
-                    Namespace='AWS/NATGateway',
-                    MetricName='ConnectionEstablishedCount',
-                    Dimensions=[{'Name': 'NatGatewayId', 'Value': nat_id}],
-                    StartTime=datetime.utcnow() - timedelta(days=1),
-                    EndTime=datetime.utcnow(),
-                    Period=86400,
-                    Statistics=['Sum']
-                )
-
-                datapoints = metric_data.get("Datapoints", [])
-
-                if not datapoints or datapoints[0].get('Sum', 0) == 0:
+        available = [nat for nat in response.get('NatGateways', []) if nat['State'] == 'available']
+        for batch in batched(available):
+            # Every gateway's last day of connections at once
+            queries = {nat['NatGatewayId']: ('AWS/NATGateway', 'ConnectionEstablishedCount',
+                                             [{'Name': 'NatGatewayId', 'Value': nat['NatGatewayId']}], 'Sum')
+                       for nat in batch}
+            connections = get_metric_series_many(self.cw, queries, lookback=86400)
+
+            for nat in batch:
+                nat_id = nat['NatGatewayId']
+                links = {
+                    "VpcId": nat.get('VpcId'),
+                    "NetworkInterfaceIds": [a['NetworkInterfaceId'] for a in nat.get('NatGatewayAddresses', []) if a.get('NetworkInterfaceId')],
+                    "AllocationIds": [a['AllocationId'] for a in nat.get('NatGatewayAddresses', []) if a.get('AllocationId')]
+                }
+                series = connections[nat_id]
+                if isinstance(series, Exception):
+                    report_error(f"Error checking NAT Gateway {nat_id}: {series}")
+                    continue
+                _, hourly_connections = series
+
+                if self.inventory is not None:
+                    self.inventory.record('nat', {"id": nat_id, "state": nat['State'], "connections_24h": sum(hourly_connections),
+                                                  "monthly_cost": PRICING['nat_gateway'], **links})
+
+                if sum(hourly_connections) == 0:
                     item = {
                         "ID": nat_id,
                         "Reason": "Idle NAT Gateway",
-                        "Cost": PRICING['nat_gateway']
+                        "Cost": PRICING['nat_gateway'],
+                        **links
                     }
                     idle_list.append(item)
-            except Exception as e:
-                continue
-        
+
         return idle_list
 
-def scan_nat(ec2_client, cw_client): 
-    scanner = NATScanner(ec2_client, cw_client)
+def scan_nat(ec2_client, cw_client, inventory=None): 
+    scanner = NATScanner(ec2_client, cw_client, inventory)
     return scanner.get_idle_nats()
\ No newline at end of file
@@ -15,16 +15,52 @@ PRICING = {
     # STORAGE (Per GB)
     'gp2': 0.10,
     'gp3': 0.08,
+    'io1': 0.125,
+    'io2': 0.125,
+
+    # EBS provisioned performance (per IOPS / per MiB/s, monthly)
+    'gp3_iops': 0.005,        # Above the free 3,000 IOPS
+    'gp3_throughput': 0.04,   # Above the free 125 MiB/s
+    'io1_iops': 0.065,
+    'io2_iops': 0.065,        # First tier (up to 32,000 IOPS)
+
+    # S3 (Per GB, by storage class)
+    's3_standard': 0.023,
+    's3_reduced_redundancy': 0.024,
+    's3_intelligent_tiering': 0.023,
+    's3_standard_ia': 0.0125,
+    's3_onezone_ia': 0.01,
+    's3_glacier_ir': 0.004,
+    's3_glacier': 0.0036,
+    's3_deep_archive': 0.00099,
     
     # NETWORK / OTHER
     'nat_gateway': 33.58,
     'elastic_ip': 3.65,
-    'alb': 16.42
+    'alb': 16.42,
+    'nlb': 16.42,
+
+    # CONTAINERS
+    'eks_cluster': 72.00  # $0.10/hr * 720 hours
 }
 
 def get_ec2_price(instance_type):
     return PRICING.get(instance_type, 50.00) # Default estimate
 
-def get_ebs_price(size, vol_type):
+def get_s3_price(storage_class):
+    return PRICING.get(f"s3_{storage_class.lower()}", PRICING['s3_standard'])
+
+# gp3 includes this much performance in the per-GB price
+GP3_BASELINE_IOPS = 3000
+GP3_BASELINE_THROUGHPUT = 125
+
+def get_ebs_price(size, vol_type, iops=0, throughput=0):
     rate = PRICING.get(vol_type, 0.10)
-    return float(size) * rate
\ No newline at end of file
+    cost = float(size) * rate
+    # Provisioned performance, where the volume type bills for it
+    if vol_type == 'gp3':
+        cost += max(0, (iops or 0) - GP3_BASELINE_IOPS) * PRICING['gp3_iops']
+        cost += max(0, (throughput or 0) - GP3_BASELINE_THROUGHPUT) * PRICING['gp3_throughput']
+    elif vol_type in ('io1', 'io2'):
+        cost += (iops or 0) * PRICING[f"{vol_type}_iops"]
+    return cost
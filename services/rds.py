@@ -1,4 +1,4 @@
-import boto3
+from services.spill import findings_list
 
 class rds_scanner():
     def __init__(self,client):
@@ -9,12 +9,13 @@ class rds_scanner():
     def get_rds(self):
         list_of_rds = self.client.describe_db_instances()['DBInstances']
 
-        clean_list = []
+        clean_list = findings_list()
 
         for rds in list_of_rds:
             if rds['DBInstanceStatus'] == 'available':
                 item = {
                     "ID": rds['DBInstanceIdentifier'],
+                    "ARN": rds.get('DBInstanceArn'),
                     "Engine": rds['Engine'],
                     "Cost": 15.0
                 }
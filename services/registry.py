@@ -0,0 +1,42 @@
+import importlib
+
+# Scanner modules are imported only when a scan actually runs (see ScannerSpec.load),
+# so the entry points never pay for scanners the user didn't select.
+
+class ScannerSpec:
+    def __init__(self, key, label, module, function, clients, category, resource=None):
+        self.key = key              # CLI name, e.g. `--only ebs`
+        self.label = label          # Report / dashboard heading
+        self.module = module
+        self.function = function
+        self.clients = clients      # boto3 service names, passed positionally
+        self.category = category
+        self.resource = resource    # Inventory type the scanner records (services/inventory.py), if any
+
+    def load(self):
+        return getattr(importlib.import_module(self.module), self.function)
+
+SCANNERS = [
+    ScannerSpec('ebs', 'EBS Volumes', 'services.ebs', 'scan_ebs', ['ec2'], 'Storage', 'ebs'),
+    ScannerSpec('ebs-rightsizing', 'EBS Rightsizing', 'services.ebs_rightsizing', 'scan_ebs_rightsizing', ['ec2', 'cloudwatch'], 'Storage'),
+    ScannerSpec('eip', 'Elastic IPs', 'services.elastic_ip', 'scan_eip', ['ec2'], 'Network'),
+    ScannerSpec('alb', 'Load Balancers', 'services.alb', 'scan_alb', ['elbv2', 'cloudwatch'], 'Network', 'alb'),
+    ScannerSpec('nat', 'NAT Gateways', 'services.nat_gateway', 'scan_nat', ['ec2', 'cloudwatch'], 'Network', 'nat'),
+    ScannerSpec('snapshot', 'Snapshots', 'services.snapshot', 'scan_snapshots', ['ec2'], 'Storage', 'snapshot'),
+    ScannerSpec('rds', 'RDS Instances', 'services.rds', 'scan_rds', ['rds'], 'Database'),
+    ScannerSpec('s3', 'S3 Buckets', 'services.s3', 'scan_s3', ['s3'], 'Storage', 's3'),
+    ScannerSpec('ec2', 'EC2 Instances', 'services.ec2', 'scan_ec2', ['ec2', 'cloudwatch'], 'Compute', 'ec2'),
+    ScannerSpec('eks', 'EKS Clusters', 'services.eks', 'scan_eks', ['eks'], 'Compute'),
+    ScannerSpec('vpc', 'VPC & Public IPs', 'services.vpc', 'scan_vpc', ['ec2'], 'Network'),
+]
+
+SCANNERS_BY_KEY = {spec.key: spec for spec in SCANNERS}
+
+def select_scanners(keys=None):
+    """Returns specs for the given keys (all scanners if keys is empty), in registry order."""
+    if not keys:
+        return list(SCANNERS)
+    unknown = [k for k in keys if k not in SCANNERS_BY_KEY]
+    if unknown:
+        raise ValueError(f"Unknown scanner(s): {', '.join(unknown)}. Choose from: {', '.join(SCANNERS_BY_KEY)}")
+    return [spec for spec in SCANNERS if spec.key in keys]
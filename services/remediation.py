@@ -0,0 +1,178 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from services.clients import get_client
+
+# Report section -> (client, API, ID parameter)
+ACTIONS = {
+    'Snapshots': ('ec2', 'delete_snapshot', 'SnapshotId'),
+    'EBS Volumes': ('ec2', 'delete_volume', 'VolumeId'),
+    'Elastic IPs': ('ec2', 'release_address', 'AllocationId'),
+    'NAT Gateways': ('ec2', 'delete_nat_gateway', 'NatGatewayId'),
+}
+
+# Calls per second per API, kept under EC2's mutating-action throttle buckets
+RATE_LIMITS = {
+    'delete_snapshot': 20,
+    'delete_volume': 10,
+    'release_address': 5,
+    'delete_nat_gateway': 2,
+}
+
+# The resource is already gone: a retry or resume after a crash counts it as done
+ALREADY_DONE = {
+    'InvalidSnapshot.NotFound',
+    'InvalidVolume.NotFound',
+    'InvalidAllocationID.NotFound',
+    'InvalidAddress.NotFound',
+    'NatGatewayNotFound',
+}
+THROTTLED = {'Throttling', 'ThrottlingException', 'RequestLimitExceeded'}
+DONE_STATUSES = ('deleted', 'already_gone')
+
+def build_plan(cloud_data, degraded=()):
+    """Turns scan findings into a reviewable list of deletions.
+
+    Services in `degraded` (scanners that failed or hit errors this run, see run_scans `errors`)
+    are left out: their findings may rest on a listing that didn't complete.
+    """
+    actions = []
+    skipped = []
+    for service, items in cloud_data.items():
+        if service not in ACTIONS:
+            continue
+        if service in degraded:
+            skipped.append(service)
+            continue
+        client, api, param = ACTIONS[service]
+        for item in items:
+            actions.append({
+                "id": f"{item.get('Account', 'unknown')}/{item.get('Region')}/{item['ID']}",
+                "service": service,
+                "region": item.get('Region'),
+                "client": client,
+                "api": api,
+                "params": {param: item['ID']},
+                "reason": item.get('Reason'),
+                "cost": item.get('Cost', 0.0),
+            })
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "monthly_savings": sum(a['cost'] for a in actions),
+        "skipped_services": skipped,
+        "actions": actions,
+    }
+
+def write_plan(plan, path):
+    with open(path, 'w') as f:
+        json.dump(plan, f, indent=2)
+
+def read_plan(path):
+    with open(path) as f:
+        return json.load(f)
+
+class RateLimiter:
+    """Token bucket: allows `rate` calls per second with bursts up to `rate`."""
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RemediationExecutor:
+    def __init__(self, plan, log_path, workers=16, rate_limits=None, dry_run=False, max_retries=6):
+        self.plan = plan
+        self.log_path = log_path
+        self.workers = workers
+        self.dry_run = dry_run
+        self.max_retries = max_retries
+        self.limiters = {api: RateLimiter(rate) for api, rate in dict(RATE_LIMITS, **(rate_limits or {})).items()}
+        self.log_lock = threading.Lock()
+
+    def completed(self):
+        """IDs already finished according to the progress log (for resume)."""
+        done = set()
+        try:
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a crash
+                    if entry.get('status') in DONE_STATUSES:
+                        done.add(entry['id'])
+        except FileNotFoundError:
+            pass
+        return done
+
+    def _log(self, action, status, error=None):
+        entry = {"id": action['id'], "api": action['api'], "status": status, "error": error,
+                 "time": datetime.now(timezone.utc).isoformat()}
+        with self.log_lock:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+
+    def _execute(self, action):
+        client = get_client(action['client'], action['region'])
+        call = getattr(client, action['api'])
+        limiter = self.limiters.get(action['api'])
+
+        for attempt in range(self.max_retries):
+            if limiter:
+                limiter.acquire()
+            try:
+                if self.dry_run:
+                    call(DryRun=True, **action['params'])
+                else:
+                    call(**action['params'])
+                return 'deleted'
+            except Exception as e:
+                code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+                if code == 'DryRunOperation':
+                    return 'dry_run_ok'
+                if code in ALREADY_DONE:
+                    return 'already_gone'
+                if code in THROTTLED and attempt < self.max_retries - 1:
+                    # Exponential backoff with jitter, so workers don't retry in lockstep
+                    time.sleep(min(30, 2 ** attempt) * random.uniform(0.5, 1.0))
+                    continue
+                raise
+
+    def run(self, progress=print):
+        done = self.completed()
+        pending = [a for a in self.plan['actions'] if a['id'] not in done]
+        counts = {}
+        if progress:
+            progress(f"   ... {len(pending)} actions to run ({len(done)} already done)")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._execute, action): action for action in pending}
+            for n, future in enumerate(as_completed(futures), 1):
+                action = futures[future]
+                try:
+                    status, error = future.result(), None
+                except Exception as e:
+                    status, error = 'failed', str(e)
+                if not self.dry_run:
+                    self._log(action, status, error)
+                counts[status] = counts.get(status, 0) + 1
+                if progress and (n % 500 == 0 or n == len(pending)):
+                    progress(f"   ... {n}/{len(pending)} " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+
+        return counts
@@ -0,0 +1,170 @@
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from services.tags import get_tag
+
+# The latest completed scan, saved by main.py and exporter.py for api.py to serve.
+# Snapshots are written to a temp file and renamed into place, so readers never see half a scan.
+
+RESULTS_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'cost-optimizer', 'results', 'latest.json.gz')
+
+SORT_FIELDS = ('Cost', 'ID', 'Service', 'Region', 'Account', 'Reason')
+MAX_VIEWS = 32   # Filtered/sorted orderings kept per scan, so paging doesn't redo the work
+
+def save_results(cloud_data, path=RESULTS_PATH, **meta):
+    """Saves {service: findings} (lists or SpillLists) as the latest completed scan; returns its scan ID."""
+    scan_id = uuid.uuid4().hex[:16]
+    header = dict(meta, scan_id=scan_id, finished=time.time())
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(tmp, 'wt', compresslevel=6) as f:
+            # One finding at a time, so spilled findings (services/spill.py) aren't loaded all at once
+            f.write(json.dumps(header, default=str)[:-1] + ', "findings": {')
+            for n, (service, items) in enumerate(cloud_data.items()):
+                f.write(f'{", " if n else ""}{json.dumps(service)}: [')
+                for i, item in enumerate(items):
+                    f.write((", " if i else "") + json.dumps(item, default=str))
+                f.write(']')
+            f.write('}}')
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"  Error saving results: {e}")
+        return None
+    return scan_id
+
+class ScanResults:
+    """One saved scan, flattened for filtering, sorting and lookup by resource ID."""
+    def __init__(self, data):
+        self.scan_id = data['scan_id']
+        self.finished = data['finished']
+        self.meta = {k: v for k, v in data.items() if k != 'findings'}
+        self.services = list(data['findings'])
+        self.items = []
+        self.by_id = {}
+        for service, items in data['findings'].items():
+            for item in items:
+                item['Service'] = service
+                self.by_id.setdefault(str(item.get('ID')), []).append(len(self.items))
+                self.items.append(item)
+        self.views = OrderedDict()
+        self.lock = threading.Lock()
+        self._summary = None
+
+    @classmethod
+    def load(cls, path=RESULTS_PATH):
+        with gzip.open(path, 'rt') as f:
+            return cls(json.load(f))
+
+    def summary(self):
+        if self._summary is None:
+            self._summary = self._totals()
+        return self._summary
+
+    def _totals(self):
+        services = {service: [0, 0.0] for service in self.services}
+        for item in self.items:
+            totals = services[item['Service']]
+            totals[0] += 1
+            totals[1] += item.get('Cost') or 0.0
+        return dict(self.meta,
+                    total_findings=len(self.items),
+                    total_cost=round(sum(cost for _, cost in services.values()), 2),
+                    services=[{'service': s, 'findings': n, 'cost': round(cost, 2)} for s, (n, cost) in services.items()])
+
+    def lookup(self, resource_id):
+        return [self.items[i] for i in self.by_id.get(resource_id, [])]
+
+    def view(self, filters, sort):
+        """Returns positions of the findings matching `filters`, ordered by `sort` (e.g. '-Cost')."""
+        key = (json.dumps(filters, sort_keys=True), sort)
+        with self.lock:
+            if key in self.views:
+                self.views.move_to_end(key)
+                return self.views[key]
+
+        match = _matcher(filters)
+        positions = [i for i, item in enumerate(self.items) if match(item)]
+        field = sort.lstrip('-')
+        if field == 'Cost':
+            positions.sort(key=lambda i: self.items[i].get('Cost') or 0.0, reverse=sort.startswith('-'))
+        else:
+            positions.sort(key=lambda i: str(self.items[i].get(field) or ''), reverse=sort.startswith('-'))
+
+        with self.lock:
+            self.views[key] = positions
+            if len(self.views) > MAX_VIEWS:
+                self.views.popitem(last=False)
+        return positions
+
+    def page(self, filters, sort, cursor=None, limit=100):
+        """Returns (findings, next cursor or None, total matching) for one page of a view."""
+        positions = self.view(filters, sort)
+        offset = decode_cursor(cursor, self.scan_id) if cursor else 0
+        end = offset + limit
+        next_cursor = encode_cursor(self.scan_id, end) if end < len(positions) else None
+        return [self.items[i] for i in positions[offset:end]], next_cursor, len(positions)
+
+def _matcher(filters):
+    services = set(filters.get('service') or [])
+    tags = filters.get('tags') or {}
+    text = (filters.get('q') or '').lower()
+
+    def match(item):
+        if services and item['Service'] not in services:
+            return False
+        for field in ('region', 'account'):
+            if filters.get(field) and item.get(field.capitalize()) != filters[field]:
+                return False
+        if filters.get('min_cost') is not None and (item.get('Cost') or 0.0) < filters['min_cost']:
+            return False
+        if any(get_tag(item, k) != v for k, v in tags.items()):
+            return False
+        return not text or text in str(item.get('ID', '')).lower() or text in str(item.get('Reason', '')).lower()
+    return match
+
+class StaleCursor(ValueError):
+    """The cursor belongs to an older scan (or isn't a cursor); paging has to start over."""
+
+def encode_cursor(scan_id, offset):
+    raw = json.dumps({'scan': scan_id, 'offset': offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, scan_id):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        offset = max(0, int(data['offset']))
+    except (ValueError, KeyError, TypeError):
+        raise StaleCursor(f"Invalid cursor '{cursor}'")
+    if data.get('scan') != scan_id:
+        raise StaleCursor("Cursor is from an older scan; start again without one")
+    return offset
+
+class ResultsStore:
+    """Serves the latest saved scan, reloading it when a newer one lands on disk."""
+    def __init__(self, path=RESULTS_PATH):
+        self.path = path
+        self.current = None
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Returns the latest ScanResults, or None before any scan has completed."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return self.current
+        with self.lock:
+            if mtime != self.mtime:
+                self.mtime = mtime
+                try:
+                    self.current = ScanResults.load(self.path)
+                except (OSError, EOFError, ValueError, KeyError, TypeError, AttributeError) as e:
+                    # Truncated or not a saved scan: keep serving the last good one until the file changes
+                    print(f"  Error loading {self.path}, keeping the previous scan: {e}")
+            return self.current
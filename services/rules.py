@@ -0,0 +1,288 @@
+import operator
+import os
+from services.correlation import LINK_FIELDS, LIST_LINK_FIELDS
+from services.tags import apply_tags, tag_value
+
+# Waste policies as data: each rule is a list of conditions over one inventory resource type
+# (services/inventory.py). Conditions are compiled once and evaluated column-wise over every
+# row at the same time, so changing a threshold means re-evaluating, not re-scanning.
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the pure-Python path gives the same answers, just slower
+    np = None
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': lambda value, options: value in options,
+    'not in': lambda value, options: value not in options,
+}
+ORDERED = {'<', '<=', '>', '>='}
+MEMBERSHIP = {'in', 'not in'}
+MATCH_FIELDS = ('account', 'region')
+
+class Rule:
+    def __init__(self, name, resource, service, when, reason, cost, params=None):
+        self.name = name
+        self.resource = resource    # Inventory type, e.g. 'ec2'
+        self.service = service      # Report heading the findings go under, e.g. 'EC2 Instances'
+        self.when = []              # [(column, op, value or '$param')], all must hold
+        self.reason = reason        # str.format template over the row, e.g. "Zombie {instance_type}"
+        self.cost = cost            # Column name or a fixed monthly amount
+        self.params = dict(params or {})
+
+        for condition in when:
+            if len(condition) != 3:
+                raise ValueError(f"Rule '{name}': conditions are [column, operator, value], got {condition}")
+            column, op, value = condition
+            if op not in OPERATORS:
+                raise ValueError(f"Rule '{name}': unknown operator '{op}'. Choose from: {', '.join(OPERATORS)}")
+            if isinstance(value, str) and value.startswith('$') and value[1:] not in self.params:
+                raise ValueError(f"Rule '{name}': '{value}' is not in params")
+            self.when.append((column, op, value))
+
+class Override:
+    """Replaces rule params for resources matching an account/region and/or tags."""
+    def __init__(self, match, params, rules=None):
+        self.match = match
+        self.params = params
+        self.rules = set(rules) if rules else None  # Rule names; None means every rule using the param
+
+    def applies_to(self, rule):
+        return (self.rules is None or rule.name in self.rules) and any(p in rule.params for p in self.params)
+
+    def mask(self, table):
+        masks = []
+        for field in MATCH_FIELDS:
+            if field in self.match:
+                masks.append(_compare(table.column(field), '==', self.match[field]))
+        for key, value in self.match.get('tags', {}).items():
+            masks.append(_compare(table.tag(key), '==', value))
+        return _all(masks, table.size)
+
+class _Table:
+    """Column view of one resource type; columns, tag columns and override masks are built once per evaluation."""
+    def __init__(self, columns, size):
+        self.columns = columns
+        self.size = size
+        self.cache = {}
+        self.masks = {}
+
+    def column(self, name):
+        if name.startswith('tag:'):
+            return self.tag(name[4:])
+        if name not in self.cache:
+            values = self.columns.get(name) or [None] * self.size
+            self.cache[name] = _array(values)
+        return self.cache[name]
+
+    def compare(self, name, op, value):
+        # Rules tend to share conditions (e.g. state == running); per-row values aren't memoised
+        if isinstance(value, list) and op in MEMBERSHIP:
+            key = (name, op, tuple(value))
+        elif isinstance(value, (str, int, float, bool, type(None))):
+            key = (name, op, value)
+        else:
+            return _compare(self.column(name), op, value)
+        if key not in self.cache:
+            self.cache[key] = _compare(self.column(name), op, value)
+        return self.cache[key]
+
+    def tag(self, key):
+        name = ('tag', key)
+        if name not in self.cache:
+            self.cache[name] = _array([tag_value(t or {}, key) for t in self.columns.get('tags') or [None] * self.size])
+        return self.cache[name]
+
+    def override_mask(self, override):
+        if id(override) not in self.masks:
+            self.masks[id(override)] = override.mask(self)
+        return self.masks[id(override)]
+
+def _array(values):
+    if np is None:
+        return values
+    numeric = all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values)
+    if numeric:
+        # None -> NaN, which fails every comparison just like a missing metric should
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _mask(values):
+    return np.array(values, dtype=bool) if np is not None else values
+
+def _is_numeric(column):
+    return np is not None and isinstance(column, np.ndarray) and column.dtype != object
+
+def _compare(column, op, value):
+    fn = OPERATORS[op]
+    if _is_numeric(column) and op not in MEMBERSHIP:
+        result = fn(column, value)
+        return result & ~np.isnan(column) if op == '!=' else result
+    if np is not None and op in ('==', '!=') and not isinstance(value, (list, np.ndarray)):
+        # Elementwise on object arrays too; None never equals a configured value
+        result = np.asarray(fn(column, value), dtype=bool)
+        return result & (column != None) if op == '!=' else result  # noqa: E711
+
+    # A per-row value (from an override) lines up with the column; anything else applies to every row
+    per_row = op not in MEMBERSHIP and (isinstance(value, list) or np is not None and isinstance(value, np.ndarray))
+    values = value if per_row else [value] * len(column)
+    if op in ORDERED:
+        # Missing values never match; mixed types (e.g. a string where a number is expected) don't either
+        return _mask([c is not None and isinstance(c, (int, float)) and fn(c, v) for c, v in zip(column, values)])
+    return _mask([c is not None and fn(c, v) for c, v in zip(column, values)])
+
+def _all(masks, size):
+    if np is not None:
+        result = np.ones(size, dtype=bool)
+        for m in masks:
+            result &= m
+        return result
+    result = [True] * size
+    for m in masks:
+        result = [a and b for a, b in zip(result, m)]
+    return result
+
+def _not(mask):
+    return ~mask if np is not None else [not m for m in mask]
+
+def _any(a, b):
+    return a | b if np is not None else [x or y for x, y in zip(a, b)]
+
+def _where(mask):
+    if np is not None:
+        return np.flatnonzero(mask).tolist()
+    return [i for i, m in enumerate(mask) if m]
+
+class RuleSet:
+    def __init__(self, rules, overrides=None):
+        self.rules = rules
+        self.overrides = overrides or []
+        self.tables = {}  # resource -> _Table, reused until the inventory changes
+        names = [rule.name for rule in rules]
+        duplicates = {n for n in names if names.count(n) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate rule name(s): {', '.join(sorted(duplicates))}")
+
+    @classmethod
+    def load(cls, path):
+        """Reads rules from a .toml or .yaml/.yml file."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.toml':
+            try:
+                import tomllib
+            except ImportError:  # Python < 3.11
+                import tomli as tomllib
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+        elif ext in ('.yaml', '.yml'):
+            import yaml
+            with open(path) as f:
+                data = yaml.safe_load(f) or {}
+        else:
+            raise ValueError(f"Unsupported rule file '{path}': use .toml or .yaml")
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data):
+        rules = []
+        for spec in data.get('rules', []):
+            missing = [k for k in ('name', 'resource', 'service', 'when', 'reason', 'cost') if k not in spec]
+            if missing:
+                raise ValueError(f"Rule '{spec.get('name', '?')}' is missing: {', '.join(missing)}")
+            rules.append(Rule(spec['name'], spec['resource'], spec['service'], spec['when'],
+                              spec['reason'], spec['cost'], spec.get('params')))
+        overrides = [Override(o.get('match', {}), o.get('params', {}), o.get('rules')) for o in data.get('overrides', [])]
+        return cls(rules, overrides)
+
+    @property
+    def services(self):
+        """Report headings these rules produce findings for."""
+        return {rule.service for rule in self.rules}
+
+    def _params(self, rule, table):
+        # Scalars unless an override applies, then one value per row
+        params = dict(rule.params)
+        for override in self.overrides:
+            if not override.applies_to(rule):
+                continue
+            mask = table.override_mask(override)
+            for name, value in override.params.items():
+                if name not in rule.params:
+                    continue
+                current = params[name]
+                if np is not None:
+                    if not isinstance(current, np.ndarray):
+                        numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (current, value))
+                        current = np.full(table.size, current, dtype=float if numeric else object)
+                    current = np.where(mask, value, current)
+                else:
+                    if not isinstance(current, list):
+                        current = [current] * table.size
+                    current = [value if m else c for m, c in zip(mask, current)]
+                params[name] = current
+        return params
+
+    def _finding(self, rule, row):
+        try:
+            reason = rule.reason.format(**row)
+        except (KeyError, ValueError, TypeError):
+            reason = rule.reason
+        cost = row.get(rule.cost) if isinstance(rule.cost, str) else rule.cost
+        item = {
+            "ID": row['id'],
+            "Reason": reason,
+            "Cost": float(cost or 0.0),
+            "Rule": rule.name,
+            "Region": row.get('region'),
+            "Account": row.get('account'),
+        }
+        if row.get('arn'):
+            item['ARN'] = row['arn']
+        for field in LINK_FIELDS + LIST_LINK_FIELDS:
+            if row.get(field):
+                item[field] = row[field]
+        return apply_tags(item, row.get('tags') or {})
+
+    def _table(self, inventory, resource):
+        columns = inventory.columns(resource)
+        table = self.tables.get(resource)
+        if table is None or table.columns is not columns:
+            table = self.tables[resource] = _Table(columns, inventory.count(resource))
+        return table
+
+    def evaluate(self, inventory):
+        """Returns {service: findings} for every rule; a resource is reported once per service (first rule wins)."""
+        # Findings share the inventory's memory budget (services/spill.py), if it has one
+        budget = inventory.budget
+        findings = {service: budget.list(service) if budget else [] for service in self.services}
+        claimed = {}  # (service, resource) -> mask of rows already reported
+
+        for rule in self.rules:
+            table = self._table(inventory, rule.resource)
+            if not table.size:
+                continue
+
+            params = self._params(rule, table)
+            masks = []
+            for column, op, value in rule.when:
+                if isinstance(value, str) and value.startswith('$'):
+                    value = params[value[1:]]
+                masks.append(table.compare(column, op, value))
+
+            key = (rule.service, rule.resource)
+            if key in claimed:
+                masks.append(_not(claimed[key]))
+            mask = _all(masks, table.size)
+            claimed[key] = _any(claimed[key], mask) if key in claimed else mask
+
+            rows = inventory.rows[rule.resource]
+            findings[rule.service].extend(self._finding(rule, rows[i]) for i in _where(mask))
+        return findings
@@ -0,0 +1,143 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.cache import use_cache_bypass
+from services.checkpoint import use_checkpoint
+from services.clients import get_account_id, get_client
+from services.inventory import Inventory
+from services.metrics import METRICS, record_findings
+from services.scan_errors import use_error_log
+from services.spill import SpillList, update_each, use_budget
+from services.tags import build_tag_index
+
+def run_scanner(spec, region, inventory=None, checkpoint=None, clients=get_client, errors=None, budget=None,
+                bypass_cache=False):
+    started = time.time()
+    # Pool threads are reused: always reset
+    use_checkpoint(checkpoint)
+    use_error_log(errors)
+    use_budget(budget, spec.label)
+    use_cache_bypass(bypass_cache)
+    try:
+        scan = spec.load()
+        scan_clients = [clients(name, region) for name in spec.clients]
+        if inventory is not None and spec.resource:
+            return scan(*scan_clients, inventory=inventory)
+        return scan(*scan_clients)
+    finally:
+        METRICS.observe('cost_optimizer_scanner_duration_seconds', {'scanner': spec.key, 'region': region}, time.time() - started)
+
+def _tag_index(client, bypass_cache):
+    use_cache_bypass(bypass_cache)
+    return build_tag_index(client)
+
+def run_scans(specs, region, max_workers=10, tags=True, progress=None, inventory=None, checkpoint=None, budget=None,
+              analysis=None, clients=get_client, errors=None, bypass_cache=False):
+    """Runs the given scanners concurrently and returns {label: findings}.
+
+    If `inventory` is given, every resource the scanners looked at is added to it as well.
+    With a `checkpoint` (services/checkpoint.py), scanners already finished for this region and
+    account are restored from it instead of run, and each one is recorded as soon as it finishes.
+    With a `budget` (services/spill.py), findings are returned as SpillLists charged to it, and
+    findings and inventory rows spill past it while each scanner is still running.
+    With an `analysis` pool (services/analysis.py), each scanner's inventory rows are queued
+    for rule evaluation as soon as it lands, while the rest are still scanning.
+    `clients` is the (service, region) -> client factory; services/aio.py passes its own.
+    If `errors` (a dict) is given, it gets {label: messages} for every scanner that failed or
+    recovered from errors (services/scan_errors.py), i.e. whose findings are incomplete.
+    With `bypass_cache`, this scan's calls skip cached responses and series (services/cache.py),
+    whatever the process-wide caches are set to.
+    """
+    results = {}
+    unit_errors = {spec.key: [] for spec in specs}
+    scanned = {spec.key: Inventory(budget) for spec in specs} if inventory is not None else {}
+
+    def hand_over(spec, account):
+        part = scanned.pop(spec.key)
+        # Rules may read tags, region and account, so the batch gets them before it leaves
+        if analysis is not None and tag_future:
+            part.annotate_tags(tag_future.result())
+        part.stamp(region=region, account=account)
+        if analysis is not None:
+            analysis.submit_inventory(part)
+        # Moved (and spilled, past the budget), not kept twice
+        inventory.merge(part)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Tag sweep and account lookup run alongside the scanners
+        account_future = executor.submit(get_account_id, region)
+        tag_future = executor.submit(_tag_index, clients('resourcegroupstaggingapi', region), bypass_cache) if tags else None
+
+        # Resuming needs the account up front, to know which units are already done
+        account = account_future.result() if checkpoint else None
+        future_to_spec = {}
+        for spec in specs:
+            saved = checkpoint.unit(spec.key, region, account) if checkpoint else None
+            if saved is not None:
+                items, rows = saved
+                results[spec.label] = budget.list(spec.label, items) if budget else items
+                if inventory is not None and rows is not None:
+                    scanned[spec.key].rows = rows
+                    hand_over(spec, account)
+                if progress:
+                    progress(f"   ... Resumed {spec.label} ({len(items)} findings)")
+                continue
+            if progress:
+                progress(f"   ... Scanning {spec.label}")
+            future_to_spec[executor.submit(run_scanner, spec, region, scanned.get(spec.key), checkpoint, clients,
+                                           unit_errors[spec.key], budget, bypass_cache)] = spec
+
+        account = account_future.result()
+        for future in as_completed(future_to_spec):
+            spec = future_to_spec[future]
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"  Error scanning {spec.label}: {e}")
+                unit_errors[spec.key].append(str(e))
+                items = None
+            if unit_errors[spec.key]:
+                # Raised, or recovered and kept going: either way the findings are incomplete
+                METRICS.inc('cost_optimizer_scanner_errors_total', {'scanner': spec.key, 'region': region}, len(unit_errors[spec.key]))
+                if errors is not None:
+                    errors.setdefault(spec.label, []).extend(unit_errors[spec.key])
+
+            # Every finding carries where it came from, for drill-down and multi-region reports
+            update_each(items or [], lambda item: item.update(Region=region, Account=account))
+            # Failed or degraded scanners aren't checkpointed, so a resumed scan retries them
+            if checkpoint and items is not None and not unit_errors[spec.key]:
+                rows = {resource: list(part) for resource, part in scanned[spec.key].rows.items()} if spec.key in scanned else None
+                checkpoint.finish(spec.key, region, account, list(items), rows)
+            items = items or []
+            if budget and not isinstance(items, SpillList):
+                items = budget.list(spec.label, items)
+            results[spec.label] = items
+            if inventory is not None:
+                hand_over(spec, account)
+
+            # Exported gauges move as each scanner lands, not at the end of the whole scan. A failed or
+            # degraded run keeps the last complete values: zero or partial counts would read as savings.
+            if not unit_errors[spec.key]:
+                record_findings(spec.label, region, account, items)
+                METRICS.set('cost_optimizer_last_scan_timestamp_seconds', {'scanner': spec.key, 'region': region}, time.time())
+
+        if tag_future:
+            tag_index = tag_future.result()
+            for items in results.values():
+                tag_index.annotate(items)
+            if inventory is not None and analysis is None:  # Otherwise tagged on hand-over
+                inventory.annotate_tags(tag_index)
+
+    # Keep registry order regardless of completion order
+    return {spec.label: results[spec.label] for spec in specs}
+
+def merge_results(parts, budget=None):
+    """Combines {label: findings} from several run_scans calls (e.g. one per region), keeping label order."""
+    if len(parts) == 1:
+        return parts[0]
+    merged = {}
+    for part in parts:
+        for label, items in part.items():
+            if label not in merged:
+                merged[label] = budget.list(label) if budget else []
+            merged[label].extend(items)
+    return merged
@@ -1,49 +1,59 @@
-import boto3
 from datetime import datetime, timezone
+from services.clients import batched, call_all
+from services.scan_errors import report_error
+from services.spill import findings_list
 
 class S3Scanner:
-    def __init__(self, s3_client):
+    def __init__(self, s3_client, inventory=None):
         self.s3 = s3_client
+        self.inventory = inventory
 
     def get_stale_buckets(self):
         try:
-            response = self.s3.list_buckets()
-            buckets = response['Buckets']
+            # Bucket listing is global: only this region's buckets, so a multi-region scan counts each once
+            region = self.s3.meta.region_name
+            paginator = self.s3.get_paginator('list_buckets')
+            buckets = [b for page in paginator.paginate(BucketRegion=region) for b in page.get('Buckets', [])]
         except Exception as e:
-            print(f"Error listing buckets: {e}")
+            report_error(f"Error listing buckets: {e}")
             return []
 
-        waste_list = []
-        
-        for bucket in buckets:
-            b_name = bucket['Name']
-            
-            try:
-                
-                objects = self.s3.list_objects_v2(Bucket=b_name, MaxKeys=1000)
-                
+        waste_list = findings_list()
+
+        for batch in batched(buckets):
+            # The first 1,000 objects of every bucket in the batch at once
+            calls = [('list_objects_v2', {'Bucket': b['Name'], 'PaginationConfig': {'MaxItems': 1000, 'PageSize': 1000}})
+                     for b in batch]
+            for bucket, pages in zip(batch, call_all(self.s3, calls)):
+                b_name = bucket['Name']
+                if isinstance(pages, Exception):
+                    report_error(f"Error scanning bucket {b_name}: {pages}")
+                    continue
+                objects = pages[0] if pages else {}
+
                 total_size_bytes = 0
                 last_modified = bucket['CreationDate'] # Default to creation date
-                
+
                 if 'Contents' in objects:
                     for obj in objects['Contents']:
                         total_size_bytes += obj['Size']
-                  
+
                         if obj['LastModified'] > last_modified:
                             last_modified = obj['LastModified']
-                
-          
+
                 total_size_gb = total_size_bytes / (1024 ** 3)
-                
-             # (Mumbai Standard: $0.023/GB)
+
+                # (Mumbai Standard: $0.023/GB)
                 estimated_cost = total_size_gb * 0.023
-                
-               
+                days_inactive = (datetime.now(timezone.utc) - last_modified).days
+
+                if self.inventory is not None:
+                    self.inventory.record('s3', {"id": b_name, "size_gb": total_size_gb, "monthly_cost": estimated_cost,
+                                                 "days_inactive": days_inactive, "objects": objects.get('KeyCount', 0)})
+
                 if estimated_cost < 0.01:
                     continue
 
-                days_inactive = (datetime.now(timezone.utc) - last_modified).days
-                
                 if days_inactive > 90:
                     item = {
                         "ID": b_name,
@@ -52,12 +62,8 @@ class S3Scanner:
                     }
                     waste_list.append(item)
 
-            except Exception as e:
-            
-                continue
-                
         return waste_list
 
-def scan_s3(s3_client):
-    scanner = S3Scanner(s3_client)
+def scan_s3(s3_client, inventory=None):
+    scanner = S3Scanner(s3_client, inventory)
     return scanner.get_stale_buckets()
\ No newline at end of file
@@ -0,0 +1,300 @@
+import csv
+import gzip
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import unquote
+from services.pricing import get_s3_price
+
+# Reads local S3 Inventory reports (manifest.json + CSV/ORC/Parquet data files) instead of listing
+# objects. Each data file is streamed in record batches and folded into small aggregates keyed by
+# (bucket, prefix, storage class, age bucket), one worker process per file, so memory depends on
+# the number of prefixes, not the number of objects.
+
+# Upper bounds (days since last modified) of the age distribution; the last bucket is open-ended
+AGE_EDGES = (30, 90, 180, 365, 730)
+AGE_LABELS = ('< 30d', '30-90d', '90-180d', '180d-1y', '1-2y', '> 2y')
+
+# Objects in these classes that nobody has touched are lifecycle transition candidates
+HOT_CLASSES = ('STANDARD', 'REDUCED_REDUNDANCY')
+# S3 bills IA objects as at least 128 KB, so transitioning smaller ones doesn't save anything
+MIN_TRANSITION_BYTES = 128 * 1024
+OTHER_PREFIX = "(other)"
+BATCH_ROWS = 65536
+
+# Inventory column -> our name; CSV uses the fileSchema names, ORC/Parquet snake_case ones
+COLUMNS = {
+    'bucket': 'bucket',
+    'key': 'key',
+    'size': 'size',
+    'lastmodifieddate': 'last_modified',
+    'storageclass': 'storage_class',
+}
+
+def _normalise(name):
+    return name.strip().lower().replace('_', '')
+
+def _resolve(manifest_path, key):
+    """Finds a data file of the manifest on local disk, wherever the inventory was synced to."""
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    # Synced with `aws s3 sync s3://dest-bucket <root>`: the key is relative to some ancestor
+    ancestor = directory
+    while True:
+        candidate = os.path.join(ancestor, key)
+        if os.path.exists(candidate):
+            return candidate
+        parent = os.path.dirname(ancestor)
+        if parent == ancestor:
+            break
+        ancestor = parent
+    # Or just the report folder: <config>/<timestamp>/manifest.json next to <config>/data/
+    for candidate in (os.path.join(directory, '..', 'data', os.path.basename(key)),
+                      os.path.join(directory, os.path.basename(key))):
+        if os.path.exists(candidate):
+            return os.path.normpath(candidate)
+    raise FileNotFoundError(f"Inventory data file '{key}' not found near {manifest_path}")
+
+def read_manifest(path):
+    """Returns {'bucket', 'format', 'schema', 'files'} for one S3 Inventory manifest.json."""
+    with open(path) as f:
+        manifest = json.load(f)
+    fmt = manifest['fileFormat'].upper()
+    if fmt not in ('CSV', 'ORC', 'PARQUET'):
+        raise ValueError(f"Unsupported S3 Inventory format '{fmt}' in {path}")
+    return {
+        "bucket": manifest.get('sourceBucket'),
+        "format": fmt,
+        # Only CSV needs it: data files have no header row
+        "schema": [name.strip() for name in manifest.get('fileSchema', '').split(',')] if fmt == 'CSV' else None,
+        "files": [_resolve(path, entry['key']) for entry in manifest.get('files', [])],
+    }
+
+class _Aggregate:
+    """Partial result of one data file; merged in the parent process."""
+    def __init__(self, max_prefixes):
+        self.max_prefixes = max_prefixes
+        self.objects = {}   # (bucket, prefix, class, age index) -> [count, bytes]
+        self.cold = {}      # (bucket, prefix, class) -> [count, bytes]
+        self.prefixes = {}  # bucket -> prefixes seen, capped at max_prefixes
+        self.rows = 0
+
+    def _prefix(self, bucket, prefix):
+        seen = self.prefixes.setdefault(bucket, set())
+        if prefix in seen:
+            return prefix
+        if len(seen) >= self.max_prefixes:
+            return OTHER_PREFIX
+        seen.add(prefix)
+        return prefix
+
+    def add(self, table, bucket, prefix, storage_class, age, count, size):
+        slot = table.setdefault((bucket, self._prefix(bucket, prefix), storage_class) + ((age,) if age is not None else ()), [0, 0])
+        slot[0] += count
+        slot[1] += size
+
+    def merge(self, other):
+        for (bucket, prefix, storage_class, age), (count, size) in other.objects.items():
+            self.add(self.objects, bucket, prefix, storage_class, age, count, size)
+        for (bucket, prefix, storage_class), (count, size) in other.cold.items():
+            self.add(self.cold, bucket, prefix, storage_class, None, count, size)
+        self.rows += other.rows
+
+def _prefix_pattern(depth):
+    return r'^((?:[^/]*/){0,%d}).*$' % depth
+
+def _age_index(age_days):
+    for i, edge in enumerate(AGE_EDGES):
+        if age_days < edge:
+            return i
+    return len(AGE_EDGES)
+
+def _scan_csv_python(path, schema, agg, now, depth, cold_days):
+    # Fallback without pyarrow: same aggregates, one row at a time
+    index = {COLUMNS[_normalise(name)]: i for i, name in enumerate(schema) if _normalise(name) in COLUMNS}
+    pattern = re.compile(_prefix_pattern(depth))
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='') as f:
+        for row in csv.reader(f):
+            key = row[index['key']].replace('%2F', '/')
+            size = int(row[index['size']] or 0) if 'size' in index else 0
+            storage_class = row[index['storage_class']] if 'storage_class' in index else 'UNKNOWN'
+            age = 0
+            if 'last_modified' in index and row[index['last_modified']]:
+                modified = datetime.strptime(row[index['last_modified']][:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+                age = int((now - modified.timestamp()) // 86400)
+            bucket, prefix = row[index['bucket']], pattern.sub(r'\1', key)
+            agg.add(agg.objects, bucket, prefix, storage_class, _age_index(age), 1, size)
+            if storage_class in HOT_CLASSES and age >= cold_days and size >= MIN_TRANSITION_BYTES:
+                agg.add(agg.cold, bucket, prefix, storage_class, None, 1, size)
+            agg.rows += 1
+
+def _batches(path, fmt, schema):
+    import pyarrow as pa
+
+    if fmt == 'PARQUET':
+        import pyarrow.parquet as pq
+        reader = pq.ParquetFile(path)
+        names = [n for n in reader.schema_arrow.names if _normalise(n) in COLUMNS]
+        yield from reader.iter_batches(batch_size=BATCH_ROWS, columns=names)
+    elif fmt == 'ORC':
+        import pyarrow.orc as orc
+        reader = orc.ORCFile(path)
+        names = [n for n in reader.schema.names if _normalise(n) in COLUMNS]
+        for stripe in range(reader.nstripes):
+            yield reader.read_stripe(stripe, columns=names)
+    else:
+        import pyarrow.csv as pcsv
+        stream = pa.OSFile(path)
+        if path.endswith('.gz'):
+            stream = pa.CompressedInputStream(stream, 'gzip')
+        names = [n for n in schema if _normalise(n) in COLUMNS]
+        types = {n: pa.int64() for n in names if _normalise(n) == 'size'}
+        reader = pcsv.open_csv(
+            stream,
+            read_options=pcsv.ReadOptions(column_names=schema, block_size=8 << 20),
+            convert_options=pcsv.ConvertOptions(include_columns=names, column_types=types, strings_can_be_null=True),
+        )
+        yield from reader
+
+def _epoch_seconds(column):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        column = pc.strptime(pc.utf8_slice_codeunits(column, 0, 19), format='%Y-%m-%dT%H:%M:%S', unit='s', error_is_null=True)
+    return pc.cast(pc.cast(column, pa.timestamp('s', tz=getattr(column.type, 'tz', None)), safe=False), pa.int64())
+
+def _scan_arrow(path, fmt, schema, agg, now, depth, cold_days):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for batch in _batches(path, fmt, schema):
+        n = batch.num_rows
+        if not n:
+            continue
+        columns = {COLUMNS[_normalise(name)]: batch.column(i) for i, name in enumerate(batch.schema.names)}
+        key = pc.replace_substring(columns['key'], '%2F', '/')
+        size = pc.fill_null(columns['size'], 0) if 'size' in columns else pa.array(np.zeros(n, dtype=np.int64))
+        storage_class = pc.fill_null(columns['storage_class'], 'UNKNOWN') if 'storage_class' in columns else pa.array(['UNKNOWN'] * n)
+        if 'last_modified' in columns:
+            age = ((now - pc.fill_null(_epoch_seconds(columns['last_modified']), int(now)).to_numpy()) // 86400).astype(np.int64)
+        else:
+            age = np.zeros(n, dtype=np.int64)
+
+        table = pa.table({
+            'bucket': columns['bucket'],
+            'prefix': pc.replace_substring_regex(key, _prefix_pattern(depth), r'\1'),
+            'class': storage_class,
+            'age': pa.array(np.searchsorted(AGE_EDGES, age, side='right').astype(np.int8)),
+            'size': size,
+        })
+
+        # Thousands of rows collapse to a handful of groups before touching Python objects
+        grouped = table.group_by(['bucket', 'prefix', 'class', 'age']).aggregate([('size', 'sum'), ('size', 'count')])
+        for row in grouped.to_pylist():
+            agg.add(agg.objects, row['bucket'], row['prefix'], row['class'], row['age'], row['size_count'], row['size_sum'])
+
+        cold = pc.and_(pc.and_(pc.is_in(storage_class, pa.array(HOT_CLASSES)), pa.array(age >= cold_days)),
+                       pc.greater_equal(size, MIN_TRANSITION_BYTES))
+        grouped = table.filter(cold).group_by(['bucket', 'prefix', 'class']).aggregate([('size', 'sum'), ('size', 'count')])
+        for row in grouped.to_pylist():
+            agg.add(agg.cold, row['bucket'], row['prefix'], row['class'], None, row['size_count'], row['size_sum'])
+        agg.rows += n
+
+def _scan_file(path, fmt, schema, now, depth, cold_days, max_prefixes):
+    agg = _Aggregate(max_prefixes)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        if fmt != 'CSV':
+            raise RuntimeError(f"Reading {fmt} inventories needs pyarrow (pip install pyarrow)")
+        _scan_csv_python(path, schema, agg, now, depth, cold_days)
+        return agg
+    _scan_arrow(path, fmt, schema, agg, now, depth, cold_days)
+    return agg
+
+class S3InventoryReport:
+    def __init__(self, agg):
+        self.agg = agg
+
+    @property
+    def rows(self):
+        return self.agg.rows
+
+    def by_bucket(self):
+        """{bucket: {storage class: [objects, bytes]}}"""
+        result = {}
+        for (bucket, _, storage_class, _), (count, size) in self.agg.objects.items():
+            slot = result.setdefault(bucket, {}).setdefault(storage_class, [0, 0])
+            slot[0] += count
+            slot[1] += size
+        return result
+
+    def by_prefix(self):
+        """{(bucket, prefix): {storage class: [objects, bytes]}}"""
+        result = {}
+        for (bucket, prefix, storage_class, _), (count, size) in self.agg.objects.items():
+            slot = result.setdefault((bucket, unquote(prefix) or '/'), {}).setdefault(storage_class, [0, 0])
+            slot[0] += count
+            slot[1] += size
+        return result
+
+    def age_distribution(self):
+        """{bucket: [[objects, bytes] per AGE_LABELS]} by last-modified date."""
+        result = {}
+        for (bucket, _, _, age), (count, size) in self.agg.objects.items():
+            slots = result.setdefault(bucket, [[0, 0] for _ in AGE_LABELS])
+            slots[age][0] += count
+            slots[age][1] += size
+        return result
+
+    def cold_candidates(self, target='STANDARD_IA'):
+        """Prefixes holding old objects in hot classes, with the monthly saving of moving them to `target`."""
+        candidates = {}
+        for (bucket, prefix, storage_class), (count, size) in self.agg.cold.items():
+            saving = size / 1024 ** 3 * (get_s3_price(storage_class) - get_s3_price(target))
+            slot = candidates.setdefault((bucket, unquote(prefix) or '/'), [0, 0, 0.0])
+            slot[0] += count
+            slot[1] += size
+            slot[2] += saving
+        return sorted(
+            ({"bucket": b, "prefix": p, "objects": c, "bytes": s, "monthly_savings": m} for (b, p), (c, s, m) in candidates.items()),
+            key=lambda c: c['monthly_savings'], reverse=True,
+        )
+
+    def findings(self, target='STANDARD_IA', cold_days=90):
+        """Cold candidates in the scanners' finding format."""
+        return [{
+            "ID": f"s3://{c['bucket']}/{'' if c['prefix'] == '/' else c['prefix']}",
+            "Reason": f"{c['objects']:,} objects, {c['bytes'] / 1024 ** 3:.1f} GB untouched {cold_days}+ days -> {target}",
+            "Cost": c['monthly_savings'],
+            "ARN": f"arn:aws:s3:::{c['bucket']}",
+        } for c in self.cold_candidates(target) if c['monthly_savings'] > 0]
+
+def read_inventories(manifest_paths, workers=None, prefix_depth=1, cold_days=90, max_prefixes=10000, progress=None):
+    """Aggregates every data file of the given manifests (one process per file) into an S3InventoryReport."""
+    jobs = []
+    for path in manifest_paths:
+        manifest = read_manifest(path)
+        jobs.extend((f, manifest['format'], manifest['schema']) for f in manifest['files'])
+
+    now = time.time()
+    total = _Aggregate(max_prefixes)
+    if progress:
+        progress(f"   ... Reading {len(jobs)} S3 Inventory data files")
+
+    args = [(f, fmt, schema, now, prefix_depth, cold_days, max_prefixes) for f, fmt, schema in jobs]
+    if len(jobs) <= 1 or workers == 1:
+        for a in args:
+            total.merge(_scan_file(*a))
+    else:
+        with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as executor:
+            for n, agg in enumerate(executor.map(_scan_file, *zip(*args)), 1):
+                total.merge(agg)
+                if progress and n % 10 == 0:
+                    progress(f"   ... {n}/{len(jobs)} files, {total.rows:,} objects")
+    return S3InventoryReport(total)
@@ -0,0 +1,18 @@
+import contextvars
+
+# Errors a scanner recovered from (a failed sub-call, a resource it couldn't judge) and kept going.
+# Its findings are then incomplete: services/runner.py reports the scanner as degraded, and
+# remediation (services/remediation.py) won't build deletions from it.
+
+# The error log of the scanner running on this thread (set per scanner by services/runner.py)
+_current = contextvars.ContextVar('scan_errors', default=None)
+
+def use_error_log(errors):
+    _current.set(errors)
+
+def report_error(message):
+    """Prints `message` and records it against the current scanner."""
+    print(f"  {message}")
+    errors = _current.get()
+    if errors is not None:
+        errors.append(message)
@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+from itertools import product
+from services.checkpoint import current_checkpoint
+from services.clients import call_all
+
+# Splits one big Describe* listing into independent filter shards (per AZ, state, start-time, ...)
+# that are paginated concurrently, so a region with 300k snapshots lists at the speed of its
+# slowest shard instead of one long NextToken walk. Small listings never pay for it: a single
+# probe page decides whether sharding is needed at all.
+# EC2 returns no total to check the shards against, so every shard list is a complete partition
+# by construction: every usable AZ, every instance state in the API model, and a catch-all for
+# start-times outside the month/year range. The probe page is then only a spot check.
+
+def instance_state_shards(ec2_client):
+    """Running, stopped, and every other state the API model knows, so a new state isn't missed."""
+    states = ec2_client.meta.service_model.shape_for('InstanceStateName').enum
+    return [[{'Name': 'instance-state-name', 'Values': ['running']}],
+            [{'Name': 'instance-state-name', 'Values': ['stopped']}],
+            [{'Name': 'instance-state-name', 'Values': [s for s in states if s not in ('running', 'stopped')]}]]
+
+def az_shards(ec2_client, filter_name='availability-zone'):
+    """One shard per usable AZ in the client's region."""
+    response = ec2_client.describe_availability_zones(
+        Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+    )
+    return [[{'Name': filter_name, 'Values': [z['ZoneName']]}] for z in response['AvailabilityZones']]
+
+def start_time_shards(now=None, recent_months=24, first_year=2008):
+    """Month shards for the busy recent past, year shards before that (EBS snapshots date from 2008),
+    and one catch-all for start-times before `first_year` or in a later year (clock skew)."""
+    now = now or datetime.now(timezone.utc)
+    months = []
+    year, month = now.year, now.month
+    for _ in range(recent_months):
+        months.append(f"{year:04d}-{month:02d}-*")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    # Months of the oldest partially-covered year that the month shards didn't reach
+    older = [f"{year:04d}-{m:02d}-*" for m in range(1, month + 1)]
+    shards = [[{'Name': 'start-time', 'Values': [value]}] for value in months]
+    if older:
+        shards.append([{'Name': 'start-time', 'Values': older}])
+    shards.extend([{'Name': 'start-time', 'Values': [f"{y:04d}-*"]}] for y in range(first_year, year))
+    outside = ['1*'] + [f"{y:04d}-*" for y in range(2000, first_year)] + [f"{now.year + 1:04d}-*"]
+    shards.append([{'Name': 'start-time', 'Values': outside}])
+    return shards
+
+def cross(*dimensions):
+    """Combines shard lists, e.g. cross(AZs, states) -> one shard per AZ x state."""
+    return [[f for shard in combo for f in shard] for combo in product(*dimensions)]
+
+class _Walk:
+    """One NextToken chain. With a checkpoint, every page is saved as it lands and an interrupted walk
+    picks up at its NextToken."""
+    def __init__(self, client, operation, extract, params):
+        self.checkpoint = current_checkpoint()
+        self.extract = extract
+        self.params = params
+        self.listing = self.checkpoint.listing(client, operation, params) if self.checkpoint else None
+        self.items, self.token, self.pages = self.checkpoint.pages(self.listing) if self.listing else ([], None, 0)
+
+    def add(self, page):
+        page_items = list(self.extract(page))
+        self.items.extend(page_items)
+        self.pages += 1
+        self.token = page.get('NextToken')
+        if self.listing:
+            self.checkpoint.save_page(self.listing, self.pages, self.token, page_items)
+
+    def remaining(self):
+        """Paginate params for the rest of the chain, or None once it's finished."""
+        if self.pages and not self.token:
+            return None
+        if not self.token:
+            return self.params
+        return dict(self.params, PaginationConfig=dict(self.params.get('PaginationConfig', {}), StartingToken=self.token))
+
+def _walk(client, operation, extract, params, first_page=None):
+    walk = _Walk(client, operation, extract, params)
+    if not walk.pages and first_page is not None:
+        walk.add(first_page)
+    remaining = walk.remaining()
+    if remaining is not None:
+        for page in client.get_paginator(operation).paginate(**remaining):
+            walk.add(page)
+    return walk.items
+
+def list_sharded(client, operation, extract, key, shards, params=None, page_size=1000, max_workers=16):
+    """Lists `operation` across `shards` concurrently and returns items de-duplicated by `key`.
+
+    `shards` is a list of filter lists (or a zero-argument callable returning one, only invoked
+    when the listing turns out to be large). `extract(page)` yields the items of one page.
+    """
+    params = dict(params or {})
+    base_filters = params.get('Filters', [])
+
+    # 1. Probe: one page answers most accounts outright
+    probe = getattr(client, operation)(MaxResults=page_size, **params)
+    if not probe.get('NextToken'):
+        return list(extract(probe))
+
+    if callable(shards):
+        shards = shards()
+    if not shards:
+        return _walk(client, operation, extract, dict(params, PaginationConfig={'PageSize': page_size}), probe)
+
+    # 2. Every shard walks its own NextToken chain concurrently (resumed ones from where they stopped)
+    walks = [_Walk(client, operation, extract, dict(params, Filters=base_filters + shard, PaginationConfig={'PageSize': page_size}))
+             for shard in shards]
+    pending = [walk for walk in walks if walk.remaining() is not None]
+    for pages in call_all(client, [(operation, walk.remaining(), walk.add) for walk in pending], max_workers):
+        if isinstance(pages, Exception):
+            raise pages
+    merged = {}
+    for walk in walks:
+        for item in walk.items:
+            merged.setdefault(key(item), item)
+
+    # 3. Spot check: the shards partition everything, unless a filter isn't honoured; then list serially
+    if any(key(item) not in merged for item in extract(probe)):
+        print(f"  Sharded {operation} missed resources; listing serially")
+        return _walk(client, operation, extract, dict(params, PaginationConfig={'PageSize': page_size}), probe)
+    return list(merged.values())
+
+def list_instances(ec2_client, max_workers=16):
+    """All instances in the region, sharded by AZ x state when there are many."""
+    return list_sharded(
+        ec2_client, 'describe_instances',
+        lambda page: (i for r in page.get('Reservations', []) for i in r['Instances']),
+        lambda i: i['InstanceId'],
+        lambda: cross(az_shards(ec2_client), instance_state_shards(ec2_client)),
+        max_workers=max_workers,
+    )
+
+def list_snapshots(ec2_client, max_workers=16):
+    """All snapshots owned by the account, sharded by start-time month/year when there are many."""
+    return list_sharded(
+        ec2_client, 'describe_snapshots',
+        lambda page: page.get('Snapshots', []),
+        lambda s: s['SnapshotId'],
+        start_time_shards,
+        params={'OwnerIds': ['self']},
+        max_workers=max_workers,
+    )
+
+def list_volumes(ec2_client, filters=None, max_workers=16):
+    """Volumes in the region (optionally filtered), sharded by AZ when there are many."""
+    return list_sharded(
+        ec2_client, 'describe_volumes',
+        lambda page: page.get('Volumes', []),
+        lambda v: v['VolumeId'],
+        lambda: az_shards(ec2_client),
+        params={'Filters': filters} if filters else None,
+        page_size=500,
+        max_workers=max_workers,
+    )
@@ -1,43 +1,54 @@
-import boto3
 from datetime import datetime, timedelta, timezone
+from services.scan_errors import report_error
+from services.sharding import list_snapshots, list_volumes
+from services.spill import findings_list
 
 class SnapshotScanner:
-    def __init__(self, ec2_client):
+    def __init__(self, ec2_client, inventory=None):
         self.ec2 = ec2_client
+        self.inventory = inventory
 
     def get_orphaned_snapshots(self):
        
         try:
-            snapshots = self.ec2.describe_snapshots(OwnerIds=['self'])['Snapshots']
+            # Sharded by start-time in big accounts; a single page otherwise
+            snapshots = list_snapshots(self.ec2)
         except Exception as e:
-            print(f"Error describing snapshots: {e}")
+            report_error(f"Error describing snapshots: {e}")
             return []
         
 
         try:
-            volumes = self.ec2.describe_volumes()['Volumes']
-            active_vols = [v['VolumeId'] for v in volumes]
-        except Exception:
-            active_vols = []
+            active_vols = {v['VolumeId'] for v in list_volumes(self.ec2)}
+        except Exception as e:
+            # Without the volume list every old snapshot would look orphaned
+            report_error(f"Error listing volumes, skipping snapshots: {e}")
+            return []
         
-        trash_list = []
-        threshold_date = datetime.now(timezone.utc) - timedelta(days=30)
+        trash_list = findings_list()
+        now = datetime.now(timezone.utc)
+        threshold_date = now - timedelta(days=30)
 
         for snap in snapshots:
             vol_id = snap.get('VolumeId')
             start_time = snap['StartTime']
 
+            if self.inventory is not None:
+                self.inventory.record('snapshot', {"id": snap['SnapshotId'], "VolumeId": vol_id, "volume_exists": vol_id in active_vols,
+                                                   "age_days": (now - start_time).days, "size_gb": snap['VolumeSize'],
+                                                   "monthly_cost": snap['VolumeSize'] * 0.05})
        
             if vol_id not in active_vols and start_time < threshold_date:
                 item = {
                     "ID": snap['SnapshotId'],
                     "Reason": "Orphaned (>30 days old)",
-                    "Cost": snap['VolumeSize'] * 0.05 # Approx $0.05/GB
+                    "Cost": snap['VolumeSize'] * 0.05, # Approx $0.05/GB
+                    "VolumeId": vol_id
                 }
                 trash_list.append(item)
         
         return trash_list
 
-def scan_snapshots(ec2_client):
-    scanner = SnapshotScanner(ec2_client)
+def scan_snapshots(ec2_client, inventory=None):
+    scanner = SnapshotScanner(ec2_client, inventory)
     return scanner.get_orphaned_snapshots()
\ No newline at end of file
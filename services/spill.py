@@ -0,0 +1,219 @@
+import contextvars
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import weakref
+import zlib
+
+# Keeps a scan's memory predictable: inventory rows and findings are held in SpillLists that
+# charge a shared MemoryBudget, and once it is used up they move to one SQLite file in chunks
+# and are read back a chunk at a time. Spilled rows are copies, so they change via update_each().
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage
+    resource = None
+
+SPILL_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cost-optimizer', 'spill')
+CHUNK_ROWS = 1000
+# Row sizes are measured on a sample; rows of one list look alike
+SAMPLE_EVERY = 64
+
+# The budget of the scan running on this thread and the label its findings go under
+# (set per scanner by services/runner.py)
+_current = contextvars.ContextVar('budget', default=(None, None))
+
+def use_budget(budget, name=None):
+    _current.set((budget, name))
+
+def findings_list():
+    """An empty list for a scanner's findings: a SpillList charged to the running scan's budget if it has
+    one, so findings spill while the scanner is still running instead of after it returns."""
+    budget, name = _current.get()
+    return budget.list(name) if budget else []
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where the OS doesn't report it)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+def _sizeof(value):
+    # Deep size of the plain dict/list/str/number rows scanners produce
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+def _close(db, path):
+    db.close()
+    for suffix in ('', '-journal'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+class MemoryBudget:
+    def __init__(self, limit_mb, directory=SPILL_DIR):
+        self.limit = limit_mb * 1024 ** 2
+        self.directory = directory
+        self.held = 0
+        self.spilled = 0
+        self.path = None
+        self.lock = threading.RLock()
+        self.db = None
+
+    def charge(self, nbytes):
+        with self.lock:
+            self.held += nbytes
+
+    def exceeded(self):
+        return self.held > self.limit
+
+    def list(self, name, items=()):
+        """Returns a SpillList charged to this budget, holding `items`."""
+        spill = SpillList(self, name)
+        spill.extend(items)
+        return spill
+
+    def adopt(self, cloud_data):
+        """Returns {service: SpillList} for a findings dict, wrapping any plain lists."""
+        return {service: items if isinstance(items, SpillList) else self.list(service, items)
+                for service, items in cloud_data.items()}
+
+    def _store(self):
+        # One scratch file per budget, created on the first spill and removed with the budget
+        if self.db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, self.path = tempfile.mkstemp(suffix='.sqlite', dir=self.directory)
+            os.close(fd)
+            self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=OFF")
+            self.db.execute("PRAGMA synchronous=OFF")
+            self.db.execute("CREATE TABLE chunks (id INTEGER PRIMARY KEY, rows BLOB)")
+            weakref.finalize(self, _close, self.db, self.path)
+        return self.db
+
+    def write_chunk(self, rows, chunk_id=None):
+        blob = zlib.compress(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL), 1)
+        with self.lock:
+            db = self._store()
+            if chunk_id is not None:
+                db.execute("UPDATE chunks SET rows=? WHERE id=?", (blob, chunk_id))
+                return chunk_id
+            self.spilled += len(rows)
+            return db.execute("INSERT INTO chunks (rows) VALUES (?)", (blob,)).lastrowid
+
+    def drop_chunks(self, chunk_ids):
+        with self.lock:
+            if chunk_ids:
+                self.db.executemany("DELETE FROM chunks WHERE id=?", [(chunk_id,) for chunk_id in chunk_ids])
+                self.spilled -= len(chunk_ids) * CHUNK_ROWS
+
+    def read_chunk(self, chunk_id):
+        with self.lock:
+            blob = self.db.execute("SELECT rows FROM chunks WHERE id=?", (chunk_id,)).fetchone()[0]
+        return pickle.loads(zlib.decompress(blob))
+
+class SpillList:
+    """List-like sequence of rows that moves to disk, CHUNK_ROWS at a time, once its budget is used up."""
+    def __init__(self, budget, name):
+        self.budget = budget
+        self.name = name
+        self.chunks = []        # Spilled chunk ids, each exactly CHUNK_ROWS rows
+        self.tail = []          # Newest rows, still in memory
+        self.row_size = 0
+        self.charged = 0
+        self.lock = threading.Lock()
+        self._cached = (None, None)
+
+    def append(self, row):
+        with self.lock:
+            if len(self.tail) % SAMPLE_EVERY == 0:
+                self.row_size = _sizeof(row)
+            self.tail.append(row)
+            self.charged += self.row_size
+            self.budget.charge(self.row_size)
+            if len(self.tail) >= CHUNK_ROWS and self.budget.exceeded():
+                self._spill()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def _spill(self):
+        full = len(self.tail) - len(self.tail) % CHUNK_ROWS
+        for start in range(0, full, CHUNK_ROWS):
+            self.chunks.append(self.budget.write_chunk(self.tail[start:start + CHUNK_ROWS]))
+        self.tail = self.tail[full:]
+        released = self.charged - self.row_size * len(self.tail)
+        self.charged -= released
+        self.budget.charge(-released)
+
+    def clear(self):
+        """Empties the list, giving back its share of the budget and its spilled chunks."""
+        with self.lock:
+            self.budget.drop_chunks(self.chunks)
+            self.budget.charge(-self.charged)
+            self.chunks, self.tail, self.charged = [], [], 0
+            self._cached = (None, None)
+
+    def __len__(self):
+        return len(self.chunks) * CHUNK_ROWS + len(self.tail)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        chunks, tail = list(self.chunks), list(self.tail)
+        for chunk_id in chunks:
+            yield from self.budget.read_chunk(chunk_id)
+        yield from tail
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        spilled = len(self.chunks) * CHUNK_ROWS
+        if index >= spilled:
+            return self.tail[index - spilled]
+        chunk_id = self.chunks[index // CHUNK_ROWS]
+        # The last chunk read stays decoded: lookups by position tend to cluster
+        if self._cached[0] != chunk_id:
+            self._cached = (chunk_id, self.budget.read_chunk(chunk_id))
+        return self._cached[1][index % CHUNK_ROWS]
+
+    def update_each(self, fn):
+        """Calls fn(row) on every row, writing spilled chunks back."""
+        with self.lock:
+            for chunk_id in self.chunks:
+                rows = self.budget.read_chunk(chunk_id)
+                for row in rows:
+                    fn(row)
+                self.budget.write_chunk(rows, chunk_id)
+            for row in self.tail:
+                fn(row)
+            self._cached = (None, None)
+
+    def filter(self, predicate):
+        return self.budget.list(self.name, (row for row in self if predicate(row)))
+
+def update_each(rows, fn):
+    """Calls fn(row) on every row of a list or SpillList, keeping the change."""
+    if isinstance(rows, SpillList):
+        rows.update_each(fn)
+    else:
+        for row in rows:
+            fn(row)
+
+def filter_rows(rows, predicate):
+    """Rows matching predicate, as the same kind of sequence (list or SpillList)."""
+    if isinstance(rows, SpillList):
+        return rows.filter(predicate)
+    return [row for row in rows if predicate(row)]
@@ -0,0 +1,87 @@
+from services.spill import filter_rows, update_each
+
+UNTAGGED = "(untagged)"
+
+# Finding field -> tag keys we accept for it (matched case-insensitively)
+ATTRIBUTION_KEYS = {
+    "Owner": ("owner", "team"),
+    "Environment": ("environment", "env", "stage"),
+    "CostCenter": ("cost-center", "costcenter", "cost_center"),
+}
+
+def resource_id_from_arn(arn):
+    """Returns the short ID scanners use, e.g. 'vol-0abc' from a volume ARN."""
+    resource = arn.split(':', 5)[-1]
+    return resource.split('/')[-1].split(':')[-1]
+
+class TagIndex:
+    def __init__(self, tagging_client):
+        self.client = tagging_client
+        self.by_arn = {}
+        self.by_id = {}
+
+    def build(self):
+        # One paginated sweep per region instead of per-service describe_tags calls
+        paginator = self.client.get_paginator('get_resources')
+        for page in paginator.paginate(ResourcesPerPage=100):
+            for resource in page.get('ResourceTagMappingList', []):
+                tags = {t['Key']: t['Value'] for t in resource.get('Tags', [])}
+                arn = resource['ResourceARN']
+                self.by_arn[arn] = tags
+                self.by_id[resource_id_from_arn(arn)] = tags
+        return self
+
+    def lookup(self, item):
+        if item.get('ARN') in self.by_arn:
+            return self.by_arn[item['ARN']]
+        return self.by_id.get(str(item.get('ID')), {})
+
+    def annotate(self, findings):
+        update_each(findings, lambda item: apply_tags(item, self.lookup(item)))
+        return findings
+
+def apply_tags(item, tags):
+    """Sets item['Tags'] and the Owner/Environment/CostCenter attribution fields."""
+    lowered = {k.lower(): v for k, v in tags.items()}
+    item['Tags'] = tags
+    for field, keys in ATTRIBUTION_KEYS.items():
+        item[field] = next((lowered[k] for k in keys if k in lowered), UNTAGGED)
+    return item
+
+def tag_value(tags, key):
+    """Reads `key` from a raw tag dict, resolving attribution fields (Owner, ...) like apply_tags."""
+    if key in ATTRIBUTION_KEYS:
+        lowered = {k.lower(): v for k, v in tags.items()}
+        return next((lowered[k] for k in ATTRIBUTION_KEYS[key] if k in lowered), UNTAGGED)
+    return tags.get(key, UNTAGGED)
+
+def get_tag(item, key):
+    if key in ATTRIBUTION_KEYS:
+        return item.get(key, UNTAGGED)
+    return item.get('Tags', {}).get(key, UNTAGGED)
+
+def filter_by_tags(cloud_data, filters):
+    """Keeps findings whose tags match every KEY=VALUE pair in filters."""
+    if not filters:
+        return cloud_data
+    return {
+        service: filter_rows(items, lambda item: all(get_tag(item, k) == v for k, v in filters.items()))
+        for service, items in cloud_data.items()
+    }
+
+def group_by_tag(cloud_data, key):
+    """Returns {tag value: [count, monthly cost]} across all services."""
+    groups = {}
+    for items in cloud_data.values():
+        for item in items:
+            group = groups.setdefault(get_tag(item, key), [0, 0.0])
+            group[0] += 1
+            group[1] += item.get('Cost', 0.0)
+    return groups
+
+def build_tag_index(tagging_client):
+    try:
+        return TagIndex(tagging_client).build()
+    except Exception as e:
+        print(f"  Error reading tags: {e}")
+        return TagIndex(tagging_client)
@@ -1,11 +1,14 @@
-import boto3
+from services.clients import batched, call_all
+from services.scan_errors import report_error
+from services.spill import findings_list
+
 
 class VPCScanner:
     def __init__(self, ec2_client):
         self.ec2 = ec2_client
 
     def get_vpc_waste(self):
-        waste_list = []
+        waste_list = findings_list()
         
         # 1. SCAN FOR PUBLIC IPS (The Real Cost: $0.005/hr)
        
@@ -21,30 +24,40 @@ class VPCScanner:
                     waste_list.append({
                         "ID": public_ip,
                         "Reason": "Public IPv4 ($0.005/hr) - Attached to " + eni.get('Attachment', {}).get('InstanceId', 'Unknown'),
-                        "Cost": 3.60 
+                        "Cost": 3.60,
+                        "Public IP": public_ip,
+                        "NetworkInterfaceId": eni['NetworkInterfaceId'],
+                        "InstanceId": eni.get('Attachment', {}).get('InstanceId'),
+                        "AllocationId": eni['Association'].get('AllocationId'),
+                        "VpcId": eni.get('VpcId')
                     })
         except Exception as e:
-            print(f"Error scanning IPs: {e}")
+            report_error(f"Error scanning IPs: {e}")
 
         # 2. SCAN FOR EMPTY VPCS 
         try:
             vpcs = self.ec2.describe_vpcs()['Vpcs']
-            for vpc in vpcs:
+        except Exception as e:
+            report_error(f"Error scanning VPCs: {e}")
+            vpcs = []
+
+        for batch in batched(vpcs):
+            # One ENI is enough to know a VPC isn't empty; every VPC of the batch is checked at once
+            calls = [('describe_network_interfaces', {'Filters': [{'Name': 'vpc-id', 'Values': [vpc['VpcId']]}],
+                                                      'PaginationConfig': {'MaxItems': 1, 'PageSize': 5}})
+                     for vpc in batch]
+            for vpc, pages in zip(batch, call_all(self.ec2, calls)):
                 vpc_id = vpc['VpcId']
-                
-                
-                enis = self.ec2.describe_network_interfaces(
-                    Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]
-                )['NetworkInterfaces']
-                
-                if len(enis) == 0:
+                if isinstance(pages, Exception):
+                    report_error(f"Error scanning VPC {vpc_id}: {pages}")
+                    continue
+
+                if not any(page.get('NetworkInterfaces') for page in pages):
                     waste_list.append({
                         "ID": vpc_id,
                         "Reason": "Empty VPC (No Active Resources)",
                         "Cost": 0.00 
                     })
-        except Exception:
-            pass
             
         return waste_list
 
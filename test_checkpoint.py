@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+import pytest
+import services.checkpoint as checkpoint_module
+import services.runner as runner
+from services.checkpoint import Checkpoint, scan_lock, sweep
+from services.inventory import Inventory
+from services.registry import ScannerSpec
+from services.runner import run_scans
+from services.scan_errors import report_error
+
+CALLS = {'volumes': 0, 'degraded': 0}
+
+def scan_volumes(inventory=None):
+    CALLS['volumes'] += 1
+    if inventory is not None:
+        inventory.record('ebs', {'id': 'vol-1', 'status': 'available', 'size_gb': 100, 'monthly_cost': 10.0})
+    return [{"ID": "vol-1", "Reason": "Unattached (available)", "Cost": 10.0}]
+
+def scan_degraded():
+    CALLS['degraded'] += 1
+    report_error("Error checking vol-2: throttled")
+    return [{"ID": "vol-3", "Reason": "Unattached (available)", "Cost": 5.0}]
+
+SPECS = [
+    ScannerSpec('volumes', 'Volumes', __name__, 'scan_volumes', [], 'Storage', 'ebs'),
+    ScannerSpec('degraded', 'Degraded', __name__, 'scan_degraded', [], 'Storage'),
+]
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, 'get_account_id', lambda region: '123456789012')
+    monkeypatch.setattr(checkpoint_module, 'get_account_id', lambda region: '123456789012')
+    for name in CALLS:
+        CALLS[name] = 0
+    checkpoint = Checkpoint({'test': 'checkpoint'}, directory=str(tmp_path))
+    yield checkpoint
+    checkpoint.clear()
+
+def test_finished_scanners_are_restored(checkpoint):
+    first = run_scans(SPECS, 'us-east-1', tags=False, checkpoint=checkpoint, inventory=Inventory())
+    # Only complete scanners are checkpointed; the degraded one is retried
+    assert checkpoint.completed_units() == 1
+
+    inventory = Inventory()
+    second = run_scans(SPECS, 'us-east-1', tags=False, checkpoint=checkpoint, inventory=inventory)
+    assert CALLS == {'volumes': 1, 'degraded': 2}
+    assert second == first
+    assert second['Volumes'][0]['Region'] == 'us-east-1' and second['Volumes'][0]['Account'] == '123456789012'
+    # The restored scanner's inventory rows come back with its findings
+    assert inventory.count('ebs') == 1
+
+def test_fresh_discards_progress(checkpoint, tmp_path):
+    run_scans(SPECS[:1], 'us-east-1', tags=False, checkpoint=checkpoint)
+    fresh = Checkpoint({'test': 'checkpoint'}, directory=str(tmp_path), fresh=True)
+    try:
+        assert fresh.completed_units() == 0
+    finally:
+        fresh.clear()
+
+def test_sweep_removes_stale_checkpoints(tmp_path):
+    stale = Checkpoint({'test': 'stale'}, directory=str(tmp_path))
+    live = Checkpoint({'test': 'live'}, directory=str(tmp_path))
+    stale.finish('volumes', 'us-east-1', '123456789012', [])
+    live.finish('volumes', 'us-east-1', '123456789012', [])
+    stale.db.close()
+    stale.db = None
+    old = time.time() - 2 * 86400
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(stale.path + suffix):
+            os.utime(stale.path + suffix, (old, old))
+    try:
+        assert sweep(str(tmp_path), max_age=86400) == 1
+        assert not os.path.exists(stale.path)
+        assert live.completed_units() == 1
+    finally:
+        live.clear()
+
+def test_scan_lock_takes_turns(tmp_path):
+    order = []
+    def second():
+        with scan_lock({'scanners': ['ebs'], 'region': 'us-east-1'}, directory=str(tmp_path)):
+            order.append('second')
+
+    with scan_lock({'region': 'us-east-1', 'scanners': ['ebs']}, directory=str(tmp_path)):
+        thread = threading.Thread(target=second)
+        thread.start()
+        # Another scan isn't held up
+        with scan_lock({'region': 'eu-west-1', 'scanners': ['ebs']}, directory=str(tmp_path)):
+            pass
+        thread.join(0.2)
+        order.append('first')
+    thread.join()
+    assert order == ['first', 'second']
@@ -0,0 +1,33 @@
+import threading
+from services.cache import cache_bypassed, use_cache_bypass
+from services.clients import call_all
+
+class RecordingClient:
+    """Non-paginating client whose calls record what they saw; calls wait for each other."""
+    def __init__(self, calls):
+        self.barrier = threading.Barrier(calls, timeout=5)
+        self.seen = []
+
+    def can_paginate(self, operation):
+        return False
+
+    def describe(self, n):
+        self.barrier.wait()  # Every call is in flight at once, each on its own pool thread
+        self.seen.append(cache_bypassed())
+        return {'n': n}
+
+def test_fan_out_sees_the_callers_bypass():
+    client = RecordingClient(4)
+    use_cache_bypass(True)
+    try:
+        results = call_all(client, [('describe', {'n': n}) for n in range(4)])
+    finally:
+        use_cache_bypass(False)
+    assert [pages[0]['n'] for pages in results] == [0, 1, 2, 3]
+    assert client.seen == [True] * 4
+
+def test_errors_are_returned_per_call():
+    client = RecordingClient(1)
+    results = call_all(client, [('describe', {'n': 1}), ('missing', {})])
+    assert results[0] == [{'n': 1}]
+    assert isinstance(results[1], AttributeError)
@@ -0,0 +1,29 @@
+from services.correlation import correlate
+from services.cube import FindingsCube
+
+DATA = {
+    'EC2 Instances': [{'ID': 'i-1', 'Cost': 10.0, 'VolumeIds': ['vol-1'], 'NetworkInterfaceIds': ['eni-1']}],
+    'EBS Volumes': [{'ID': 'vol-1', 'Cost': 5.0, 'SnapshotId': 'snap-ami'},
+                    {'ID': 'vol-2', 'Cost': 5.0, 'SnapshotId': 'snap-ami'}],
+    'VPC & Public IPs': [{'ID': 'eni-1', 'Public IP': '1.2.3.4', 'Cost': 3.6, 'InstanceId': 'i-1'},
+                         {'ID': 'eni-8', 'Public IP': '1.2.3.5', 'Cost': 3.6, 'InstanceId': 'i-2'},
+                         {'ID': 'eni-9', 'Public IP': '1.2.3.6', 'Cost': 3.6, 'InstanceId': 'i-2'}],
+    'Elastic IPs': [{'ID': 'eipalloc-1', 'Public IP': '1.2.3.4', 'Cost': 3.6, 'Region': 'eu-west-1'}],
+    'EBS Rightsizing': [{'ID': 'vol-1', 'Cost': 2.0, 'InstanceId': 'i-1'}],
+}
+
+def test_only_ownership_joins():
+    clusters, double_counted = correlate(DATA)
+    # Shared AMI snapshot, an unflagged instance and rightsizing join nothing
+    assert [sorted(c['Members']) for c in clusters] == [sorted([
+        ('EC2 Instances', 'i-1'), ('EBS Volumes', 'vol-1'), ('VPC & Public IPs', 'eni-1'), ('Elastic IPs', 'eipalloc-1')])]
+    assert clusters[0]['Cost'] == 10.0 + 5.0 + 3.6
+    assert round(double_counted, 2) == 3.6
+
+def test_cube_subtracts_duplicates_per_cell():
+    clusters, double_counted = correlate(DATA)
+    duplicates = {(service, position): cost for c in clusters for service, position, cost in c['Duplicates']}
+    cube = FindingsCube(DATA, duplicates=duplicates)
+    assert round(cube.duplicate_cost(cube.slice()), 2) == round(double_counted, 2)
+    # The EIP is the duplicate: a slice without its region has nothing to subtract
+    assert cube.duplicate_cost(cube.slice({'Region': ['unknown']})) == 0.0
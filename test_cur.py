@@ -0,0 +1,90 @@
+import csv
+import json
+import sys
+import pytest
+from datetime import datetime, timezone
+from services.cur import apply_actual_costs, cur_files, read_cur
+
+HEADER = ['identity/LineItemId', 'bill/BillingPeriodStartDate', 'lineItem/ResourceId', 'lineItem/UnblendedCost']
+
+def _write_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for n, row in enumerate(rows):
+            writer.writerow([n, *row])
+    return str(path)
+
+@pytest.fixture(params=['arrow', 'python'])
+def reader(request, monkeypatch):
+    if request.param == 'arrow':
+        pytest.importorskip('pyarrow')
+    else:
+        monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    return request.param
+
+def test_latest_period_only(tmp_path, reader):
+    path = _write_csv(tmp_path / 'cur.csv', [
+        ('2026-08-01T00:00:00Z', 'vol-1', '4.0'),
+        ('2026-09-01T00:00:00Z', 'vol-1', '1.5'),
+        ('2026-09-01T00:00:00Z', 'vol-1', '0.5'),
+        ('2026-09-01T00:00:00Z', 'i-9', '7.0'),
+    ])
+    assert read_cur([path], ['vol-1'], workers=1) == {'vol-1': 2.0}
+
+def test_month_to_date_is_not_counted(tmp_path, reader):
+    current = datetime.now(timezone.utc).strftime('%Y-%m')
+    path = _write_csv(tmp_path / 'cur.csv', [
+        ('2026-08-01T00:00:00Z', 'vol-1', '4.0'),
+        ('2026-09-01T00:00:00Z', 'vol-1', '8.0'),
+        # Partial: a few days into the month
+        (f'{current}-01T00:00:00Z', 'vol-1', '0.5'),
+    ])
+    assert read_cur([path], ['vol-1'], workers=1) == {'vol-1': 8.0}
+    assert read_cur([path], ['vol-1'], workers=1, period='2026-08') == {'vol-1': 4.0}
+    assert read_cur([path], ['vol-1'], workers=1, period=current) == {'vol-1': 0.5}
+
+def test_findings_matched_by_id_and_arn(tmp_path, reader):
+    arn = 'arn:aws:elasticloadbalancing:us-east-1:123456789012:loadbalancer/app/web/50dc6c495c0c9188'
+    path = _write_csv(tmp_path / 'cur.csv', [
+        ('2026-09-01T00:00:00Z', 'vol-1', '3.0'),
+        ('2026-09-01T00:00:00Z', arn, '16.0'),
+        ('2026-09-01T00:00:00Z', 'arn:aws:ec2:us-east-1:123456789012:volume/vol-2', '2.5'),
+        ('2026-09-01T00:00:00Z', 'vol-3', '9.0'),
+    ])
+    cloud_data = {
+        'EBS Volumes': [{'ID': 'vol-1', 'Cost': 8.0}, {'ID': 'vol-2', 'Cost': 8.0}, {'ID': 'vol-4', 'Cost': 8.0}],
+        'Load Balancers': [{'ID': '50dc6c495c0c9188', 'ARN': arn, 'Cost': 16.43}],
+        # A saving on part of the volume, not its spend
+        'EBS Rightsizing': [{'ID': 'vol-3', 'Cost': 1.0}],
+    }
+    assert apply_actual_costs(cloud_data, [path], workers=1) == 3
+
+    volumes = {item['ID']: item for item in cloud_data['EBS Volumes']}
+    assert volumes['vol-1']['Cost'] == 3.0 and volumes['vol-1']['EstimatedCost'] == 8.0
+    assert volumes['vol-2']['ActualCost'] == 2.5
+    assert 'ActualCost' not in volumes['vol-4']
+    assert cloud_data['Load Balancers'][0]['Cost'] == 16.0
+    assert cloud_data['EBS Rightsizing'][0] == {'ID': 'vol-3', 'Cost': 1.0}
+
+def test_newest_assembly_of_latest_period(tmp_path, reader):
+    report = tmp_path / 'cur' / 'report'
+    for period, assemblies in (('20260801-20260901', ['a1']), ('20260901-20261001', ['a1', 'a2'])):
+        start = period[:8]
+        for assembly in assemblies:
+            _write_csv(report / period / assembly / 'report-1.csv',
+                       [(f"{start[:4]}-{start[4:6]}-01T00:00:00Z", 'vol-1', '1.0' if assembly == 'a1' else '2.0')])
+        manifest = {'billingPeriod': {'start': f"{start}T000000.000Z"},
+                    'reportKeys': [f"cur/report/{period}/{assemblies[-1]}/report-1.csv"]}
+        (report / period / 'report-Manifest.json').write_text(json.dumps(manifest))
+
+    # The month to date has a manifest of its own, but isn't closed yet
+    start = datetime.now(timezone.utc).strftime('%Y%m01')
+    _write_csv(report / f'{start}-next' / 'a1' / 'report-1.csv', [(f"{start[:4]}-{start[4:6]}-01T00:00:00Z", 'vol-1', '0.5')])
+    manifest = {'billingPeriod': {'start': f"{start}T000000.000Z"}, 'reportKeys': [f"cur/report/{start}-next/a1/report-1.csv"]}
+    (report / f'{start}-next' / 'report-Manifest.json').write_text(json.dumps(manifest))
+
+    files = cur_files([str(tmp_path / 'cur')])
+    assert [f.split('/')[-3:] for f in files] == [['20260901-20261001', 'a2', 'report-1.csv']]
+    assert read_cur([str(tmp_path / 'cur')], ['vol-1'], workers=1) == {'vol-1': 2.0}
@@ -0,0 +1,97 @@
+import json
+import threading
+import pytest
+import services.remediation as remediation
+from botocore.exceptions import ClientError
+from services.remediation import RateLimiter, RemediationExecutor, build_plan
+
+class FakeEC2:
+    """Deletes from an in-memory set of snapshot IDs; `throttle` calls fail with Throttling first."""
+    def __init__(self, snapshots, throttle=0):
+        self.snapshots = set(snapshots)
+        self.throttle = throttle
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def delete_snapshot(self, SnapshotId, DryRun=False):
+        with self.lock:
+            self.calls.append((SnapshotId, DryRun))
+            if self.throttle:
+                self.throttle -= 1
+                raise ClientError({'Error': {'Code': 'Throttling'}}, 'DeleteSnapshot')
+            if DryRun:
+                raise ClientError({'Error': {'Code': 'DryRunOperation'}}, 'DeleteSnapshot')
+            if SnapshotId not in self.snapshots:
+                raise ClientError({'Error': {'Code': 'InvalidSnapshot.NotFound'}}, 'DeleteSnapshot')
+            self.snapshots.remove(SnapshotId)
+
+    def mutations(self):
+        return [snapshot for snapshot, dry_run in self.calls if not dry_run]
+
+class CountingLimiter(RateLimiter):
+    def __init__(self, rate):
+        super().__init__(rate)
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        super().acquire()
+
+def _plan(ids):
+    cloud_data = {'Snapshots': [{'ID': snapshot, 'Region': 'us-east-1', 'Account': '123456789012', 'Cost': 1.0}
+                                for snapshot in ids]}
+    return build_plan(cloud_data)
+
+@pytest.fixture
+def ec2(monkeypatch):
+    client = FakeEC2([f'snap-{i}' for i in range(5)])
+    monkeypatch.setattr(remediation, 'get_client', lambda service, region: client)
+    return client
+
+def test_degraded_services_are_skipped():
+    cloud_data = {
+        'Snapshots': [{'ID': 'snap-1', 'Region': 'us-east-1', 'Cost': 1.0}],
+        'EBS Volumes': [{'ID': 'vol-1', 'Region': 'us-east-1', 'Cost': 8.0}],
+        'EC2 Instances': [{'ID': 'i-1', 'Region': 'us-east-1', 'Cost': 50.0}],
+    }
+    plan = build_plan(cloud_data, degraded={'EBS Volumes': ["Error checking vol-2: throttled"]})
+    assert [action['params'] for action in plan['actions']] == [{'SnapshotId': 'snap-1'}]
+    assert plan['skipped_services'] == ['EBS Volumes']
+    assert plan['monthly_savings'] == 1.0
+
+def test_already_gone_counts_as_done(ec2, tmp_path):
+    ec2.snapshots.discard('snap-0')
+    log = str(tmp_path / 'progress.jsonl')
+    assert RemediationExecutor(_plan(['snap-0', 'snap-1']), log).run(progress=None) == {'already_gone': 1, 'deleted': 1}
+
+    # Running the same plan again (a retry after a crash) deletes nothing twice
+    ec2.calls.clear()
+    assert RemediationExecutor(_plan(['snap-0', 'snap-1']), str(tmp_path / 'retry.jsonl')).run(progress=None) \
+        == {'already_gone': 2}
+    assert ec2.snapshots == {'snap-2', 'snap-3', 'snap-4'}
+
+def test_throttled_calls_are_retried(ec2, tmp_path, monkeypatch):
+    monkeypatch.setattr(remediation.random, 'uniform', lambda low, high: 0.0)
+    ec2.throttle = 2
+    executor = RemediationExecutor(_plan(['snap-1']), str(tmp_path / 'progress.jsonl'))
+    limiter = executor.limiters['delete_snapshot'] = CountingLimiter(1000)
+    assert executor.run(progress=None) == {'deleted': 1}
+    # Every attempt, retries included, waits for the API's rate limiter
+    assert limiter.acquired == 3 and ec2.mutations() == ['snap-1'] * 3
+
+def test_resume_skips_logged_actions(ec2, tmp_path):
+    log = tmp_path / 'progress.jsonl'
+    plan = _plan([f'snap-{i}' for i in range(5)])
+    log.write_text(json.dumps({'id': plan['actions'][0]['id'], 'status': 'deleted'}) + "\n"
+                   + json.dumps({'id': plan['actions'][1]['id'], 'status': 'failed'}) + "\n"
+                   # Torn last line from a crash
+                   + '{"id": "123456789012/us-east-1/snap-2", "sta')
+    assert RemediationExecutor(plan, str(log)).run(progress=None) == {'deleted': 4}
+    assert sorted(ec2.mutations()) == ['snap-1', 'snap-2', 'snap-3', 'snap-4']
+
+def test_dry_run_mutates_nothing(ec2, tmp_path):
+    log = tmp_path / 'progress.jsonl'
+    counts = RemediationExecutor(_plan(['snap-1', 'snap-2']), str(log), dry_run=True).run(progress=None)
+    assert counts == {'dry_run_ok': 2}
+    assert ec2.mutations() == [] and len(ec2.snapshots) == 5
+    assert not log.exists()
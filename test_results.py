@@ -0,0 +1,50 @@
+import gzip
+import os
+import pytest
+from services.results import ResultsStore, ScanResults, StaleCursor, decode_cursor, encode_cursor, save_results
+
+def _scan(n=25):
+    return ScanResults({'scan_id': 'scan-a', 'finished': 0.0, 'findings': {
+        'EBS Volumes': [{'ID': f'vol-{i:02d}', 'Cost': float(i), 'Region': 'us-east-1'} for i in range(n)],
+    }})
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('scan-a', 40)
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'scan-a') == 40
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor('scan-a', 1)[:-3], ''])
+def test_invalid_cursor(cursor):
+    with pytest.raises(StaleCursor):
+        decode_cursor(cursor, 'scan-a')
+
+def test_cursor_from_older_scan():
+    with pytest.raises(StaleCursor, match="older scan"):
+        decode_cursor(encode_cursor('scan-a', 10), 'scan-b')
+
+def test_pages_cover_the_view_once():
+    results = _scan()
+    seen, cursor = [], None
+    while True:
+        items, cursor, total = results.page({}, '-Cost', cursor, limit=10)
+        seen.extend(item['ID'] for item in items)
+        if cursor is None:
+            break
+    assert total == 25
+    assert seen == [f'vol-{i:02d}' for i in reversed(range(25))]
+
+def test_store_keeps_last_good_scan(tmp_path):
+    path = str(tmp_path / 'latest.json.gz')
+    store = ResultsStore(path)
+    assert store.get() is None
+
+    save_results({'EBS Volumes': [{'ID': 'vol-1', 'Cost': 1.0}]}, path=path)
+    good = store.get()
+    assert good.lookup('vol-1')
+
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(b'{"truncated": ')[:-4])
+    # Coarse filesystem clocks could give both writes the same mtime
+    mtime = os.stat(path).st_mtime_ns + 10 ** 9
+    os.utime(path, ns=(mtime, mtime))
+    assert store.get() is good
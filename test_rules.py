@@ -0,0 +1,87 @@
+import os
+import pytest
+import services.rules as rules
+from services.inventory import Inventory
+from services.rules import RuleSet
+
+RULES = {
+    'rules': [
+        {'name': 'ec2-stopped', 'resource': 'ec2', 'service': 'EC2 Instances',
+         'when': [['state', '==', 'stopped']], 'reason': "Stopped Instance", 'cost': 2.0},
+        {'name': 'ec2-zombie', 'resource': 'ec2', 'service': 'EC2 Instances',
+         'when': [['state', '==', 'running'], ['avg_cpu', '<', '$max_cpu']], 'params': {'max_cpu': 1.0},
+         'reason': "Zombie {instance_type} (CPU {avg_cpu:.1f}%)", 'cost': 'monthly_price'},
+        {'name': 'ec2-any', 'resource': 'ec2', 'service': 'EC2 Instances',
+         'when': [['instance_type', 'in', ['t3.micro', 'm5.large']]], 'reason': "Listed type", 'cost': 1.0},
+    ],
+    'overrides': [
+        {'match': {'region': 'eu-west-1'}, 'params': {'max_cpu': 5.0}},
+        {'match': {'tags': {'Environment': 'batch'}}, 'params': {'max_cpu': 0.1}, 'rules': ['ec2-zombie']},
+    ],
+}
+
+@pytest.fixture(params=['numpy', 'python'])
+def engine(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(rules, 'np', None)
+    return request.param
+
+def _inventory():
+    inventory = Inventory()
+    rows = [
+        # id, state, type, avg_cpu, region, tags
+        ('i-stopped', 'stopped', 'c5.xlarge', None, 'us-east-1', {}),
+        ('i-idle', 'running', 'c5.xlarge', 0.5, 'us-east-1', {}),
+        ('i-busy', 'running', 'c5.xlarge', 3.0, 'us-east-1', {}),
+        ('i-busy-eu', 'running', 'c5.xlarge', 3.0, 'eu-west-1', {}),
+        ('i-batch', 'running', 'c5.xlarge', 0.5, 'us-east-1', {'Environment': 'batch'}),
+        ('i-no-data', 'running', 'c5.xlarge', None, 'us-east-1', {}),
+        ('i-listed', 'running', 't3.micro', 50.0, 'us-east-1', {}),
+    ]
+    for resource_id, state, instance_type, cpu, region, tags in rows:
+        inventory.record('ec2', {'id': resource_id, 'state': state, 'instance_type': instance_type, 'avg_cpu': cpu,
+                                 'monthly_price': 120.0, 'region': region, 'account': '123456789012', 'tags': tags})
+    return inventory
+
+def test_rules_and_overrides(engine):
+    findings = RuleSet.from_dict(RULES).evaluate(_inventory())['EC2 Instances']
+    by_id = {item['ID']: item for item in findings}
+
+    assert set(by_id) == {'i-stopped', 'i-idle', 'i-busy-eu', 'i-listed'}
+    assert by_id['i-stopped']['Rule'] == 'ec2-stopped' and by_id['i-stopped']['Cost'] == 2.0
+    assert by_id['i-idle']['Reason'] == "Zombie c5.xlarge (CPU 0.5%)" and by_id['i-idle']['Cost'] == 120.0
+    # Region override raises the threshold; tag override lowers it; a missing metric never matches
+    assert by_id['i-busy-eu']['Rule'] == 'ec2-zombie'
+    assert 'i-batch' not in by_id and 'i-no-data' not in by_id
+    assert by_id['i-listed']['Rule'] == 'ec2-any'
+
+def test_first_rule_wins(engine):
+    spec = {'rules': [
+        {'name': 'first', 'resource': 'ec2', 'service': 'EC2 Instances', 'when': [['state', '==', 'running']],
+         'reason': "first", 'cost': 1.0},
+        {'name': 'second', 'resource': 'ec2', 'service': 'EC2 Instances', 'when': [['state', '!=', 'stopped']],
+         'reason': "second", 'cost': 1.0},
+    ]}
+    findings = RuleSet.from_dict(spec).evaluate(_inventory())['EC2 Instances']
+    assert len(findings) == 6
+    assert {item['Rule'] for item in findings} == {'first'}
+
+def test_engines_agree(monkeypatch):
+    pytest.importorskip('numpy')
+    vectorised = RuleSet.from_dict(RULES).evaluate(_inventory())
+    monkeypatch.setattr(rules, 'np', None)
+    assert RuleSet.from_dict(RULES).evaluate(_inventory()) == vectorised
+
+def test_invalid_rules():
+    with pytest.raises(ValueError, match="unknown operator"):
+        RuleSet.from_dict({'rules': [{'name': 'bad', 'resource': 'ec2', 'service': 'EC2', 'when': [['a', '~', 1]],
+                                      'reason': '', 'cost': 0}]})
+    with pytest.raises(ValueError, match="not in params"):
+        RuleSet.from_dict({'rules': [{'name': 'bad', 'resource': 'ec2', 'service': 'EC2', 'when': [['a', '<', '$x']],
+                                      'reason': '', 'cost': 0}]})
+
+def test_default_rule_file_loads():
+    ruleset = RuleSet.load(os.path.join(os.path.dirname(__file__), 'rules.toml'))
+    assert 'EC2 Instances' in ruleset.services
@@ -0,0 +1,108 @@
+import pytest
+import services.checkpoint as checkpoint_module
+from datetime import datetime, timezone
+from services.checkpoint import Checkpoint, use_checkpoint
+from services.sharding import list_volumes, start_time_shards
+
+class FakePaginator:
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, PaginationConfig=None, **params):
+        config = PaginationConfig or {}
+        token = config.get('StartingToken')
+        while True:
+            page = getattr(self.client, self.operation)(MaxResults=config.get('PageSize', 1000), NextToken=token, **params)
+            yield page
+            token = page.get('NextToken')
+            if not token:
+                return
+
+class FakeEC2:
+    """describe_volumes over an in-memory list, paginated by offset; filters by AZ unless told not to."""
+    class meta:
+        region_name = 'us-east-1'
+
+    def __init__(self, volumes, honour_filters=True, zones=None, fail_after=None):
+        self.volumes = volumes
+        self.honour_filters = honour_filters
+        self.zones = zones or sorted({v['AvailabilityZone'] for v in volumes})
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def can_paginate(self, operation):
+        return True
+
+    def get_paginator(self, operation):
+        return FakePaginator(self, operation)
+
+    def describe_availability_zones(self, **kwargs):
+        return {'AvailabilityZones': [{'ZoneName': zone} for zone in self.zones]}
+
+    def describe_volumes(self, MaxResults=1000, NextToken=None, Filters=()):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("connection reset")
+        volumes = self.volumes
+        if self.honour_filters:
+            for f in Filters:
+                volumes = [v for v in volumes if v['AvailabilityZone'] in f['Values']]
+        start = int(NextToken or 0)
+        page = {'Volumes': volumes[start:start + MaxResults]}
+        if start + MaxResults < len(volumes):
+            page['NextToken'] = str(start + MaxResults)
+        return page
+
+def _volumes(n):
+    return [{'VolumeId': f'vol-{i:05d}', 'AvailabilityZone': f'us-east-1{"abc"[i % 3]}'} for i in range(n)]
+
+def _ids(volumes):
+    return sorted(v['VolumeId'] for v in volumes)
+
+def test_small_listing_is_one_call():
+    client = FakeEC2(_volumes(100))
+    assert _ids(list_volumes(client)) == _ids(client.volumes)
+    assert client.calls == 1
+
+def test_shards_merge_everything_once():
+    client = FakeEC2(_volumes(2600))
+    volumes = list_volumes(client)
+    assert len(volumes) == 2600
+    assert _ids(volumes) == _ids(client.volumes)
+
+def test_unhonoured_filters_are_deduplicated():
+    # Every shard returns every volume
+    client = FakeEC2(_volumes(1200), honour_filters=False)
+    assert _ids(list_volumes(client)) == _ids(client.volumes)
+
+def test_missed_resources_fall_back_to_serial():
+    # The AZ list lacks us-east-1a, so its volumes (on the probe page too) are in no shard
+    client = FakeEC2(_volumes(1200), zones=['us-east-1b', 'us-east-1c'])
+    assert _ids(list_volumes(client)) == _ids(client.volumes)
+
+def test_start_time_shards_partition_every_year():
+    now = datetime(2026, 3, 15, tzinfo=timezone.utc)
+    values = [value for shard in start_time_shards(now) for f in shard for value in f['Values']]
+    assert len(values) == len(set(values))
+    months = {f"{y:04d}-{m:02d}-*" for y in (2024, 2025) for m in range(1, 13)} | {f"2026-{m:02d}-*" for m in (1, 2, 3)}
+    assert months <= set(values)
+    assert {f"{y:04d}-*" for y in range(2000, 2024)} | {'1*', '2027-*'} <= set(values)
+
+def test_interrupted_walk_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint_module, 'get_account_id', lambda region: '123456789012')
+    volumes = _volumes(2600)
+    checkpoint = Checkpoint({'test': 'sharding'}, directory=str(tmp_path))
+    use_checkpoint(checkpoint)
+    try:
+        # Probe, AZ walks' first pages, then the connection drops
+        with pytest.raises(RuntimeError):
+            list_volumes(FakeEC2(volumes, fail_after=5))
+
+        client = FakeEC2(volumes)
+        assert _ids(list_volumes(client)) == _ids(volumes)
+        # Probe plus the rest of each shard, not every shard from the start
+        assert client.calls < 1 + 3 * 2
+    finally:
+        use_checkpoint(None)
+        checkpoint.clear()
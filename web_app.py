@@ -1,25 +1,26 @@
 import streamlit as st
-import pandas as pd
-import boto3
 import time
-import altair as alt
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# --- IMPORT SCANNERS ---
-from services.ebs import scan_ebs
-from services.elastic_ip import scan_eip
-from services.snapshot import scan_snapshots
-from services.rds import scan_rds
-from services.nat_gateway import scan_nat
-from services.s3 import scan_s3
-from services.ec2 import scan_ec2
-from services.eks import scan_eks
-from services.vpc import scan_vpc
+# Scanners, boto3 and the charting libraries are imported lazily (see services/registry.py)
+from services.cache import ResponseCache
+from services.checkpoint import Checkpoint, scan_lock, sweep
+from services.clients import configure_cache, get_response_cache
+from services.cw_cache import MetricSeriesCache, configure_series_cache
+from services.registry import SCANNERS, select_scanners
+from services.runner import run_scans
+from services.spill import MemoryBudget, peak_rss_mb
+from services.correlation import correlate
+from services.cube import DIMENSIONS, FindingsCube
+from services.tags import get_tag
 
-try:
-    from services.alb import scan_alb
-except ImportError:
-    scan_alb = None
+GRID_LIMIT = 60
+
+# One response cache per process, shared by every session's clients
+if get_response_cache() is None:
+    configure_cache(ResponseCache())
+    configure_series_cache(MetricSeriesCache())
+    # Checkpoints of sessions that died and whose scan nobody ran again
+    sweep()
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -109,51 +110,77 @@ st.markdown("""
 with st.sidebar:
     st.header("Configuration")
     region = st.text_input("Target Region", value="ap-south-1")
+    selected = st.multiselect("Scanners", [spec.label for spec in SCANNERS], default=[spec.label for spec in SCANNERS])
+    bypass_cache = st.checkbox("Bypass API cache", value=False)
+    # Past this, findings live on disk and are read back as the page needs them
+    memory_budget = st.number_input("Memory budget (MB, 0 = unlimited)", min_value=0, value=0, step=256)
     
     if st.button("Run Analysis", type="primary"):
         st.session_state['scan_active'] = True
+        st.session_state.pop('results', None)
         st.rerun()
     
     if st.button("Reset Dashboard"):
         st.session_state['scan_active'] = False
+        st.session_state.pop('results', None)
         st.rerun()
 
 # --- MAIN LOGIC ---
 if st.session_state.get('scan_active', False):
 
-    # 1. INITIALIZE & SCAN
-    scans = [
-        ("EBS Volumes", scan_ebs, [boto3.client('ec2', region_name=region)]),
-        ("Elastic IPs", scan_eip, [boto3.client('ec2', region_name=region)]),
-        ("Snapshots", scan_snapshots, [boto3.client('ec2', region_name=region)]),
-        ("RDS Instances", scan_rds, [boto3.client('rds', region_name=region)]),
-        ("NAT Gateways", scan_nat, [boto3.client('ec2', region_name=region), boto3.client('cloudwatch', region_name=region)]),
-        ("S3 Buckets", scan_s3, [boto3.client('s3', region_name=region)]),
-        ("EC2 Instances", scan_ec2, [boto3.client('ec2', region_name=region), boto3.client('cloudwatch', region_name=region)]),
-        ("EKS Clusters", scan_eks, [boto3.client('eks', region_name=region)]),
-        ("VPCs", scan_vpc, [boto3.client('ec2', region_name=region)])
-    ]
-    if scan_alb:
-        scans.insert(2, ("Load Balancers", scan_alb, [boto3.client('elbv2', region_name=region), boto3.client('cloudwatch', region_name=region)]))
+    # 1. INITIALIZE & SCAN (once per "Run Analysis"; slicer reruns reuse the cube)
+    if 'results' not in st.session_state:
+        scans = select_scanners([spec.key for spec in SCANNERS if spec.label in selected])
 
-    results = {}
-    total_savings = 0.0
-    resource_count = 0
-    
-    # Simple spinner instead of complex progress bar to keep UI clean
-    with st.spinner("Analyzing infrastructure..."):
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_name = {executor.submit(func, *args): name for name, func, args in scans}
-            for future in as_completed(future_to_name):
-                name = future_to_name[future]
-                try:
-                    data = future.result()
-                    results[name] = data
-                    for item in data:
-                        total_savings += float(item.get("Cost", 0.0))
-                        resource_count += 1
-                except Exception:
-                    results[name] = []
+        # Simple spinner instead of complex progress bar to keep UI clean
+        with st.spinner("Analyzing infrastructure..."):
+            started = time.time()
+            # A scan that dies mid-way resumes from here on the next "Run Analysis" of the same scanners and
+            # region, from any session; sessions running the same scan take turns, so none clears it under another
+            signature = {'app': 'web', 'scanners': [s.key for s in scans], 'region': region}
+            budget = MemoryBudget(memory_budget) if memory_budget else None
+            with scan_lock(signature):
+                checkpoint = Checkpoint(signature)
+                # Per scan: the caches are shared with every other session
+                st.session_state['results'] = run_scans(scans, region, checkpoint=checkpoint, budget=budget, bypass_cache=bypass_cache)
+                checkpoint.clear()
+            st.session_state['scan_seconds'] = time.time() - started
+            st.session_state['peak_rss'] = peak_rss_mb()
+            st.session_state['scan_services'] = len(scans)
+            st.session_state['cubes'] = {}
+            st.session_state['clusters'] = correlate(st.session_state['results'])
+            # Once per scan: every cube sums it per cell, so filtering never re-correlates
+            st.session_state['duplicates'] = {(service, position): cost for cluster in st.session_state['clusters'][0]
+                                              for service, position, cost in cluster['Duplicates']}
+            # Slicer options, once per scan rather than a pass over every finding on each rerun
+            st.session_state['tag_keys'] = sorted({"Owner", "Environment", "CostCenter"}
+                                                  | {k for items in st.session_state['results'].values()
+                                                     for item in items for k in item.get('Tags', {})})
+
+    results = st.session_state['results']
+
+    # Slicers (tag keys are only known once the scan is done)
+    tag_keys = st.session_state['tag_keys']
+    with st.sidebar:
+        st.header("Drill Down")
+        tag_key = st.selectbox("Tag key", tag_keys, index=tag_keys.index("Owner"))
+        # One cube per tag key, built on first use
+        cubes = st.session_state['cubes']
+        if tag_key not in cubes:
+            cubes[tag_key] = FindingsCube(results, tag_key=tag_key, duplicates=st.session_state['duplicates'])
+        cube = cubes[tag_key]
+
+        breakdown = st.selectbox("Break down by", DIMENSIONS, format_func=lambda d: tag_key if d == 'Tag' else d)
+        filters = {}
+        for dimension in DIMENSIONS:
+            label = tag_key if dimension == 'Tag' else dimension
+            filters[dimension] = st.multiselect(label, cube.members(dimension))
+
+    cells = cube.slice(filters)
+    total_savings, resource_count = cube.totals(cells)
+    # Each resource counted once, as the CLI total is
+    total_savings -= cube.duplicate_cost(cells)
+    clusters, double_counted = st.session_state['clusters']
 
     # 2. KPI CARDS (HTML Injection for custom look)
     c1, c2, c3, c4 = st.columns(4)
@@ -172,7 +199,7 @@ if st.session_state.get('scan_active', False):
         <div class="dashboard-card">
             <div class="metric-label">Resources Flagged</div>
             <div class="metric-value">{resource_count}</div>
-            <div style="font-size:12px; color:#6B7280; margin-top:5px;">Across {len(scans)} Services</div>
+            <div style="font-size:12px; color:#6B7280; margin-top:5px;">Across {st.session_state['scan_services']} Services</div>
         </div>
         """, unsafe_allow_html=True)
 
@@ -189,26 +216,26 @@ if st.session_state.get('scan_active', False):
         st.markdown(f"""
         <div class="dashboard-card">
             <div class="metric-label">Scan Duration</div>
-            <div class="metric-value">2.4s</div>
-            <div style="font-size:12px; color:#6B7280; margin-top:5px;">Real-time Analysis</div>
+            <div class="metric-value">{st.session_state['scan_seconds']:.1f}s</div>
+            <div style="font-size:12px; color:#6B7280; margin-top:5px;">{f"Peak memory {st.session_state['peak_rss']:,.0f} MB" if st.session_state.get('peak_rss') else "Real-time Analysis"}</div>
         </div>
         """, unsafe_allow_html=True)
 
     # 3. CHARTS SECTION
     col_left, col_right = st.columns([2, 1])
 
-    # Prepare Data
-    chart_data = []
-    for service, items in results.items():
-        cost = sum(item.get('Cost', 0.0) for item in items)
-        if cost > 0:
-            chart_data.append({"Service": service, "Cost": cost})
-    df_chart = pd.DataFrame(chart_data)
+    # Prepare Data (the "Service" column holds whichever dimension we break down by)
+    chart_data = [{"Service": key, "Cost": cost} for key, (cost, _) in cube.rollup(cells, breakdown).items() if cost > 0]
+    if chart_data:
+        # pandas/altair are the slowest imports in the app; only load them to draw
+        import pandas as pd
+        import altair as alt
+        df_chart = pd.DataFrame(chart_data)
 
     with col_left:
         st.markdown('<div class="dashboard-card">', unsafe_allow_html=True)
-        st.markdown("##### Waste by Service")
-        if not df_chart.empty:
+        st.markdown(f"##### Waste by {tag_key if breakdown == 'Tag' else breakdown}")
+        if chart_data:
             # Altair Bar Chart
             c = alt.Chart(df_chart).mark_bar(cornerRadiusTopLeft=5, cornerRadiusTopRight=5).encode(
                 x=alt.X('Service', sort='-y', axis=alt.Axis(labelAngle=0)),
@@ -224,7 +251,7 @@ if st.session_state.get('scan_active', False):
     with col_right:
         st.markdown('<div class="dashboard-card">', unsafe_allow_html=True)
         st.markdown("##### Cost Distribution")
-        if not df_chart.empty:
+        if chart_data:
             # Altair Donut Chart
             base = alt.Chart(df_chart).encode(theta=alt.Theta("Cost", stack=True))
             pie = base.mark_arc(outerRadius=80, innerRadius=50).encode(
@@ -240,22 +267,29 @@ if st.session_state.get('scan_active', False):
             st.info("Optimized")
         st.markdown('</div>', unsafe_allow_html=True)
 
-    # 4. OPTIMIZATION OPPORTUNITIES (The Grid View)
+    # 4. COST CLUSTERS (findings from different scanners that belong to one workload)
+    if clusters:
+        with st.expander(f"Cost Clusters ({len(clusters)}) - ${double_counted:,.2f}/month counted by more than one scanner"):
+            for cluster in clusters[:GRID_LIMIT]:
+                st.markdown(f"**{cluster['ID']}** - {cluster['Reason']} - **${cluster['Cost']:.2f}**/month")
+
+    # 5. OPTIMIZATION OPPORTUNITIES (The Grid View)
     st.subheader("Optimization Opportunities")
     
-    # Flatten findings for the grid
+    # Only the most expensive findings become cards; the cube keeps them pre-sorted
     all_findings = []
-    for service, items in results.items():
-        for item in items:
-            all_findings.append({
-                "Service": service,
-                "ID": item.get('ID'),
-                "Reason": item.get('Reason'),
-                "Cost": item.get('Cost', 0.0)
-            })
-    
-    # Sort by Cost (Highest First)
-    all_findings.sort(key=lambda x: x['Cost'], reverse=True)
+    for service, item in cube.top(cells, GRID_LIMIT):
+        all_findings.append({
+            "Service": service,
+            "ID": item.get('ID'),
+            "Reason": item.get('Reason'),
+            "Owner": get_tag(item, tag_key),
+            "Cost": item.get('Cost', 0.0),
+            "Actual": 'ActualCost' in item
+        })
+
+    if resource_count > len(all_findings):
+        st.caption(f"Showing the top {len(all_findings)} of {resource_count} findings. Use the sidebar to drill down.")
 
     if all_findings:
         # Create a grid layout (3 columns)
@@ -275,9 +309,10 @@ if st.session_state.get('scan_active', False):
                         <span class="{badge_class}">{badge_text}</span>
                     </div>
                     <div style="font-size:13px; color:#1F2937; margin-bottom:5px; font-weight:600;">{row['ID']}</div>
-                    <div style="font-size:12px; color:#6B7280; margin-bottom:10px;">{row['Reason']}</div>
+                    <div style="font-size:12px; color:#6B7280; margin-bottom:5px;">{row['Reason']}</div>
+                    <div style="font-size:11px; color:#9CA3AF; margin-bottom:10px;">{tag_key}: {row['Owner']}</div>
                     <div style="border-top:1px solid #F3F4F6; padding-top:8px; display:flex; justify-content:space-between; align-items:center;">
-                        <span style="font-size:12px; color:#6B7280;">Potential Savings</span>
+                        <span style="font-size:12px; color:#6B7280;">{"Last month (CUR)" if row['Actual'] else "Potential Savings"}</span>
                         <span style="font-weight:bold; color:#1F2937;">${row['Cost']:.2f}</span>
                     </div>
                 </div>